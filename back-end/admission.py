@@ -0,0 +1,134 @@
+import errno
+import fcntl
+import logging
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import IO, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Estado compartilhado pelos workers do gunicorn: um limite por processo
+# multiplicaria a cota de cada cliente pelo número de workers
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", os.path.join(tempfile.gettempdir(), "terminal_ratelimit.db"))
+IP_RATE = float(os.getenv("RATE_LIMIT_IP_RATE", "3"))  # fichas por segundo por IP
+IP_BURST = float(os.getenv("RATE_LIMIT_IP_BURST", "30"))
+SESSION_RATE = float(os.getenv("RATE_LIMIT_SESSION_RATE", "1"))  # fichas por segundo por sessão
+SESSION_BURST = float(os.getenv("RATE_LIMIT_SESSION_BURST", "10"))
+SLOTS_DIR = os.getenv("CONCURRENCY_SLOTS_DIR", os.path.join(tempfile.gettempdir(), "terminal_slots"))
+MAX_CONCURRENT = int(os.getenv("MAX_CONCURRENT_COMMANDS", "16"))  # comandos simultâneos em todos os workers
+BUSY_RETRY_AFTER = 1  # segundos sugeridos quando todas as vagas estão ocupadas
+EVICTION_INTERVAL = 500  # requisições entre limpezas dos baldes cheios
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+# (chave, fichas por segundo, capacidade)
+Bucket = Tuple[str, float, float]
+
+
+class RateLimiter:
+    """Token bucket por chave (IP, sessão) em SQLite compartilhado entre os workers.
+
+    Cada chave ganha ``rate`` fichas por segundo até ``burst``; uma requisição
+    gasta uma ficha de cada balde envolvido, ou de nenhum se algum estiver
+    vazio. Baldes que já teriam voltado a encher são apagados periodicamente,
+    já que equivalem a uma chave nunca vista.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+        self._requests = 0
+        self._max_refill = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Conexões não sobrevivem ao fork: cada worker abre a sua
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=1, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=OFF")
+            self._conn.execute(SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def acquire(self, buckets: List[Bucket]) -> float:
+        """Gasta uma ficha de cada balde; 0 se permitido, senão segundos até haver ficha"""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                # IMMEDIATE: leitura e escrita atômicas entre os workers
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    wait, updates = 0.0, []
+                    for key, rate, burst in buckets:
+                        self._max_refill = max(self._max_refill, burst / rate)
+                        row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                        tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+                        if tokens < 1:
+                            wait = max(wait, (1 - tokens) / rate)
+                        updates.append((key, tokens - 1, now))
+                    if not wait:
+                        conn.executemany("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", updates)
+                    self._requests += 1
+                    if self._requests >= EVICTION_INTERVAL:
+                        self._requests = 0
+                        conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self._max_refill,))
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            # Limite indisponível não derruba o terminal: a requisição passa
+            logger.warning(f"Rate limit indisponível, requisição liberada: {str(e)}")
+            return 0.0
+        return wait
+
+
+class ConcurrencyLimiter:
+    """Vagas de execução globais como arquivos com flock.
+
+    Cada vaga é um arquivo em ``directory``; ocupar uma vaga é obter o lock
+    exclusivo de um deles. O kernel solta o lock quando o arquivo é fechado,
+    inclusive se o worker morrer, então uma vaga nunca fica presa.
+    """
+
+    def __init__(self, directory: str, slots: int):
+        self.directory = directory
+        self.slots = slots
+        os.makedirs(directory, exist_ok=True)
+
+    def acquire(self) -> Optional[IO]:
+        """Arquivo da vaga ocupada (fechar libera), ou None se todas estão ocupadas"""
+        # Começa de uma vaga aleatória para não disputar sempre as primeiras
+        start = random.randrange(self.slots)
+        for index in range(self.slots):
+            slot = open(os.path.join(self.directory, f"{(start + index) % self.slots}.lock"), "a")
+            try:
+                fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return slot
+            except OSError as e:
+                slot.close()
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+        return None
+
+
+def retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+limiter = RateLimiter(RATE_LIMIT_DB)
+slots = ConcurrencyLimiter(SLOTS_DIR, MAX_CONCURRENT)
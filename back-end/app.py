@@ -1,8 +1,18 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from terminal import run_command
+from starlette.background import BackgroundTask
+from typing import IO, Iterator, List, Optional
+from admission import (
+    BUSY_RETRY_AFTER, IP_BURST, IP_RATE, SESSION_BURST, SESSION_RATE, Bucket, limiter, retry_after, slots
+)
+from terminal import run_command, stream_command
+from terminal.sessions import Session, store as session_store
+import ipaddress
+import json
 import logging
+import os
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -21,23 +31,152 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lidos pelo front-end nas respostas 429 e do stream
+    expose_headers=["Retry-After", "X-Session-Id"],
 )
 
+# Proxies (IPs ou redes, separados por vírgula) cujo X-Forwarded-For é
+# confiável, ex.: a rede do Traefik. Vazio: o cabeçalho é ignorado, pois
+# qualquer cliente poderia forjá-lo para escapar do limite por IP
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(network.strip(), strict=False)
+    for network in os.getenv("TRUSTED_PROXIES", "").split(",") if network.strip()
+]
+
 class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=1000)
+    # Sessão devolvida na resposta anterior (cwd, variáveis e histórico)
+    sessionId: Optional[str] = Field(None, max_length=64)
+
+def is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+if not TRUSTED_PROXIES:
+    logger.warning(
+        "TRUSTED_PROXIES não definido: o X-Forwarded-For será ignorado. Atrás do Traefik, "
+        "defina a rede dele ou todos os visitantes dividirão o mesmo limite por IP"
+    )
+
+_untrusted_forward_logged = False
+
+def client_ip(http_request: Request) -> str:
+    global _untrusted_forward_logged
+    peer = http_request.client.host if http_request.client else "desconhecido"
+    if not is_trusted_proxy(peer):
+        if not _untrusted_forward_logged and "x-forwarded-for" in http_request.headers and not TRUSTED_PROXIES:
+            # Provável proxy não configurado: avisa uma vez por worker
+            _untrusted_forward_logged = True
+            logger.warning(f"X-Forwarded-For recebido de {peer}, que não está em TRUSTED_PROXIES")
+        return peer
+    # Da direita para a esquerda, o primeiro endereço que não é um proxy
+    # confiável é o cliente; os anteriores podem ter sido forjados por ele
+    forwarded = http_request.headers.get("x-forwarded-for", "")
+    for address in reversed([address.strip() for address in forwarded.split(",") if address.strip()]):
+        if not is_trusted_proxy(address):
+            return address
+    return peer
+
+def admit(http_request: Request, session_id: Optional[str]) -> IO:
+    """Aplica o rate limit (IP e sessão) e ocupa uma vaga de execução.
+
+    Responde 429 com Retry-After se o cliente passou do limite ou se todas as
+    vagas estão ocupadas; fechar o arquivo devolvido libera a vaga."""
+    buckets: List[Bucket] = [(f"ip:{client_ip(http_request)}", IP_RATE, IP_BURST)]
+    if session_id:
+        buckets.append((f"session:{session_id}", SESSION_RATE, SESSION_BURST))
+    wait = limiter.acquire(buckets)
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Muitas requisições, tente novamente em instantes",
+            headers={"Retry-After": retry_after(wait)}
+        )
+    slot = slots.acquire()
+    if slot is None:
+        logger.warning("Todas as vagas de execução ocupadas, requisição recusada")
+        raise HTTPException(
+            status_code=429,
+            detail="Servidor ocupado, tente novamente em instantes",
+            headers={"Retry-After": str(BUSY_RETRY_AFTER)}
+        )
+    return slot
 
 @app.post("/api/chat")
-async def chat(request: ChatRequest):
+def chat(request: ChatRequest, http_request: Request):
+    # Síncrona: o FastAPI a executa no threadpool, fora do event loop (SQLite)
+    # Valida antes do rate limit: requisições inválidas não gastam fichas nem vagas
+    cmd = request.message.strip()
+    if not cmd:
+        raise HTTPException(status_code=400, detail="Comando não fornecido")
+    slot = admit(http_request, request.sessionId)
     try:
-        cmd = request.message.strip()
-        if not cmd:
-            raise HTTPException(status_code=400, detail="Comando não fornecido")
-        
-        output = run_command(cmd)
-        return {"response": output}
+        session = session_store.load(request.sessionId)
+        output = run_command(cmd, session)
+        session_store.save(session)
+        return {"response": output, "sessionId": session.id}
     except Exception as e:
         logger.error(f"Erro ao executar comando: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        slot.close()
+
+STREAM_CHUNK_SIZE = 4096  # caracteres acumulados antes de enviar uma linha NDJSON
+
+def ndjson_output(command: str, session: Session) -> Iterator[str]:
+    """Uma linha {"stdout"|"stderr": texto} por pedaço e, no fim,
+    {"returncode", "sessionId"}. Pedaços pequenos seguidos do mesmo stream
+    são agrupados até STREAM_CHUNK_SIZE"""
+    stream, buffer, size = None, [], 0
+    output = stream_command(command, session)
+    returncode = 1
+    try:
+        while True:
+            try:
+                chunk_stream, text = next(output)
+            except StopIteration as stop:
+                returncode = stop.value or 0
+                break
+            if buffer and (chunk_stream != stream or size >= STREAM_CHUNK_SIZE):
+                yield json.dumps({stream: "".join(buffer)}) + "\n"
+                buffer, size = [], 0
+            stream = chunk_stream
+            buffer.append(text)
+            size += len(text)
+    except Exception as e:
+        # A resposta já começou: o erro vai no stream, não como HTTP 500
+        logger.error(f"Erro ao executar comando: {str(e)}")
+        if buffer:
+            yield json.dumps({stream: "".join(buffer)}) + "\n"
+        stream, buffer = "stderr", [str(e)]
+    finally:
+        session_store.save(session)
+    if buffer:
+        yield json.dumps({stream: "".join(buffer)}) + "\n"
+    yield json.dumps({"returncode": returncode, "sessionId": session.id}) + "\n"
+
+@app.post("/api/chat/stream")
+def chat_stream(request: ChatRequest, http_request: Request):
+    """Como /api/chat, mas envia a saída em NDJSON à medida que é produzida"""
+    cmd = request.message.strip()
+    if not cmd:
+        raise HTTPException(status_code=400, detail="Comando não fornecido")
+    slot = admit(http_request, request.sessionId)
+    try:
+        session = session_store.load(request.sessionId)
+    except Exception:
+        slot.close()
+        raise
+    # A vaga fica ocupada até o fim do stream, não só até a resposta começar
+    return StreamingResponse(
+        ndjson_output(cmd, session),
+        media_type="application/x-ndjson",
+        headers={"X-Session-Id": session.id, "X-Accel-Buffering": "no"},
+        background=BackgroundTask(slot.close)
+    )
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,18 +1,151 @@
+import re
+from typing import Callable, Dict, List, Optional
+
 from terminal.ls import cmd_ls
 from terminal.pwd import cmd_pwd
 from terminal.echo import cmd_echo
+from terminal.cat import cmd_cat
+from terminal.tree import cmd_tree
+from terminal.find import cmd_find
+from terminal.cd import cmd_cd
+from terminal.env import assign, cmd_env, cmd_export
+from terminal.history import cmd_history
+from terminal.grep import cmd_grep
+from terminal.wc import cmd_wc
+from terminal.head import cmd_head
+from terminal.sort import cmd_sort
 from terminal.comando_default import cmd_default
+from terminal.output import STDERR, Lines, Output, collect
+from terminal.parser import ParseError, Pipeline, SimpleCommand, Word, parse
+from terminal.sessions import Session
+from terminal.text import open_input
+
+VARIABLE_REFERENCE = re.compile(r"\$(?:\{([A-Za-z_][A-Za-z0-9_]*)\}|([A-Za-z_][A-Za-z0-9_]*))")
+
+Command = Callable[[List[str], Session, Lines], Output]
+
+# Tabela de despacho: nome do comando -> gerador(args, sessão, entrada padrão)
+COMMANDS: Dict[str, Command] = {
+    "ls": cmd_ls,
+    "pwd": cmd_pwd,
+    "echo": cmd_echo,
+    "cat": cmd_cat,
+    "tree": cmd_tree,
+    "find": cmd_find,
+    "cd": cmd_cd,
+    "export": cmd_export,
+    "env": cmd_env,
+    "history": cmd_history,
+    "grep": cmd_grep,
+    "wc": cmd_wc,
+    "head": cmd_head,
+    "sort": cmd_sort,
+}
+
+
+def expand(arg: str, session: Session) -> str:
+    """Substitui $NOME e ${NOME} pelas variáveis da sessão"""
+    def value(match) -> str:
+        name = match.group(1) or match.group(2)
+        return session.cwd if name == "PWD" else session.env.get(name, "")
+    return VARIABLE_REFERENCE.sub(value, arg)
+
+
+def expand_word(word: Word, session: Session) -> str:
+    return "".join(expand(text, session) if expandable else text for text, expandable in word)
+
+
+def run_command(command: str, session: Optional[Session] = None) -> dict:
+    """Executa o comando e devolve a saída completa"""
+    return collect(stream_command(command, session if session is not None else Session()))
+
+
+def stream_command(command: str, session: Session) -> Output:
+    """Executa a linha como gerador de pedaços de saída (ver terminal.output)"""
+    session.record(command)
+    try:
+        sequence = parse(command)
+    except ParseError as error:
+        yield STDERR, f"bash: {error}\n"
+        return 2
+
+    returncode = 0
+    for connector, pipeline in sequence:
+        # Como no bash, um pipeline pulado mantém o código do anterior
+        if connector == "&&" and returncode != 0 or connector == "||" and returncode == 0:
+            continue
+        returncode = yield from run_pipeline(pipeline, session)
+    return returncode
+
+
+def pipe(output: Output, errors: List[str]) -> Lines:
+    """Saída padrão de um comando como linhas para o próximo; o stderr vai para ``errors``"""
+    pending = ""
+    for stream, text in output:
+        if stream == STDERR:
+            errors.append(text)
+            continue
+        *lines, pending = (pending + text).split("\n")
+        for line in lines:
+            yield line + "\n"
+    if pending:
+        yield pending
+
+
+def run_pipeline(pipeline: Pipeline, session: Session) -> Output:
+    """Encadeia os comandos por geradores: cada um puxa as linhas do anterior sob demanda.
+
+    Nenhuma saída intermediária é montada em memória, e se um comando para de
+    ler (``head``) os anteriores param junto. O stderr de todos os estágios é
+    repassado na ordem em que é produzido; o código de saída é o do último.
+    """
+    errors: List[str] = []
+    stages: List[Output] = []
+    stdin: Lines = iter(())
+    for command in pipeline[:-1]:
+        stages.append(run_simple(command, session, stdin))
+        stdin = pipe(stages[-1], errors)
+    stages.append(run_simple(pipeline[-1], session, stdin))
+
+    output = stages[-1]
+    try:
+        while True:
+            try:
+                chunk = next(output)
+            except StopIteration as stop:
+                returncode = stop.value or 0
+                break
+            for error in errors:
+                yield STDERR, error
+            errors.clear()
+            yield chunk
+        for error in errors:
+            yield STDERR, error
+    finally:
+        for stage in stages:
+            stage.close()
+    return returncode
+
+
+def run_simple(command: SimpleCommand, session: Session, stdin: Lines) -> Output:
+    args = [expand_word(word, session) for word in command.words]
+    if command.stdout is not None:
+        # O sistema de arquivos virtual é somente leitura
+        yield STDERR, f"bash: {expand_word(command.stdout, session)}: Read-only file system\n"
+        return 1
+    if command.stdin is not None:
+        lines = open_input(expand_word(command.stdin, session), session, stdin)
+        if isinstance(lines, str):
+            yield STDERR, f"bash: {lines}\n"
+            return 1
+        stdin = lines
+    if not args:
+        return 0
+    # NOME=valor sem comando define uma variável, como no bash
+    if "=" in args[0] and len(args) == 1 and not args[0].startswith("="):
+        return (yield from assign(args[0], session))
 
-def run_command(command: str) -> dict:
-    parts = command.split()
-    cmd = parts[0].lower()
-    args = parts[1:]
-
-    if cmd == 'ls':
-        return cmd_ls(args)
-    elif cmd == 'pwd':
-        return cmd_pwd(args)
-    elif cmd == 'echo':
-        return cmd_echo(args)
-    else:
-        return cmd_default(command)
+    handler = COMMANDS.get(args[0].lower())
+    if handler is None:
+        return (yield from cmd_default(args[0]))
+    return (yield from handler(args[1:], session, stdin))
@@ -0,0 +1,26 @@
+from terminal.output import STDERR, STDOUT, Lines, Output
+from terminal.sessions import Session
+from terminal.vfs import fs
+
+CHUNK_SIZE = 4096  # caracteres por pedaço de arquivos grandes
+
+
+def cmd_cat(args, session: Session, stdin: Lines) -> Output:
+    returncode = 0
+    # Sem arquivos (ou com "-") copia a entrada padrão, como em "ls | cat"
+    for path in args or ["-"]:
+        if path == "-":
+            for line in stdin:
+                yield STDOUT, line
+            continue
+        _, node = fs.resolve(path, session.cwd)
+        if node is None:
+            yield STDERR, f"cat: {path}: No such file or directory\n"
+            returncode = 1
+        elif node.is_dir:
+            yield STDERR, f"cat: {path}: Is a directory\n"
+            returncode = 1
+        else:
+            for start in range(0, len(node.content), CHUNK_SIZE):
+                yield STDOUT, node.content[start:start + CHUNK_SIZE]
+    return returncode
@@ -0,0 +1,26 @@
+from terminal.output import STDERR, STDOUT, Lines, Output
+from terminal.sessions import Session
+from terminal.vfs import fs
+
+
+def cmd_cd(args, session: Session, stdin: Lines) -> Output:
+    if len(args) > 1:
+        yield STDERR, "bash: cd: too many arguments\n"
+        return 1
+    target = args[0] if args else session.env.get("HOME", "~")
+    if target == "-":
+        target = session.env.get("OLDPWD", session.cwd)
+
+    path, node = fs.resolve(target, session.cwd)
+    if node is None:
+        yield STDERR, f"bash: cd: {target}: No such file or directory\n"
+        return 1
+    if not node.is_dir:
+        yield STDERR, f"bash: cd: {target}: Not a directory\n"
+        return 1
+
+    session.env["OLDPWD"] = session.cwd
+    session.cwd = path
+    if args == ["-"]:
+        yield STDOUT, path + "\n"
+    return 0
@@ -1,6 +1,6 @@
-def cmd_default(command: str) -> dict:
-    return {
-        "stdout": "",
-        "stderr": f"bash: {command}: command not found",
-        "returncode": 127
-    }
+from terminal.output import STDERR, Output
+
+
+def cmd_default(name: str) -> Output:
+    yield STDERR, f"bash: {name}: command not found\n"
+    return 127
@@ -1,3 +1,7 @@
-def cmd_echo(args) -> dict:
-    output = " ".join(args)
-    return {"stdout": output, "stderr": "", "returncode": 0}
+from terminal.output import STDOUT, Lines, Output
+from terminal.sessions import Session
+
+
+def cmd_echo(args, session: Session, stdin: Lines) -> Output:
+    yield STDOUT, " ".join(args) + "\n"
+    return 0
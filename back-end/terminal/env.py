@@ -0,0 +1,36 @@
+import re
+
+from terminal.output import STDERR, STDOUT, Lines, Output
+from terminal.sessions import Session
+
+VARIABLE_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def assign(assignment: str, session: Session) -> Output:
+    """Aplica ``NOME=valor`` no ambiente da sessão"""
+    name, _, value = assignment.partition("=")
+    if not VARIABLE_NAME.match(name):
+        yield STDERR, f"bash: export: `{assignment}': not a valid identifier\n"
+        return 1
+    if not session.set_variable(name, value):
+        yield STDERR, f"bash: {name}: too many variables\n"
+        return 1
+    return 0
+
+
+def cmd_export(args, session: Session, stdin: Lines) -> Output:
+    if not args:
+        return (yield from cmd_env(args, session, stdin))
+    for arg in args:
+        if "=" in arg:
+            returncode = yield from assign(arg, session)
+            if returncode:
+                return returncode
+    return 0
+
+
+def cmd_env(args, session: Session, stdin: Lines) -> Output:
+    variables = dict(session.env, PWD=session.cwd)
+    for name, value in sorted(variables.items()):
+        yield STDOUT, f"{name}={value}\n"
+    return 0
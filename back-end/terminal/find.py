@@ -0,0 +1,43 @@
+from fnmatch import fnmatchcase
+
+from terminal.output import STDERR, STDOUT, Lines, Output
+from terminal.sessions import Session
+from terminal.vfs import fs
+
+
+def cmd_find(args, session: Session, stdin: Lines) -> Output:
+    # find [caminho...] [-name padrão] [-type f|d]
+    paths, name_pattern, node_type = [], None, None
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg in ("-name", "-type"):
+            if index + 1 >= len(args):
+                yield STDERR, f"find: missing argument to `{arg}'\n"
+                return 1
+            if arg == "-name":
+                name_pattern = args[index + 1]
+            else:
+                node_type = args[index + 1]
+            index += 2
+            continue
+        if arg.startswith("-"):
+            yield STDERR, f"find: unknown predicate `{arg}'\n"
+            return 1
+        paths.append(arg)
+        index += 1
+
+    returncode = 0
+    for path in paths or ["."]:
+        _, node = fs.resolve(path, session.cwd)
+        if node is None:
+            yield STDERR, f"find: '{path}': No such file or directory\n"
+            returncode = 1
+            continue
+        for found_path, found in fs.walk(node, path):
+            if node_type == "f" and found.is_dir or node_type == "d" and not found.is_dir:
+                continue
+            if name_pattern is not None and not fnmatchcase(found_path.rsplit("/", 1)[-1], name_pattern):
+                continue
+            yield STDOUT, found_path + "\n"
+    return returncode
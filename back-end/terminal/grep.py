@@ -0,0 +1,46 @@
+import re
+
+from terminal.output import STDERR, STDOUT, Lines, Output
+from terminal.sessions import Session
+from terminal.text import open_input, split_flags
+
+
+def cmd_grep(args, session: Session, stdin: Lines) -> Output:
+    # grep [-i] [-v] [-n] [-c] [-F] PADRÃO [arquivo...]
+    flags, operands = split_flags(args)
+    unknown = flags - set("ivncFE")
+    if unknown:
+        yield STDERR, f"grep: invalid option -- '{sorted(unknown)[0]}'\n"
+        return 2
+    if not operands:
+        yield STDERR, "Usage: grep [OPTION]... PATTERNS [FILE]...\n"
+        return 2
+    pattern, paths = operands[0], operands[1:]
+    try:
+        regex = re.compile(re.escape(pattern) if "F" in flags else pattern, re.IGNORECASE if "i" in flags else 0)
+    except re.error:
+        yield STDERR, "grep: Invalid regular expression\n"
+        return 2
+
+    invert = "v" in flags
+    # Com vários arquivos cada linha leva o nome do arquivo, como no grep
+    titled = len(paths) > 1
+    matched, failed = False, False
+    for path in paths or ["-"]:
+        lines = open_input(path, session, stdin)
+        if isinstance(lines, str):
+            yield STDERR, f"grep: {lines}\n"
+            failed = True
+            continue
+        prefix = f"{path}:" if titled else ""
+        count = 0
+        for number, line in enumerate(lines, 1):
+            text = line.rstrip("\n")
+            if (regex.search(text) is not None) != invert:
+                count += 1
+                if "c" not in flags:
+                    yield STDOUT, f"{prefix}{f'{number}:' if 'n' in flags else ''}{text}\n"
+        if "c" in flags:
+            yield STDOUT, f"{prefix}{count}\n"
+        matched = matched or count > 0
+    return 2 if failed else 0 if matched else 1
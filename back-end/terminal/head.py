@@ -0,0 +1,47 @@
+from itertools import islice
+
+from terminal.output import STDERR, STDOUT, Lines, Output
+from terminal.sessions import Session
+from terminal.text import open_input
+
+DEFAULT_LINES = 10
+
+
+def cmd_head(args, session: Session, stdin: Lines) -> Output:
+    # head [-n N | -N] [arquivo...]
+    count, paths = str(DEFAULT_LINES), []
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg == "-n":
+            if index + 1 >= len(args):
+                yield STDERR, "head: option requires an argument -- 'n'\n"
+                return 1
+            count = args[index + 1]
+            index += 2
+            continue
+        if arg.startswith("-n"):
+            count = arg[2:]
+        elif arg.startswith("-") and arg[1:].isdigit():
+            count = arg[1:]
+        else:
+            paths.append(arg)
+        index += 1
+    if not count.isdigit():
+        yield STDERR, f"head: invalid number of lines: '{count}'\n"
+        return 1
+
+    returncode = 0
+    titled = len(paths) > 1
+    for position, path in enumerate(paths or ["-"]):
+        lines = open_input(path, session, stdin)
+        if isinstance(lines, str):
+            yield STDERR, f"head: {lines}\n"
+            returncode = 1
+            continue
+        if titled:
+            yield STDOUT, ("\n" if position else "") + f"==> {path} <==\n"
+        # Para de ler após N linhas: o comando anterior do pipe não é mais executado
+        for line in islice(lines, int(count)):
+            yield STDOUT, line
+    return returncode
@@ -0,0 +1,8 @@
+from terminal.output import STDOUT, Lines, Output
+from terminal.sessions import Session
+
+
+def cmd_history(args, session: Session, stdin: Lines) -> Output:
+    for index, command in enumerate(session.history, 1):
+        yield STDOUT, f"{index:>5}  {command}\n"
+    return 0
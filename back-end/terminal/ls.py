@@ -1,7 +1,33 @@
-def cmd_ls(args) -> dict:
-    # Simulação simples: lista arquivos fixos
-    files = [
-        "app.py", "requirements.txt", "README.md", "src", "node_modules"
-    ]
-    output = "\n".join(files)
-    return {"stdout": output, "stderr": "", "returncode": 0}
+from terminal.output import STDERR, STDOUT, Lines, Output
+from terminal.sessions import Session
+from terminal.vfs import fs
+
+
+def cmd_ls(args, session: Session, stdin: Lines) -> Output:
+    show_hidden = any(arg.startswith("-") and "a" in arg for arg in args)
+    paths = [arg for arg in args if not arg.startswith("-")] or ["."]
+    # Como no ls, vários diretórios são listados em seções "caminho:"
+    titled = len(paths) > 1
+
+    returncode = 0
+    first = True
+    for path in paths:
+        _, node = fs.resolve(path, session.cwd)
+        if node is None:
+            yield STDERR, f"ls: cannot access '{path}': No such file or directory\n"
+            returncode = 2
+            continue
+        if not first:
+            yield STDOUT, "\n"
+        first = False
+        if not node.is_dir:
+            yield STDOUT, path + "\n"
+            continue
+        if titled:
+            yield STDOUT, f"{path}:\n"
+        if show_hidden:
+            yield STDOUT, ".\n..\n"
+        for name in node.children:
+            if show_hidden or not name.startswith("."):
+                yield STDOUT, name + "\n"
+    return returncode
@@ -0,0 +1,40 @@
+from typing import Generator, Iterator, Tuple
+
+STDOUT = "stdout"
+STDERR = "stderr"
+
+# Cada comando é um gerador de (stream, texto) que retorna o código de saída;
+# o texto já inclui as quebras de linha, como na saída de um processo
+Chunk = Tuple[str, str]
+Output = Generator[Chunk, None, int]
+# Entrada padrão de um comando: linhas (com a quebra de linha) consumidas sob demanda
+Lines = Iterator[str]
+
+
+def lines_of(text: str) -> Lines:
+    """Linhas de ``text`` uma a uma, sem montar a lista inteira"""
+    start, length = 0, len(text)
+    while start < length:
+        end = text.find("\n", start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end + 1]
+        start = end + 1
+
+
+def collect(output: Output) -> dict:
+    """Executa o gerador até o fim e monta a resposta completa de /api/chat"""
+    streams = {STDOUT: [], STDERR: []}
+    while True:
+        try:
+            stream, text = next(output)
+        except StopIteration as stop:
+            returncode = stop.value or 0
+            break
+        streams[stream].append(text)
+    return {
+        "stdout": "".join(streams[STDOUT]).rstrip("\n"),
+        "stderr": "".join(streams[STDERR]).rstrip("\n"),
+        "returncode": returncode
+    }
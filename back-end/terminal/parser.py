@@ -0,0 +1,148 @@
+from typing import List, Optional, Tuple, Union
+
+# Mais longos primeiro, para que "&&" e ">>" não sejam lidos como "&" e ">"
+OPERATORS = ("&&", "||", ">>", "|", ";", ">", "<")
+CONNECTORS = (";", "&&", "||")
+REDIRECTIONS = ("<", ">", ">>")
+
+# Palavra em partes (texto, expande variáveis): aspas simples e caracteres
+# escapados não expandem; a expansão só acontece na execução, para que
+# "A=1; echo $A" veja a atribuição anterior
+Word = Tuple[Tuple[str, bool], ...]
+Token = Union[str, Word]  # operadores são str, palavras são Word
+
+
+class ParseError(Exception):
+    pass
+
+
+class SimpleCommand:
+    """Comando com argumentos e redirecionamentos, ainda sem expansão"""
+
+    __slots__ = ("words", "stdin", "stdout")
+
+    def __init__(self):
+        self.words: List[Word] = []
+        self.stdin: Optional[Word] = None
+        self.stdout: Optional[Word] = None
+
+    @property
+    def empty(self) -> bool:
+        return not self.words and self.stdin is None and self.stdout is None
+
+
+Pipeline = List[SimpleCommand]
+
+
+def tokenize(command: str) -> List[Token]:
+    """Separa a linha em palavras e operadores, tratando aspas e escapes como o bash"""
+    tokens: List[Token] = []
+    word: List[Tuple[str, bool]] = []
+    run: List[str] = []  # trecho sem aspas em construção
+    started = False  # '' também é uma palavra
+    index, length = 0, len(command)
+
+    def flush_run() -> None:
+        if run:
+            word.append(("".join(run), True))
+            run.clear()
+
+    def flush_word() -> None:
+        nonlocal started
+        flush_run()
+        if started:
+            tokens.append(tuple(word))
+            word.clear()
+            started = False
+
+    while index < length:
+        char = command[index]
+        if char in " \t\n":
+            flush_word()
+            index += 1
+            continue
+        operator = next((op for op in OPERATORS if command.startswith(op, index)), None)
+        if operator is not None:
+            flush_word()
+            tokens.append(operator)
+            index += len(operator)
+            continue
+
+        started = True
+        if char == "'":
+            end = command.find("'", index + 1)
+            if end < 0:
+                raise ParseError("unexpected EOF while looking for matching `''")
+            flush_run()
+            word.append((command[index + 1:end], False))
+            index = end + 1
+        elif char == '"':
+            flush_run()
+            index += 1
+            while index < length and command[index] != '"':
+                if command[index] == "\\" and index + 1 < length and command[index + 1] in '"\\$`':
+                    flush_run()
+                    word.append((command[index + 1], False))
+                    index += 2
+                else:
+                    run.append(command[index])
+                    index += 1
+            if index >= length:
+                raise ParseError("unexpected EOF while looking for matching `\"'")
+            flush_run()
+            index += 1
+        elif char == "\\":
+            flush_run()
+            if index + 1 < length:
+                word.append((command[index + 1], False))
+            index += 2
+        else:
+            run.append(char)
+            index += 1
+    flush_word()
+    return tokens
+
+
+def parse(command: str) -> List[Tuple[str, Pipeline]]:
+    """Lista de (conector, pipeline); o conector diz se o pipeline roda após o anterior.
+
+    Suporta ``|``, ``;``, ``&&``, ``||`` e os redirecionamentos ``<``, ``>`` e ``>>``.
+    """
+    tokens = tokenize(command)
+    sequence: List[Tuple[str, Pipeline]] = []
+    pipeline: Pipeline = []
+    current = SimpleCommand()
+    connector = ";"
+
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        index += 1
+        if not isinstance(token, str):
+            current.words.append(token)
+        elif token in REDIRECTIONS:
+            target = tokens[index] if index < len(tokens) else "newline"
+            if isinstance(target, str):
+                raise ParseError(f"syntax error near unexpected token `{target}'")
+            index += 1
+            if token == "<":
+                current.stdin = target
+            else:
+                current.stdout = target
+        elif current.empty:
+            raise ParseError(f"syntax error near unexpected token `{token}'")
+        elif token == "|":
+            pipeline.append(current)
+            current = SimpleCommand()
+        else:
+            pipeline.append(current)
+            sequence.append((connector, pipeline))
+            pipeline, current, connector = [], SimpleCommand(), token
+
+    if not current.empty:
+        pipeline.append(current)
+        sequence.append((connector, pipeline))
+    elif pipeline or connector in ("&&", "||"):
+        # "ls |" ou "ls &&": o bash pediria a continuação da linha
+        raise ParseError("syntax error: unexpected end of file")
+    return sequence
@@ -1,4 +1,7 @@
-def cmd_pwd(args) -> dict:
-    # Simula o diretório atual
-    output = "/home/user/back-end"
-    return {"stdout": output, "stderr": "", "returncode": 0}
+from terminal.output import STDOUT, Lines, Output
+from terminal.sessions import Session
+
+
+def cmd_pwd(args, session: Session, stdin: Lines) -> Output:
+    yield STDOUT, session.cwd + "\n"
+    return 0
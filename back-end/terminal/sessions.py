@@ -0,0 +1,203 @@
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from terminal.vfs import DEFAULT_CWD, HOME
+
+logger = logging.getLogger(__name__)
+
+# Arquivo compartilhado pelos workers do gunicorn (não há afinidade de sessão)
+SESSION_DB = os.getenv("TERMINAL_SESSION_DB", os.path.join(tempfile.gettempdir(), "terminal_sessions.db"))
+SESSION_TTL = float(os.getenv("TERMINAL_SESSION_TTL", "1800"))  # segundos sem uso até expirar
+MAX_SESSIONS = int(os.getenv("TERMINAL_MAX_SESSIONS", "10000"))
+MAX_SESSION_BYTES = int(os.getenv("TERMINAL_SESSION_MAX_BYTES", str(64 * 1024 * 1024)))  # soma de todas as sessões
+HISTORY_SIZE = 100  # comandos guardados por sessão
+MAX_VARIABLES = 64  # variáveis definidas pelo usuário por sessão
+EXPIRY_INTERVAL = 100  # gravações entre remoções das sessões expiradas
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_seen REAL NOT NULL
+)
+"""
+INDEX = "CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)"
+# Totais mantidos por triggers: checar os limites a cada gravação custa O(1)
+TOTALS = [
+    """
+    CREATE TABLE IF NOT EXISTS session_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        count INTEGER NOT NULL,
+        bytes INTEGER NOT NULL
+    )
+    """,
+    """
+    INSERT OR IGNORE INTO session_totals (id, count, bytes)
+    SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM sessions
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sessions_insert AFTER INSERT ON sessions BEGIN
+        UPDATE session_totals SET count = count + 1, bytes = bytes + NEW.size;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sessions_delete AFTER DELETE ON sessions BEGIN
+        UPDATE session_totals SET count = count - 1, bytes = bytes - OLD.size;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sessions_update AFTER UPDATE OF size ON sessions BEGIN
+        UPDATE session_totals SET bytes = bytes + NEW.size - OLD.size;
+    END
+    """,
+]
+
+
+def default_env() -> Dict[str, str]:
+    return {"HOME": HOME, "USER": "user", "SHELL": "/bin/bash"}
+
+
+class Session:
+    """Estado de shell de um visitante: diretório atual, variáveis e histórico"""
+
+    __slots__ = ("id", "cwd", "env", "history")
+
+    def __init__(
+        self,
+        id: str = "",
+        cwd: str = DEFAULT_CWD,
+        env: Optional[Dict[str, str]] = None,
+        history: Optional[List[str]] = None,
+    ):
+        self.id = id
+        self.cwd = cwd
+        self.env = env if env is not None else default_env()
+        self.history = history if history is not None else []
+
+    def record(self, command: str) -> None:
+        self.history.append(command)
+        del self.history[:-HISTORY_SIZE]
+
+    def set_variable(self, name: str, value: str) -> bool:
+        """Define a variável; False se o limite de variáveis foi atingido"""
+        if name not in self.env and len(self.env) >= MAX_VARIABLES:
+            return False
+        self.env[name] = value
+        return True
+
+    def to_json(self) -> str:
+        return json.dumps({"cwd": self.cwd, "env": self.env, "history": self.history}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, session_id: str, data: str) -> "Session":
+        state = json.loads(data)
+        return cls(session_id, state["cwd"], state["env"], state["history"])
+
+
+class SessionStore:
+    """Sessões em SQLite (WAL) compartilhado entre os workers.
+
+    Como o gunicorn não fixa um visitante em um worker, um dicionário por
+    processo perderia o ``cd`` na requisição seguinte; o arquivo é comum a
+    todos e a memória de cada worker não cresce com o número de sessões.
+    Sessões sem uso por ``ttl`` expiram; ``max_sessions`` e ``max_bytes``
+    (tamanho serializado somado) valem em todas as gravações: na mesma
+    transação do insert, as menos usadas recentemente são descartadas até
+    o store voltar aos limites.
+    """
+
+    def __init__(self, path: str, ttl: float, max_sessions: int, max_bytes: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Conexões não sobrevivem ao fork: cada worker abre a sua
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(SCHEMA)
+            self._conn.execute(INDEX)
+            for statement in TOTALS:
+                self._conn.execute(statement)
+            self._pid = os.getpid()
+        return self._conn
+
+    def load(self, session_id: Optional[str]) -> Session:
+        """Sessão existente e não expirada, ou uma nova com outro ID"""
+        if session_id:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT state FROM sessions WHERE id = ? AND last_seen >= ?",
+                    (session_id, time.time() - self.ttl)
+                ).fetchone()
+            if row is not None:
+                return Session.from_json(session_id, row[0])
+        return Session(secrets.token_urlsafe(16))
+
+    def save(self, session: Session) -> None:
+        data = session.to_json()
+        with self._lock:
+            conn = self._connection()
+            # IMMEDIATE: gravação e descarte atômicos entre os workers
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # UPSERT (não REPLACE) para que os triggers dos totais disparem
+                conn.execute(
+                    """
+                    INSERT INTO sessions (id, state, size, last_seen) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET
+                        state = excluded.state, size = excluded.size, last_seen = excluded.last_seen
+                    """,
+                    (session.id, data, len(data), time.time())
+                )
+                self._writes += 1
+                if self._writes >= EXPIRY_INTERVAL:
+                    self._writes = 0
+                    self._expire(conn)
+                self._enforce_limits(conn, session.id)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _expire(self, conn: sqlite3.Connection) -> None:
+        # Expiradas já são ignoradas no load; aqui só liberam espaço
+        expired = conn.execute("DELETE FROM sessions WHERE last_seen < ?", (time.time() - self.ttl,)).rowcount
+        if expired:
+            logger.info(f"Sessões do terminal expiradas: {expired}")
+
+    def _enforce_limits(self, conn: sqlite3.Connection, current_id: str) -> None:
+        count, total = conn.execute("SELECT count, bytes FROM session_totals").fetchone()
+        excess_count, excess_bytes = count - self.max_sessions, total - self.max_bytes
+        if excess_count <= 0 and excess_bytes <= 0:
+            return
+        # Descarta as menos usadas recentemente até caber nos dois limites
+        victims = []
+        for session_id, size in conn.execute(
+            "SELECT id, size FROM sessions WHERE id != ? ORDER BY last_seen", (current_id,)
+        ):
+            if excess_count <= 0 and excess_bytes <= 0:
+                break
+            victims.append((session_id,))
+            excess_count -= 1
+            excess_bytes -= size
+        conn.executemany("DELETE FROM sessions WHERE id = ?", victims)
+        logger.info(f"Sessões do terminal descartadas por limite: {len(victims)}")
+
+
+store = SessionStore(SESSION_DB, SESSION_TTL, MAX_SESSIONS, MAX_SESSION_BYTES)
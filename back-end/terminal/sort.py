@@ -0,0 +1,42 @@
+import re
+
+from terminal.output import STDERR, STDOUT, Lines, Output
+from terminal.sessions import Session
+from terminal.text import open_input, split_flags
+
+LEADING_NUMBER = re.compile(r"^\s*(-?\d+(?:\.\d*)?)")
+
+
+def numeric_key(line: str) -> float:
+    # Como no sort -n, linhas sem número no início valem 0
+    match = LEADING_NUMBER.match(line)
+    return float(match.group(1)) if match else 0.0
+
+
+def cmd_sort(args, session: Session, stdin: Lines) -> Output:
+    # sort [-r] [-n] [-u] [arquivo...]
+    flags, paths = split_flags(args)
+    unknown = flags - set("rnu")
+    if unknown:
+        yield STDERR, f"sort: invalid option -- '{sorted(unknown)[0]}'\n"
+        return 2
+
+    # Ordenar exige ler toda a entrada; só aqui a saída do pipe é acumulada
+    lines = []
+    for path in paths or ["-"]:
+        source = open_input(path, session, stdin)
+        if isinstance(source, str):
+            yield STDERR, f"sort: cannot read: {source}\n"
+            return 2
+        lines.extend(line.rstrip("\n") for line in source)
+
+    key = numeric_key if "n" in flags else None
+    lines.sort(key=key, reverse="r" in flags)
+    previous = object()
+    for line in lines:
+        current = key(line) if key else line
+        if "u" in flags and current == previous:
+            continue
+        previous = current
+        yield STDOUT, line + "\n"
+    return 0
@@ -0,0 +1,31 @@
+from typing import List, Set, Tuple, Union
+
+from terminal.output import Lines, lines_of
+from terminal.sessions import Session
+from terminal.vfs import fs
+
+
+def open_input(path: str, session: Session, stdin: Lines) -> Union[Lines, str]:
+    """Linhas do arquivo (``-`` é a entrada padrão) ou a mensagem de erro"""
+    if path == "-":
+        return stdin
+    _, node = fs.resolve(path, session.cwd)
+    if node is None:
+        return f"{path}: No such file or directory"
+    if node.is_dir:
+        return f"{path}: Is a directory"
+    return lines_of(node.content)
+
+
+def split_flags(args: List[str]) -> Tuple[Set[str], List[str]]:
+    """Separa flags curtas agrupadas (``-in``) dos operandos; ``--`` encerra as flags"""
+    flags, operands = set(), []
+    for index, arg in enumerate(args):
+        if arg == "--":
+            operands.extend(args[index + 1:])
+            break
+        if arg.startswith("-") and len(arg) > 1:
+            flags.update(arg[1:])
+        else:
+            operands.append(arg)
+    return flags, operands
@@ -0,0 +1,33 @@
+from typing import Iterator, List
+
+from terminal.output import STDOUT, Lines, Output
+from terminal.sessions import Session
+from terminal.vfs import Node, fs
+
+
+def _render(node: Node, prefix: str, counts: List[int]) -> Iterator[str]:
+    names = [name for name in node.children if not name.startswith(".")]
+    for index, name in enumerate(names):
+        child = node.children[name]
+        last = index == len(names) - 1
+        yield f"{prefix}{'└── ' if last else '├── '}{name}\n"
+        if child.is_dir:
+            counts[0] += 1
+            yield from _render(child, prefix + ("    " if last else "│   "), counts)
+        else:
+            counts[1] += 1
+
+
+def cmd_tree(args, session: Session, stdin: Lines) -> Output:
+    path = next((arg for arg in args if not arg.startswith("-")), ".")
+    _, node = fs.resolve(path, session.cwd)
+    if node is None or not node.is_dir:
+        yield STDOUT, f"{path}  [error opening dir]\n\n0 directories, 0 files\n"
+        return 2
+
+    yield STDOUT, path + "\n"
+    counts = [0, 0]  # diretórios, arquivos
+    for line in _render(node, "", counts):
+        yield STDOUT, line
+    yield STDOUT, f"\n{counts[0]} directories, {counts[1]} files\n"
+    return 0
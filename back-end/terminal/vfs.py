@@ -0,0 +1,119 @@
+import gc
+import json
+import logging
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HOME = "/home/user"
+DEFAULT_CWD = "/home/user/back-end"
+MANIFEST_PATH = os.getenv(
+    "TERMINAL_FS_MANIFEST",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "filesystem.json")
+)
+
+
+class Node:
+    """Nó da árvore de caminhos: diretório (``children``) ou arquivo (``content``)"""
+
+    __slots__ = ("name", "children", "content")
+
+    def __init__(self, name: str, children: Optional[Dict[str, "Node"]] = None, content: str = ""):
+        self.name = name
+        self.children = children
+        self.content = content
+
+    @property
+    def is_dir(self) -> bool:
+        return self.children is not None
+
+
+def split_path(path: str, cwd: str = DEFAULT_CWD) -> List[str]:
+    """Normaliza o caminho (relativo a ``cwd``, com ``~``, ``.`` e ``..``) em partes"""
+    if path == "~" or path.startswith("~/"):
+        path = HOME + path[1:]
+    elif not path.startswith("/"):
+        path = f"{cwd}/{path}"
+    parts: List[str] = []
+    for part in path.split("/"):
+        if part in ("", "."):
+            continue
+        if part == "..":
+            # Como no bash, ".." na raiz continua na raiz
+            if parts:
+                parts.pop()
+        else:
+            parts.append(part)
+    return parts
+
+
+def join_path(parts: List[str]) -> str:
+    return "/" + "/".join(parts)
+
+
+class VirtualFS:
+    """Sistema de arquivos virtual somente leitura.
+
+    Carregado uma vez de um manifesto JSON (objetos são diretórios, strings
+    são o conteúdo dos arquivos) em uma trie de caminhos: resolver um caminho
+    custa O(profundidade), independente do tamanho da árvore.
+    """
+
+    def __init__(self, root: Node):
+        self.root = root
+
+    @classmethod
+    def from_manifest(cls, manifest: Dict) -> "VirtualFS":
+        def build(name: str, entry) -> Node:
+            if isinstance(entry, dict):
+                return Node(name, {child: build(child, value) for child, value in sorted(entry.items())})
+            return Node(name, content=str(entry))
+        return cls(build("", manifest))
+
+    @classmethod
+    def load(cls, path: str) -> "VirtualFS":
+        with open(path, encoding="utf-8") as file:
+            fs = cls.from_manifest(json.load(file))
+        logger.info(f"Sistema de arquivos virtual carregado de {path}")
+        return fs
+
+    def lookup(self, parts: List[str]) -> Optional[Node]:
+        node = self.root
+        for part in parts:
+            if node.children is None:
+                return None
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def resolve(self, path: str, cwd: str = DEFAULT_CWD) -> Tuple[str, Optional[Node]]:
+        """Caminho absoluto normalizado e o nó correspondente (None se não existir)"""
+        parts = split_path(path, cwd)
+        return join_path(parts), self.lookup(parts)
+
+    def walk(self, node: Node, path: str) -> Iterator[Tuple[str, Node]]:
+        """Percorre a subárvore em pré-ordem (ordem alfabética), incluindo o próprio nó"""
+        stack = [(path, node)]
+        while stack:
+            current_path, current = stack.pop()
+            yield current_path, current
+            if current.children:
+                prefix = current_path.rstrip("/")
+                for name in reversed(list(current.children)):
+                    stack.append((f"{prefix}/{name}", current.children[name]))
+
+
+def _load_default() -> VirtualFS:
+    fs = VirtualFS.load(MANIFEST_PATH)
+    # A árvore é imutável: tira os objetos das varreduras do GC para que os
+    # workers (fork do gunicorn com --preload) não copiem as páginas só por
+    # causa da coleta
+    gc.freeze()
+    return fs
+
+
+# Instância única do processo; com --preload é carregada no master e
+# compartilhada copy-on-write pelos workers
+fs = _load_default()
@@ -0,0 +1,46 @@
+from typing import List, Tuple
+
+from terminal.output import STDERR, STDOUT, Lines, Output
+from terminal.sessions import Session
+from terminal.text import open_input, split_flags
+
+STDIN_WIDTH = 7  # largura das colunas do wc lendo da entrada padrão
+
+
+def cmd_wc(args, session: Session, stdin: Lines) -> Output:
+    # wc [-l] [-w] [-c] [arquivo...]
+    flags, paths = split_flags(args)
+    unknown = flags - set("lwc")
+    if unknown:
+        yield STDERR, f"wc: invalid option -- '{sorted(unknown)[0]}'\n"
+        return 1
+    # Ordem fixa das colunas, como no wc: linhas, palavras, bytes
+    columns = [flag for flag in "lwc" if flag in flags] or ["l", "w", "c"]
+
+    returncode = 0
+    rows: List[Tuple[List[int], str]] = []
+    for path in paths or ["-"]:
+        lines = open_input(path, session, stdin)
+        if isinstance(lines, str):
+            yield STDERR, f"wc: {lines}\n"
+            returncode = 1
+            continue
+        counts = {"l": 0, "w": 0, "c": 0}
+        for line in lines:
+            counts["l"] += line.endswith("\n")
+            counts["w"] += len(line.split())
+            counts["c"] += len(line.encode())
+        rows.append(([counts[column] for column in columns], "" if path == "-" else path))
+    if len(rows) > 1:
+        rows.append(([sum(row[0][i] for row in rows) for i in range(len(columns))], "total"))
+
+    if not paths and len(columns) > 1:
+        width = STDIN_WIDTH
+    elif len(rows) > 1 or len(columns) > 1:
+        width = max(len(str(value)) for values, _ in rows for value in values)
+    else:
+        width = 0
+    for values, name in rows:
+        line = " ".join(f"{value:>{width}}" for value in values)
+        yield STDOUT, f"{line} {name}\n" if name else line + "\n"
+    return returncode
@@ -0,0 +1,117 @@
+import ipaddress
+import os
+import tempfile
+from types import SimpleNamespace
+
+# Limitador e sessões em arquivos temporários, lidos na importação
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("RATE_LIMIT_DB", os.path.join(_tmp, "ratelimit.db"))
+os.environ.setdefault("CONCURRENCY_SLOTS_DIR", os.path.join(_tmp, "slots"))
+os.environ.setdefault("TERMINAL_SESSION_DB", os.path.join(_tmp, "sessions.db"))
+
+import app  # noqa: E402
+from admission import ConcurrencyLimiter, RateLimiter  # noqa: E402
+
+
+def request(peer, forwarded=None):
+    headers = {"x-forwarded-for": forwarded} if forwarded is not None else {}
+    return SimpleNamespace(client=SimpleNamespace(host=peer), headers=headers)
+
+
+def trust(monkeypatch, *networks):
+    monkeypatch.setattr(app, "TRUSTED_PROXIES", [ipaddress.ip_network(network) for network in networks])
+
+
+def test_forwarded_header_ignored_without_trusted_proxies(monkeypatch):
+    trust(monkeypatch)
+    assert app.client_ip(request("203.0.113.7", "1.2.3.4")) == "203.0.113.7"
+
+
+def test_forwarded_header_ignored_from_untrusted_peer(monkeypatch):
+    trust(monkeypatch, "172.16.0.0/12")
+    assert app.client_ip(request("203.0.113.7", "1.2.3.4")) == "203.0.113.7"
+
+
+def test_client_is_rightmost_untrusted_address(monkeypatch):
+    trust(monkeypatch, "172.16.0.0/12")
+    # "6.6.6.6" foi enviado pelo cliente; o Traefik acrescentou 5.5.5.5
+    assert app.client_ip(request("172.18.0.2", "6.6.6.6, 5.5.5.5")) == "5.5.5.5"
+    assert app.client_ip(request("172.18.0.2", "5.5.5.5, 172.18.0.9")) == "5.5.5.5"
+
+
+def test_trusted_peer_without_header_is_the_client(monkeypatch):
+    trust(monkeypatch, "172.16.0.0/12")
+    assert app.client_ip(request("172.18.0.2")) == "172.18.0.2"
+    assert app.client_ip(request("172.18.0.2", "172.18.0.3")) == "172.18.0.2"
+
+
+def test_token_bucket_allows_burst_then_limits(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "rl.db"))
+    bucket = [("ip:1.2.3.4", 1.0, 3.0)]
+    assert [limiter.acquire(bucket) for _ in range(3)] == [0, 0, 0]
+    wait = limiter.acquire(bucket)
+    assert 0 < wait <= 1
+    # Outra chave tem o próprio balde
+    assert limiter.acquire([("ip:5.6.7.8", 1.0, 3.0)]) == 0
+
+
+def test_denied_request_spends_no_token(tmp_path):
+    limiter = RateLimiter(str(tmp_path / "rl.db"))
+    ip, session = ("ip:1.2.3.4", 100.0, 2.0), ("session:s", 0.001, 1.0)
+    assert limiter.acquire([ip, session]) == 0
+    # A sessão está vazia: a requisição é recusada sem gastar a ficha do IP
+    assert limiter.acquire([ip, session]) > 0
+    assert limiter.acquire([ip]) == 0
+
+
+def test_bucket_is_shared_between_instances(tmp_path):
+    # Cada worker tem a sua instância apontando para o mesmo arquivo
+    path = str(tmp_path / "rl.db")
+    first, second = RateLimiter(path), RateLimiter(path)
+    bucket = [("ip:1.2.3.4", 0.001, 2.0)]
+    assert first.acquire(bucket) == 0
+    assert second.acquire(bucket) == 0
+    assert first.acquire(bucket) > 0
+
+
+def test_concurrency_slots(tmp_path):
+    slots = ConcurrencyLimiter(str(tmp_path / "slots"), 2)
+    first, second = slots.acquire(), slots.acquire()
+    assert first is not None and second is not None
+    assert slots.acquire() is None
+    # Fechar o arquivo libera a vaga, inclusive para outra instância
+    first.close()
+    third = ConcurrencyLimiter(str(tmp_path / "slots"), 2).acquire()
+    assert third is not None
+    second.close()
+    third.close()
+
+
+def test_chat_returns_429_with_retry_after_and_invalid_requests_spend_nothing(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(app, "limiter", RateLimiter(str(tmp_path / "rl.db")))
+    monkeypatch.setattr(app, "IP_BURST", 2.0)
+    monkeypatch.setattr(app, "IP_RATE", 0.01)
+    client = TestClient(app.app)
+    for _ in range(5):
+        assert client.post("/api/chat", json={"message": "   "}).status_code == 400
+    assert client.post("/api/chat", json={"message": "pwd"}).status_code == 200
+    assert client.post("/api/chat/stream", json={"message": "pwd"}).status_code == 200
+    limited = client.post("/api/chat", json={"message": "pwd"})
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+
+
+def test_chat_returns_429_when_all_slots_are_busy(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(app, "limiter", RateLimiter(str(tmp_path / "rl.db")))
+    slots = ConcurrencyLimiter(str(tmp_path / "slots"), 1)
+    monkeypatch.setattr(app, "slots", slots)
+    held = slots.acquire()
+    client = TestClient(app.app)
+    busy = client.post("/api/chat", json={"message": "pwd"})
+    assert busy.status_code == 429 and busy.headers["Retry-After"] == "1"
+    held.close()
+    assert client.post("/api/chat", json={"message": "pwd"}).status_code == 200
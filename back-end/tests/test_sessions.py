@@ -0,0 +1,64 @@
+import time
+
+from terminal.sessions import Session, SessionStore
+
+
+def make_store(tmp_path, ttl=60, max_sessions=100, max_bytes=1024 * 1024) -> SessionStore:
+    return SessionStore(str(tmp_path / "sessions.db"), ttl, max_sessions, max_bytes)
+
+
+def save_all(store, *sessions):
+    for session in sessions:
+        store.save(session)
+        # last_seen distinto para a ordem de descarte ser determinística
+        time.sleep(0.002)
+
+
+def stored(store):
+    conn = store._connection()
+    ids = {row[0] for row in conn.execute("SELECT id FROM sessions")}
+    totals = conn.execute("SELECT count, bytes FROM session_totals").fetchone()
+    # Os totais mantidos pelos triggers batem com a tabela
+    assert totals == conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions").fetchone()
+    return ids
+
+
+def test_saved_session_is_loaded_back(tmp_path):
+    store = make_store(tmp_path)
+    session = Session("s1", cwd="/home/user")
+    session.set_variable("NOME", "valor")
+    session.record("cd ..")
+    store.save(session)
+    loaded = store.load("s1")
+    assert (loaded.cwd, loaded.env["NOME"], loaded.history) == ("/home/user", "valor", ["cd .."])
+
+
+def test_expired_or_unknown_session_gets_new_id(tmp_path):
+    store = make_store(tmp_path, ttl=0.01)
+    store.save(Session("s1"))
+    time.sleep(0.02)
+    assert store.load("s1").id != "s1"
+    assert store.load("nao-existe").id != "nao-existe"
+
+
+def test_session_count_cap_evicts_least_recently_used(tmp_path):
+    store = make_store(tmp_path, max_sessions=3)
+    save_all(store, *(Session(f"s{index}") for index in range(5)))
+    assert stored(store) == {"s2", "s3", "s4"}
+    # Usar uma sessão antiga a protege do próximo descarte
+    save_all(store, Session("s2"), Session("s5"))
+    assert stored(store) == {"s2", "s4", "s5"}
+
+
+def test_byte_cap_evicts_until_total_fits(tmp_path):
+    size = len(Session("s0").to_json())
+    store = make_store(tmp_path, max_bytes=size * 3)
+    save_all(store, *(Session(f"s{index}") for index in range(3)))
+    assert stored(store) == {"s0", "s1", "s2"}
+    # Sessão que cresce (histórico) abre espaço descartando as mais antigas
+    big = Session("s2", history=["x" * size])
+    save_all(store, big)
+    assert stored(store) == {"s2"}
+    # A sessão gravada nunca é descartada, mesmo acima do limite sozinha
+    save_all(store, Session("s2", history=["x" * size * 5]))
+    assert stored(store) == {"s2"}
@@ -28,6 +28,8 @@ export default function TerminalChat() {
   const [historyIndex, setHistoryIndex] = useState(-1)
   const messagesEndRef = useRef<HTMLDivElement>(null)
   const inputRef = useRef<HTMLInputElement>(null)
+  // Back-end terminal session (working directory, variables and history)
+  const sessionIdRef = useRef<string | null>(null)
 
   // No auto-scrolling
   useEffect(() => {
@@ -79,27 +81,59 @@ export default function TerminalChat() {
     setIsLoading(true)
 
     try {
-      const response = await fetch("https://script4.store/api/chat", {
+      const response = await fetch("https://script4.store/api/chat/stream", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ message: inputMessage }),
+        body: JSON.stringify({ message: inputMessage, sessionId: sessionIdRef.current }),
       })
 
-      if (!response.ok) {
+      if (response.status === 429) {
+        // Rate limited or server busy: tell the user how long to wait
+        const retryAfter = response.headers.get("Retry-After") ?? "a few"
+        const botMessage: MessageType = {
+          type: "bot",
+          content: `Too many requests. Please wait ${retryAfter} second(s) and try again.`,
+        }
+        setMessages([...newMessages, botMessage])
+        return
+      }
+
+      if (!response.ok || !response.body) {
         throw new Error(`HTTP error! status: ${response.status}`)
       }
 
-      const data = await response.json()
-      const commandResponse = data.response as CommandResponse
-      const formattedOutput = formatCommandOutput(commandResponse)
-      
-      const botMessage: MessageType = { 
-        type: "bot", 
-        content: formattedOutput
+      // Output arrives as NDJSON lines and is rendered while it streams in
+      const commandResponse: CommandResponse = { stdout: "", stderr: "", returncode: 0 }
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let pending = ""
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        pending += decoder.decode(value, { stream: true })
+        const lines = pending.split("\n")
+        pending = lines.pop() ?? ""
+        for (const line of lines) {
+          if (!line) continue
+          const event = JSON.parse(line)
+          if (event.stdout !== undefined) commandResponse.stdout += event.stdout
+          if (event.stderr !== undefined) commandResponse.stderr += event.stderr
+          if (event.returncode !== undefined) commandResponse.returncode = event.returncode
+          if (event.sessionId) sessionIdRef.current = event.sessionId
+        }
+
+        const botMessage: MessageType = {
+          type: "bot",
+          content: formatCommandOutput({
+            ...commandResponse,
+            stdout: commandResponse.stdout.trimEnd(),
+            stderr: commandResponse.stderr.trimEnd(),
+          }),
+        }
+        setMessages([...newMessages, botMessage])
       }
-      setMessages([...newMessages, botMessage])
     } catch (error) {
       console.error("Error:", error)
       const errorMessage: MessageType = {
@@ -0,0 +1,82 @@
+"""Micro-benchmarks do backend JSON: decode do documento e encode de connected-devices.
+
+Uso (a partir de tvm/roteador/back-end):
+    python -m bench.bench_json [--hosts 1000] [--repeat 50]
+"""
+import argparse
+import json
+import timeit
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from bench.synthetic import apply_projection, make_device_document
+from host_index import HostTable
+from tr069_models import HOSTS_PATH, LAST_INFORM_PATH, collapse_parameter, parse_device
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def decode_cases() -> Dict[str, Callable[[bytes], Any]]:
+    cases: Dict[str, Callable[[bytes], Any]] = {
+        "json.loads": lambda body: json.loads(body),
+        "json.loads + registros": lambda body: parse_device(json.loads(body)[0]),
+        "object_hook + registros": lambda body: parse_device(json.loads(body, object_hook=collapse_parameter)[0]),
+    }
+    if orjson is not None:
+        cases["orjson.loads"] = lambda body: orjson.loads(body)
+        cases["orjson.loads + registros"] = lambda body: parse_device(orjson.loads(body)[0])
+    return cases
+
+
+def encode_cases() -> Dict[str, Callable[[Any], bytes]]:
+    # "encoder" = caminho padrão do FastAPI para rotas que retornam dict/list
+    cases: Dict[str, Callable[[Any], bytes]] = {
+        "encoder + JSONResponse": lambda content: JSONResponse(jsonable_encoder(content)).body,
+        "JSONResponse direto": lambda content: JSONResponse(content).body,
+    }
+    if orjson is not None:
+        options = orjson.OPT_NON_STR_KEYS
+        cases["encoder + orjson"] = lambda content: orjson.dumps(jsonable_encoder(content), option=options)
+        cases["orjson direto"] = lambda content: orjson.dumps(content, option=options)
+    return cases
+
+
+def report(label: str, cases: Dict[str, Callable[[Any], Any]], payload: Any, repeat: int) -> None:
+    baseline = None
+    for name, case in cases.items():
+        ms = timeit.timeit(lambda: case(payload), number=repeat) / repeat * 1000
+        baseline = baseline or ms
+        print(f"{label:<22} {name:<26} {ms:>9.3f} {baseline / ms:>7.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("orjson não instalado: apenas a stdlib será medida")
+
+    document = make_device_document(args.hosts)
+    full = json.dumps([document]).encode()
+    projected = json.dumps([apply_projection(document, [LAST_INFORM_PATH, HOSTS_PATH])]).encode()
+
+    table = HostTable()
+    table.apply(parse_device(document).hosts)
+    hosts = table.hosts()
+
+    print(f"{'caminho':<22} {'estratégia':<26} {'ms':>9} {'ganho':>8}")
+    report("decode (doc. todo)", decode_cases(), full, args.repeat)
+    report("decode (hosts)", decode_cases(), projected, args.repeat)
+    report("encode hosts", encode_cases(), hosts, args.repeat)
+    report("encode delta", encode_cases(), table.delta(0), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
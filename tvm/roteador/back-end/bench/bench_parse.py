@@ -0,0 +1,57 @@
+"""Compara tempo de parse e memória da árvore bruta vs. registros compactos.
+
+Uso (a partir de tvm/roteador/back-end):
+    python -m bench.bench_parse [--hosts 1000] [--repeat 20]
+"""
+import argparse
+import gc
+import json
+import timeit
+import tracemalloc
+from typing import Any, Callable, Tuple
+
+from bench.synthetic import apply_projection, make_device_document
+from tr069_models import HOSTS_PATH, LAST_INFORM_PATH, collapse_parameter, parse_device
+
+STRATEGIES = {
+    # O que os handlers faziam: a árvore inteira fica viva (no cache)
+    "json.loads (árvore)": lambda body: json.loads(body)[0],
+    "json.loads + registros": lambda body: parse_device(json.loads(body)[0]),
+    # loads_compact com a stdlib (com orjson não há object_hook; ver bench_json)
+    "object_hook + registros": lambda body: parse_device(json.loads(body, object_hook=collapse_parameter)[0]),
+}
+
+
+def measure_memory(parse: Callable[[bytes], Any], body: bytes) -> Tuple[int, int]:
+    """(bytes retidos pelo resultado, pico durante o parse)"""
+    gc.collect()
+    tracemalloc.start()
+    result = parse(body)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    document = make_device_document(args.hosts)
+    bodies = {
+        "documento todo": json.dumps([document]).encode(),
+        "connected-devices": json.dumps([apply_projection(document, [LAST_INFORM_PATH, HOSTS_PATH])]).encode(),
+    }
+
+    print(f"{'corpo':<18} {'estratégia':<26} {'parse ms':>9} {'retido KiB':>11} {'pico KiB':>10}")
+    for label, body in bodies.items():
+        for name, parse in STRATEGIES.items():
+            ms = timeit.timeit(lambda: parse(body), number=args.repeat) / args.repeat * 1000
+            retained, peak = measure_memory(parse, body)
+            print(f"{label:<18} {name:<26} {ms:>9.2f} {retained / 1024:>11.1f} {peak / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Compara bytes e tempo de parse do documento completo vs. projeções.
+
+Uso (a partir de tvm/roteador/back-end):
+    python -m bench.bench_projection [--hosts 10 100 1000 5000] [--repeat 20]
+"""
+import argparse
+import json
+import timeit
+
+from bench.synthetic import apply_projection, make_device_document
+from tr069_models import HOSTS_PATH, LAST_INFORM_PATH, PING_PATH, WLAN_PATH
+
+# Projeções usadas por cada endpoint em router_api.py
+ENDPOINT_PROJECTIONS = {
+    "online": [LAST_INFORM_PATH],
+    "wifi-config": [WLAN_PATH],
+    "connected-devices": [LAST_INFORM_PATH, HOSTS_PATH],
+    "latency": [PING_PATH],
+}
+
+
+def measure(payload: str, repeat: int) -> float:
+    """Tempo médio (ms) de json.loads sobre o corpo da resposta"""
+    return timeit.timeit(lambda: json.loads(payload), number=repeat) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'hosts':>6} {'endpoint':<18} {'bytes':>12} {'parse ms':>10} {'bytes %':>8} {'parse %':>8}")
+    for hosts in args.hosts:
+        document = make_device_document(hosts)
+        full = json.dumps([document])
+        full_ms = measure(full, args.repeat)
+        print(f"{hosts:>6} {'(documento todo)':<18} {len(full):>12,} {full_ms:>10.3f} {100:>7}% {100:>7}%")
+        for endpoint, paths in ENDPOINT_PROJECTIONS.items():
+            body = json.dumps([apply_projection(document, paths)])
+            ms = measure(body, args.repeat)
+            print(
+                f"{hosts:>6} {endpoint:<18} {len(body):>12,} {ms:>10.3f} "
+                f"{100 * len(body) / len(full):>7.1f}% {100 * ms / full_ms:>7.1f}%"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Servidor NBI do GenieACS simulado, para testes de carga sem ACS nem roteador.
+
+Implementa o subconjunto usado pela API:
+    GET  /devices/?query=...&projection=...&limit=...&skip=...
+    POST /devices/{id}/tasks?connection_request
+    GET  /tasks/?query=...
+
+Latência, duração e falhas das tasks, dispositivos offline e erros 5xx são
+configuráveis. As tasks setParameterValues concluídas são aplicadas no
+documento, então leituras posteriores refletem as escritas.
+
+Uso (a partir de tvm/roteador/back-end):
+    python -m bench.fake_genieacs [--port 7557] [--devices 100] [--hosts 20] \\
+        [--latency 0.02] [--task-duration 0.5] [--failure-rate 0.01]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import FastAPI, Request, Response
+
+import json_codec
+from bench.synthetic import make_device_document
+
+DEVICE_ID_PREFIX = "202BC1-BM632w-"
+
+
+def device_id(index: int) -> str:
+    # O índice 0 coincide com o ROUTER_ID padrão da API
+    return f"{DEVICE_ID_PREFIX}{index:06d}"
+
+
+@dataclass
+class FakeConfig:
+    devices: int = 100
+    hosts: int = 20
+    latency: float = 0.02  # segundos por requisição (média)
+    jitter: float = 0.01  # variação uniforme em torno da latência
+    task_duration: float = 0.5  # segundos até a task ser executada pela CPE
+    task_fault_rate: float = 0.0  # fração de tasks que terminam com fault
+    failure_rate: float = 0.0  # fração de requisições respondidas com 500
+    offline_rate: float = 0.0  # fração de dispositivos sem inform recente
+    task_retention: float = 2.0  # segundos que uma task concluída continua em /tasks
+
+
+@dataclass
+class FakeTask:
+    document: Dict[str, Any]
+    due: float
+    fault: bool
+    finished: Optional[float] = None
+
+
+@dataclass
+class FakeState:
+    config: FakeConfig
+    devices: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    offline: Set[str] = field(default_factory=set)
+    tasks: Dict[str, FakeTask] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, config: FakeConfig) -> "FakeState":
+        state = cls(config)
+        for index in range(config.devices):
+            document = make_device_document(config.hosts, device_id(index))
+            state.devices[document["_id"]] = document
+            # O dispositivo padrão fica sempre online
+            if index and random.random() < config.offline_rate:
+                state.offline.add(document["_id"])
+                document["_lastInform"] = _iso(datetime.now(timezone.utc) - timedelta(days=1))
+        return state
+
+    def refresh_inform(self, document: Dict[str, Any]) -> None:
+        """Dispositivos online informam continuamente"""
+        if document["_id"] not in self.offline:
+            document["_lastInform"] = _iso(datetime.now(timezone.utc))
+
+    def advance_tasks(self) -> None:
+        now = time.monotonic()
+        for task_id, task in list(self.tasks.items()):
+            if task.finished is not None:
+                if now - task.finished > self.config.task_retention:
+                    # Como no GenieACS, tasks concluídas somem de /tasks
+                    del self.tasks[task_id]
+                continue
+            device = task.document["device"]
+            if now < task.due or device in self.offline:
+                continue
+            task.finished = now
+            if task.fault:
+                task.document["fault"] = {"code": "cwmp.9002", "message": "Internal error", "detail": "Falha simulada"}
+                continue
+            task.document["status"] = "completed"
+            apply_task(self.devices[device], task.document)
+
+
+def _iso(value: datetime) -> str:
+    return value.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def resolve(document: Dict[str, Any], path: str) -> Any:
+    node: Any = document
+    for part in path.split("."):
+        if not isinstance(node, dict) or part not in node:
+            return None
+        node = node[part]
+    return node.get("_value") if isinstance(node, dict) and "_value" in node else node
+
+
+def matches(document: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    """Subconjunto da sintaxe de query do MongoDB usada pelo NBI"""
+    for path, condition in query.items():
+        value = resolve(document, path)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for operator, operand in condition.items():
+            if operator == "$in" and value not in operand:
+                return False
+            if operator == "$nin" and value in operand:
+                return False
+            if operator == "$ne" and value == operand:
+                return False
+            if operator in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if operator == "$gt" and not value > operand:
+                    return False
+                if operator == "$gte" and not value >= operand:
+                    return False
+                if operator == "$lt" and not value < operand:
+                    return False
+                if operator == "$lte" and not value <= operand:
+                    return False
+    return True
+
+
+def project(document: Dict[str, Any], paths: List[str]) -> Dict[str, Any]:
+    """Projeção sem cópia: a resposta é serializada em seguida"""
+    result: Dict[str, Any] = {"_id": document["_id"]}
+    for path in paths:
+        parts = path.split(".")
+        source: Any = document
+        for part in parts:
+            source = source.get(part) if isinstance(source, dict) else None
+        if source is None:
+            continue
+        target = result
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = source
+    return result
+
+
+def parse_projection(raw: Optional[str]) -> Optional[List[str]]:
+    if not raw:
+        return None
+    if raw.lstrip().startswith("{"):
+        return [path for path, enabled in json.loads(raw).items() if enabled]
+    return [path for path in raw.split(",") if path]
+
+
+def apply_task(document: Dict[str, Any], task: Dict[str, Any]) -> None:
+    if task.get("name") == "setParameterValues":
+        for path, value, type_ in task.get("parameterValues", []):
+            node = document
+            parts = path.split(".")
+            for part in parts[:-1]:
+                node = node.setdefault(part, {})
+            param = node.setdefault(parts[-1], {"_writable": True})
+            if path.endswith("DiagnosticsState") and value == "Requested":
+                # A CPE executa o diagnóstico junto com a task
+                value = "Complete"
+            param.update({"_value": value, "_type": type_, "_timestamp": _iso(datetime.now(timezone.utc))})
+
+
+def json_response(content: Any, status_code: int = 200) -> Response:
+    return Response(json_codec.dumps(content), status_code=status_code, media_type="application/json")
+
+
+def create_app(config: FakeConfig) -> FastAPI:
+    state = FakeState.build(config)
+    app = FastAPI()
+    app.state.fake = state
+
+    async def simulate() -> Optional[Response]:
+        delay = config.latency + random.uniform(-config.jitter, config.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if config.failure_rate and random.random() < config.failure_rate:
+            return json_response({"error": "Falha simulada"}, 500)
+        state.advance_tasks()
+        return None
+
+    @app.get("/devices/")
+    @app.get("/devices")
+    async def get_devices(
+        query: str = "{}",
+        projection: Optional[str] = None,
+        limit: Optional[int] = None,
+        skip: int = 0,
+    ):
+        failure = await simulate()
+        if failure is not None:
+            return failure
+        conditions = json.loads(query)
+        paths = parse_projection(projection)
+        ids = conditions.get("_id")
+        if isinstance(ids, str):
+            # Caminho rápido para a busca mais comum (um dispositivo)
+            candidates = [state.devices[ids]] if ids in state.devices else []
+        else:
+            candidates = list(state.devices.values())
+        selected = [document for document in candidates if matches(document, conditions)]
+        selected = selected[skip:skip + limit] if limit is not None else selected[skip:]
+        for document in selected:
+            state.refresh_inform(document)
+        return json_response([project(document, paths) if paths else document for document in selected])
+
+    @app.post("/devices/{device}/tasks")
+    async def create_task(device: str, request: Request):
+        failure = await simulate()
+        if failure is not None:
+            return failure
+        if device not in state.devices:
+            return json_response({"error": "Dispositivo não encontrado"}, 404)
+        task = await request.json()
+        task.update({
+            "_id": uuid.uuid4().hex[:24],
+            "device": device,
+            "timestamp": _iso(datetime.now(timezone.utc)),
+            "status": "pending",
+        })
+        fault = bool(config.task_fault_rate) and random.random() < config.task_fault_rate
+        state.tasks[task["_id"]] = FakeTask(task, time.monotonic() + config.task_duration, fault)
+        # Com connection_request o GenieACS responde 202 quando a task fica na fila
+        return json_response(task, 202)
+
+    @app.get("/tasks/")
+    @app.get("/tasks")
+    async def get_tasks(query: str = "{}"):
+        failure = await simulate()
+        if failure is not None:
+            return failure
+        conditions = json.loads(query)
+        return json_response([task.document for task in state.tasks.values() if matches(task.document, conditions)])
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7557)
+    defaults = FakeConfig()
+    for name, value in vars(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeConfig(**{name: getattr(args, name) for name in vars(defaults)})
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
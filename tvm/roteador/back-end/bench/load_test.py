@@ -0,0 +1,221 @@
+"""Teste de carga da API: p50/p99 e vazão por endpoint.
+
+Com ``--start`` sobe o GenieACS simulado (bench.fake_genieacs) e a API
+(uvicorn router_api:app) em subprocessos, com um SQLite temporário; sem ele,
+mede a API já em execução em ``--api``.
+
+Uso (a partir de tvm/roteador/back-end):
+    python -m bench.load_test --start [--devices 100] [--latency 0.02] \\
+        [--concurrency 20] [--duration 10] [--endpoints wifi-config connected-devices] \\
+        [--output resultado.json] [--baseline anterior.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from bench.fake_genieacs import FakeConfig, device_id
+from latency_sampler import percentile
+
+API = "/tvm-roteador/api"
+BodyFactory = Optional[Callable[[int], Dict[str, Any]]]
+
+# Nome -> (método, caminho com {device}, corpo por iteração)
+SCENARIOS: Dict[str, Tuple[str, str, BodyFactory]] = {
+    "devices": ("GET", f"{API}/devices", None),
+    "wifi-config": ("GET", f"{API}/devices/{{device}}/wifi-config", None),
+    "connected-devices": ("GET", f"{API}/devices/{{device}}/connected-devices", None),
+    "latency": ("GET", f"{API}/devices/{{device}}/latency", None),
+    "configure-wifi": (
+        "POST", f"{API}/devices/{{device}}/configure-wifi",
+        lambda i: {"ssid": f"bench-{i}", "password": "senha-bench"},
+    ),
+    "manage-device": (
+        "POST", f"{API}/devices/{{device}}/manage-device",
+        lambda i: {"deviceId": f"02:00:00:00:00:{i % 20 + 1:02X}", "action": "block" if i % 2 else "unblock"},
+    ),
+    "fleet-status": ("POST", f"{API}/fleet/status", lambda i: {}),
+    "metrics": ("GET", "/metrics", None),
+}
+
+
+@dataclass
+class Result:
+    endpoint: str
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+
+    @property
+    def errors(self) -> int:
+        return sum(count for status, count in self.statuses.items() if not 200 <= status < 300)
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        return {
+            "endpoint": self.endpoint,
+            "requests": len(ordered),
+            "errors": self.errors,
+            "throughput": len(ordered) / self.elapsed if self.elapsed else 0,
+            "p50": percentile(ordered, 50) * 1000,
+            "p90": percentile(ordered, 90) * 1000,
+            "p99": percentile(ordered, 99) * 1000,
+            "max": (ordered[-1] if ordered else 0) * 1000,
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+        }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    concurrency: int,
+    duration: float,
+    devices: int,
+) -> Result:
+    method, path, body = SCENARIOS[endpoint]
+    result = Result(endpoint)
+    deadline = time.perf_counter() + duration
+    counter = iter(range(sys.maxsize))
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            i = next(counter)
+            url = path.format(device=device_id(random.randrange(devices)))
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body(i) if body else None)
+                status = response.status_code
+            except httpx.HTTPError:
+                # Falha de transporte (timeout, conexão recusada): status 0
+                status = 0
+            result.latencies.append(time.perf_counter() - start)
+            result.statuses[status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def print_report(summaries: List[Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+    print(f"{'endpoint':<18} {'reqs':>6} {'erros':>6} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for summary in summaries:
+        line = (
+            f"{summary['endpoint']:<18} {summary['requests']:>6} {summary['errors']:>6} {summary['throughput']:>8.1f} "
+            f"{summary['p50']:>8.1f} {summary['p90']:>8.1f} {summary['p99']:>8.1f} {summary['max']:>8.1f}"
+        )
+        previous = (baseline or {}).get(summary["endpoint"])
+        if previous and previous["p50"] and previous["p99"]:
+            line += (
+                f"  p50 {100 * (summary['p50'] / previous['p50'] - 1):+.0f}%"
+                f"  p99 {100 * (summary['p99'] / previous['p99'] - 1):+.0f}%"
+            )
+        print(line)
+        if summary["errors"]:
+            print(f"{'':<18} status: {summary['statuses']}")
+
+
+def wait_ready(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} não respondeu em {timeout}s")
+
+
+@contextmanager
+def local_stack(args: argparse.Namespace) -> Iterator[str]:
+    """Sobe GenieACS simulado + API e retorna a URL da API"""
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    api_url = f"http://127.0.0.1:{args.api_port}"
+    fake_args = [
+        f"--{name.replace('_', '-')}={getattr(args, name)}" for name in vars(FakeConfig()) if hasattr(args, name)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            GENIEACS_URL=fake_url,
+            MAC_FILTER_DB=os.path.join(tmp, "router_state.db"),
+            LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"),
+        )
+        processes = [
+            subprocess.Popen([sys.executable, "-m", "bench.fake_genieacs", f"--port={args.fake_port}", *fake_args]),
+        ]
+        try:
+            wait_ready(f"{fake_url}/devices/?query=%7B%7D&limit=1")
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "router_api:app", "--port", str(args.api_port), "--log-level", "warning"],
+                env=env,
+            ))
+            wait_ready(f"{api_url}/metrics")
+            yield api_url
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+                process.wait(10)
+
+
+async def run(api_url: str, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    summaries = []
+    async with httpx.AsyncClient(base_url=api_url, timeout=args.timeout, limits=limits) as client:
+        for endpoint in args.endpoints:
+            if args.warmup:
+                await run_scenario(client, endpoint, args.concurrency, args.warmup, args.devices)
+            result = await run_scenario(client, endpoint, args.concurrency, args.duration, args.devices)
+            summaries.append(result.summary())
+    return summaries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--api", default="http://127.0.0.1:8000", help="URL da API (ignorada com --start)")
+    parser.add_argument("--start", action="store_true", help="sobe o GenieACS simulado e a API localmente")
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument("--fake-port", type=int, default=7557)
+    parser.add_argument("--endpoints", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10, help="segundos de medição por endpoint")
+    parser.add_argument("--warmup", type=float, default=1, help="segundos de aquecimento por endpoint")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", help="grava o resultado em JSON")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar p50/p99")
+    # Parâmetros do GenieACS simulado (usados com --start)
+    for name, value in vars(FakeConfig()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = {summary["endpoint"]: summary for summary in json.load(file)["results"]}
+
+    if args.start:
+        with local_stack(args) as api_url:
+            summaries = asyncio.run(run(api_url, args))
+    else:
+        summaries = asyncio.run(run(args.api, args))
+
+    print_report(summaries, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"config": vars(args), "results": summaries}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
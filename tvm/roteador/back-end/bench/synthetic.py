@@ -0,0 +1,115 @@
+"""Geração de documentos TR-069 sintéticos no formato do NBI do GenieACS"""
+import copy
+import random
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+
+def _param(value: Any, type_: str = "xsd:string", writable: bool = False) -> Dict[str, Any]:
+    return {
+        "_value": value,
+        "_type": type_,
+        "_timestamp": "2024-01-01T00:00:00.000Z",
+        "_writable": writable,
+    }
+
+
+def _mac(index: int) -> str:
+    return ":".join(f"{b:02X}" for b in (0x02, 0x00, (index >> 24) & 0xFF, (index >> 16) & 0xFF, (index >> 8) & 0xFF, index & 0xFF))
+
+
+def make_host(index: int) -> Dict[str, Any]:
+    return {
+        "_object": True,
+        "_writable": False,
+        "MACAddress": _param(_mac(index)),
+        "HostName": _param(f"host-{index}"),
+        "IPAddress": _param(f"192.168.{(index >> 8) & 0xFF}.{index & 0xFF}"),
+        "AddressSource": _param("DHCP"),
+        "LeaseTimeRemaining": _param(random.randint(0, 86400), "xsd:int"),
+        "InterfaceType": _param("802.11"),
+        "Active": _param(True, "xsd:boolean"),
+        "Layer2Interface": _param("InternetGatewayDevice.LANDevice.1.WLANConfiguration.1"),
+    }
+
+
+def make_device_document(
+    hosts: int = 1000,
+    device_id: str = "202BC1-BM632w-000000",
+    last_inform: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Monta um documento de dispositivo com ``hosts`` entradas em Hosts.Host"""
+    last_inform = last_inform or datetime.now(timezone.utc)
+    # Subárvores que não são lidas pela API, mas pesam no documento completo
+    wan = {
+        str(i): {
+            f"Param{j}": _param(f"value-{i}-{j}") for j in range(40)
+        }
+        for i in range(1, 9)
+    }
+    return {
+        "_id": device_id,
+        "_lastInform": last_inform.isoformat().replace("+00:00", "Z"),
+        "_registered": "2024-01-01T00:00:00.000Z",
+        "_deviceId": {
+            "_Manufacturer": "Huawei",
+            "_OUI": device_id.split("-")[0],
+            "_ProductClass": "BM632w",
+            "_SerialNumber": device_id.split("-")[-1],
+        },
+        "InternetGatewayDevice": {
+            "DeviceInfo": {f"Info{j}": _param(f"info-{j}") for j in range(60)},
+            "WANDevice": {"1": {"WANConnectionDevice": wan}},
+            "IPPingDiagnostics": {
+                "DiagnosticsState": _param("Complete"),
+                "Host": _param("8.8.8.8"),
+                "NumberOfRepetitions": _param(3, "xsd:unsignedInt"),
+                "SuccessCount": _param(3, "xsd:unsignedInt"),
+                "FailureCount": _param(0, "xsd:unsignedInt"),
+                "AverageResponseTime": _param(12, "xsd:unsignedInt"),
+                "MinimumResponseTime": _param(10, "xsd:unsignedInt"),
+                "MaximumResponseTime": _param(15, "xsd:unsignedInt"),
+            },
+            "LANDevice": {
+                "1": {
+                    "WLANConfiguration": {
+                        "1": {
+                            "SSID": _param("TVM-Fibra", writable=True),
+                            "Enable": _param(True, "xsd:boolean", True),
+                            "BeaconType": _param("WPAbeacon", writable=True),
+                            "MACAddressControlEnabled": _param(False, "xsd:boolean", True),
+                            "X_HUAWEI_WlanMacFilterpolicy": _param("deny", writable=True),
+                            "X_HUAWEI_WlanMacFilterMac": _param("", writable=True),
+                            "PreSharedKey": {
+                                "1": {"PreSharedKey": _param("senha-secreta", writable=True)}
+                            },
+                        }
+                    },
+                    "Hosts": {
+                        "HostNumberOfEntries": _param(hosts, "xsd:unsignedInt"),
+                        "Host": {str(i): make_host(i) for i in range(1, hosts + 1)},
+                    },
+                }
+            },
+        },
+    }
+
+
+def apply_projection(document: Dict[str, Any], paths: Iterable[str]) -> Dict[str, Any]:
+    """Aplica uma projeção no estilo do GenieACS (``_id`` sempre incluído)"""
+    result: Dict[str, Any] = {"_id": document["_id"]}
+    for path in paths:
+        source: Any = document
+        parts = path.split(".")
+        for part in parts:
+            if not isinstance(source, dict) or part not in source:
+                source = None
+                break
+            source = source[part]
+        if source is None:
+            continue
+        target = result
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = copy.deepcopy(source)
+    return result
@@ -0,0 +1,83 @@
+import logging
+import random
+import time
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(HTTPException):
+    """Falha imediata enquanto o circuito do GenieACS está aberto"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail="GenieACS indisponível, tente novamente em instantes",
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+
+
+class CircuitBreaker:
+    """Circuit breaker com sondagem half-open.
+
+    Após ``failure_threshold`` falhas consecutivas o circuito abre e as
+    chamadas falham imediatamente. Passados ``reset_timeout`` segundos, até
+    ``half_open_max_calls`` chamadas de sonda são liberadas: um sucesso fecha
+    o circuito, uma falha o reabre.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probes = 0
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def before_call(self) -> None:
+        """Reserva a chamada ou levanta CircuitOpenError"""
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                raise CircuitOpenError(self.retry_after())
+            self.state = HALF_OPEN
+            self._probes = 0
+            logger.info("Circuito do GenieACS half-open, liberando sonda")
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                raise CircuitOpenError(1)
+            self._probes += 1
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logger.info("GenieACS respondeu, circuito fechado")
+        self.state = CLOSED
+        self.failures = 0
+        self._probes = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning(f"Circuito do GenieACS aberto após {self.failures} falhas consecutivas")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self._probes = 0
+
+    def release(self) -> None:
+        """Devolve a vaga de sonda de uma chamada sem resultado (ex.: cancelada)"""
+        if self.state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """Backoff exponencial com jitter completo: uniforme em [0, min(max, base * 2^n)]"""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
@@ -0,0 +1,70 @@
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Coroutine, Iterator, Optional
+
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Instante (time.monotonic) em que a requisição atual estoura o orçamento
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=504, detail="Tempo limite da requisição excedido")
+
+
+def remaining() -> Optional[float]:
+    """Segundos restantes do orçamento atual (None se não houver)"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def bound(timeout: Optional[float]) -> Optional[float]:
+    """Limita um timeout ao orçamento restante; 504 se ele já acabou"""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded()
+    return left if timeout is None else min(timeout, left)
+
+
+@contextmanager
+def budget(seconds: float) -> Iterator[None]:
+    """Define um orçamento de ``seconds``, sem estender um orçamento já mais curto"""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def spawn(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    """Cria uma task de fundo sem herdar o orçamento da requisição que a iniciou"""
+    context = contextvars.copy_context()
+    context.run(_deadline.set, None)
+    return asyncio.create_task(coro, context=context)
+
+
+class DeadlineMiddleware:
+    """Aplica um orçamento fim a fim a cada requisição HTTP.
+
+    O orçamento é cooperativo: as chamadas ao GenieACS, esperas por tasks e
+    pausas entre tentativas usam ``bound`` e falham com 504 quando ele acaba.
+    """
+
+    def __init__(self, app: ASGIApp, seconds: float):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+        with budget(self.seconds):
+            await self.app(scope, receive, send)
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from deadline import DeadlineExceeded, bound, spawn
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceCache:
+    """Cache em memória com TTL e single-flight para documentos de dispositivos.
+
+    As entradas são agrupadas por dispositivo e indexadas por ``variant``, que
+    identifica a projeção buscada. Buscas concorrentes pela mesma chave enquanto
+    não há entrada válida são agrupadas em uma única requisição ao GenieACS.
+    Resultados ``None`` (erro ou dispositivo inexistente) não são armazenados.
+    Entradas vencidas são removidas em varreduras feitas no máximo uma vez
+    por TTL, para que documentos (com senhas de Wi-Fi) não fiquem na memória
+    de roteadores que não são mais consultados.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Dict[Hashable, Tuple[float, Any]]] = {}
+        self._inflight: Dict[str, Dict[Hashable, asyncio.Future]] = {}
+        self._next_prune = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    async def get(
+        self,
+        device_id: str,
+        loader: Callable[[], Awaitable[Any]],
+        variant: Hashable = None,
+    ) -> Any:
+        self._prune(time.monotonic())
+        value = self.peek(device_id, variant)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        inflight = self._inflight.setdefault(device_id, {})
+        future = inflight.get(variant)
+        if future is None:
+            # A carga é compartilhada: não herda o orçamento de quem a iniciou
+            future = spawn(self._load(device_id, variant, loader))
+            inflight[variant] = future
+        # shield: o cancelamento de um chamador não cancela a carga compartilhada;
+        # cada chamador espera no máximo o próprio orçamento
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), bound(None))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded()
+
+    async def _load(
+        self,
+        device_id: str,
+        variant: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        try:
+            value = await loader()
+            # Uma invalidação durante a carga remove esta task de _inflight:
+            # o valor pode estar desatualizado e não é armazenado
+            if value is not None and self.ttl > 0 and self._is_current(device_id, variant):
+                now = time.monotonic()
+                self._entries.setdefault(device_id, {})[variant] = (now + self.ttl, value)
+                self._prune(now)
+            return value
+        finally:
+            if self._is_current(device_id, variant):
+                inflight = self._inflight[device_id]
+                del inflight[variant]
+                if not inflight:
+                    del self._inflight[device_id]
+
+    def _is_current(self, device_id: str, variant: Hashable) -> bool:
+        return self._inflight.get(device_id, {}).get(variant) is asyncio.current_task()
+
+    def _prune(self, now: float) -> None:
+        """Remove as entradas vencidas de todos os dispositivos"""
+        if now < self._next_prune:
+            return
+        self._next_prune = now + self.ttl
+        for device_id in list(self._entries):
+            variants = self._entries[device_id]
+            for variant in [variant for variant, (expires, _) in variants.items() if expires <= now]:
+                del variants[variant]
+            if not variants:
+                del self._entries[device_id]
+
+    def peek(self, device_id: str, variant: Hashable = None) -> Optional[Any]:
+        """Retorna a entrada em cache, se ainda válida, sem consultar o GenieACS"""
+        entry = self._entries.get(device_id, {}).get(variant)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def invalidate(self, device_id: str) -> None:
+        """Descarta todas as projeções em cache de um dispositivo"""
+        logger.debug(f"Invalidando cache do dispositivo {device_id}")
+        self._entries.pop(device_id, None)
+        self._inflight.pop(device_id, None)
+
+    def clear(self) -> None:
+        for device_id in set(self._entries) | set(self._inflight):
+            self.invalidate(device_id)
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from genieacs_client import GenieACSClient, build_projection
+
+logger = logging.getLogger(__name__)
+
+# Janela para considerar o dispositivo online a partir do último inform
+ONLINE_WINDOW = timedelta(minutes=5)
+
+# Projeção barata usada na sincronização: apenas identificação e último inform
+REGISTRY_PROJECTION = ["_id", "_lastInform", "_deviceId"]
+
+
+def parse_last_inform(value: Any) -> Optional[datetime]:
+    """Converte o _lastInform do GenieACS (ISO 8601) para datetime"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except (ValueError, TypeError) as e:
+        logger.error(f"Erro ao processar data do último inform: {str(e)}")
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def is_recent_inform(last_inform: Optional[datetime]) -> bool:
+    if last_inform is None:
+        return False
+    return datetime.now(last_inform.tzinfo) - last_inform < ONLINE_WINDOW
+
+
+# Campos de _deviceId -> atributos do registro
+DEVICE_ID_FIELDS = {
+    "_Manufacturer": "manufacturer",
+    "_ProductClass": "product_class",
+    "_SerialNumber": "serial_number",
+}
+
+
+@dataclass
+class DeviceRecord:
+    device_id: str
+    last_inform: Optional[datetime] = None
+    manufacturer: str = ""
+    product_class: str = ""
+    serial_number: str = ""
+
+    @property
+    def online(self) -> bool:
+        return is_recent_inform(self.last_inform)
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "DeviceRecord":
+        device_info = document.get("_deviceId", {}) or {}
+        return cls(
+            device_id=document["_id"],
+            last_inform=parse_last_inform(document.get("_lastInform")),
+            manufacturer=device_info.get("_Manufacturer", ""),
+            product_class=device_info.get("_ProductClass", ""),
+            serial_number=device_info.get("_SerialNumber", ""),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.device_id,
+            "online": self.online,
+            "lastInform": self.last_inform.isoformat() if self.last_inform else None,
+            "manufacturer": self.manufacturer,
+            "productClass": self.product_class,
+            "serialNumber": self.serial_number,
+        }
+
+
+class DeviceRegistry:
+    """Índice em memória dos dispositivos conhecidos pelo GenieACS.
+
+    Sincronizado periodicamente a partir de ``/devices`` com uma projeção
+    mínima, permite buscas e checagens de estado online em O(1) por
+    dispositivo, sem uma consulta ao GenieACS por requisição.
+    """
+
+    def __init__(self, client: GenieACSClient, sync_interval: float = 60, page_size: int = 1000):
+        self.client = client
+        self.sync_interval = sync_interval
+        self.page_size = page_size
+        self._devices: Dict[str, DeviceRecord] = {}
+        self.last_sync: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._devices
+
+    def __iter__(self) -> Iterator[DeviceRecord]:
+        return iter(list(self._devices.values()))
+
+    def get(self, device_id: str) -> Optional[DeviceRecord]:
+        return self._devices.get(device_id)
+
+    def ids(self) -> List[str]:
+        return list(self._devices)
+
+    def upsert(self, document: Dict[str, Any]) -> Optional[DeviceRecord]:
+        """Atualiza o registro com os campos presentes no documento (ou projeção).
+
+        Projeções sem ``_lastInform`` (ex.: só a WLAN) não criam registro: o
+        roteador apareceria offline em /devices até a próxima sincronização.
+        """
+        record = self._devices.get(document["_id"])
+        if record is None:
+            if not document.get("_lastInform"):
+                return None
+            record = DeviceRecord.from_document(document)
+            self._devices[record.device_id] = record
+            return record
+        if document.get("_lastInform"):
+            record.last_inform = parse_last_inform(document["_lastInform"])
+        device_info = document.get("_deviceId") or {}
+        for key, field_name in DEVICE_ID_FIELDS.items():
+            if key in device_info:
+                setattr(record, field_name, device_info[key])
+        return record
+
+    async def sync(self) -> int:
+        """Recarrega o índice completo, paginando /devices"""
+        devices: Dict[str, DeviceRecord] = {}
+        projection = build_projection(REGISTRY_PROJECTION)
+        async for document in self.client.iter_devices({}, projection, self.page_size):
+            record = DeviceRecord.from_document(document)
+            devices[record.device_id] = record
+        # Troca atômica do índice: leitores nunca veem um estado parcial
+        self._devices = devices
+        self.last_sync = datetime.now(timezone.utc)
+        logger.info(f"Registro de dispositivos sincronizado: {len(devices)} dispositivos")
+        return len(devices)
+
+    async def run(self) -> None:
+        """Loop de sincronização periódica (executado como task de fundo)"""
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao sincronizar registro de dispositivos: {str(e)}")
+            await asyncio.sleep(self.sync_interval)
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional
+
+from fastapi import HTTPException
+
+import json_codec
+from deadline import budget, spawn
+
+logger = logging.getLogger(__name__)
+
+FleetWorker = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+async def _run_one(device_id: str, worker: FleetWorker, item_budget: Optional[float] = None) -> Dict[str, Any]:
+    """Executa o worker de um dispositivo, convertendo falhas em linhas de erro"""
+    try:
+        if item_budget is None:
+            result = await worker(device_id)
+        else:
+            with budget(item_budget):
+                result = await worker(device_id)
+        return {"id": device_id, "status": "ok", **result}
+    except HTTPException as e:
+        return {"id": device_id, "status": "error", "code": e.status_code, "detail": e.detail}
+    except Exception as e:
+        logger.error(f"Erro ao processar dispositivo {device_id}: {str(e)}")
+        return {"id": device_id, "status": "error", "code": 500, "detail": str(e)}
+
+
+async def fan_out(
+    device_ids: Iterable[str],
+    worker: FleetWorker,
+    concurrency: int,
+    item_budget: Optional[float] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Executa ``worker`` para cada dispositivo com no máximo ``concurrency``
+    chamadas simultâneas, entregando os resultados na ordem de conclusão.
+
+    Usa um pool fixo de workers consumindo um iterador compartilhado, então o
+    número de tasks não cresce com o tamanho da frota. O stream pode durar
+    mais que o orçamento de uma requisição, então os workers não o herdam e
+    cada dispositivo recebe o seu (``item_budget``).
+    """
+    pending = iter(device_ids)
+    results: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    async def consume() -> None:
+        try:
+            for device_id in pending:
+                results.put_nowait(await _run_one(device_id, worker, item_budget))
+        finally:
+            results.put_nowait(finished)
+
+    workers = [spawn(consume()) for _ in range(max(1, concurrency))]
+    remaining = len(workers)
+    try:
+        while remaining:
+            item = await results.get()
+            if item is finished:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        # Cliente desconectou ou o stream terminou: não deixa workers órfãos
+        for task in workers:
+            task.cancel()
+
+
+async def ndjson_stream(items: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Serializa cada resultado como uma linha NDJSON"""
+    async for item in items:
+        yield json_codec.dumps_str(item) + "\n"
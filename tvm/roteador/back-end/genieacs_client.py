@@ -0,0 +1,176 @@
+import json
+import logging
+import time
+import urllib.parse
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+
+import httpx
+
+import json_codec
+from circuit_breaker import CircuitBreaker
+from deadline import bound
+from metrics import genieacs_request_duration, outcome
+
+logger = logging.getLogger(__name__)
+
+# Timeouts padrão (segundos) para as chamadas ao NBI do GenieACS
+DEFAULT_TIMEOUT = 5
+CONNECT_TIMEOUT = 3
+TASK_CREATE_TIMEOUT = 10
+
+# Pool de conexões keep-alive compartilhado por todas as rotas
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 30
+
+
+def encode_query(value: Dict[str, Any]) -> str:
+    """Codifica um dicionário como parâmetro de query do NBI"""
+    return urllib.parse.quote(json.dumps(value))
+
+
+def build_projection(paths: Iterable[str]) -> Dict[str, int]:
+    """Monta a projeção do NBI a partir dos caminhos TR-069 desejados"""
+    return {path: 1 for path in paths}
+
+
+class GenieACSClient:
+    """Cliente HTTP assíncrono e compartilhado para o NBI do GenieACS.
+
+    Mantém um único pool de conexões keep-alive para que requisições
+    concorrentes a endpoints diferentes não bloqueiem o event loop. Todas as
+    chamadas passam pelo circuit breaker e respeitam o orçamento (deadline)
+    da requisição em andamento.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = DEFAULT_TIMEOUT,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(self.timeout, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            headers={"Accept": "application/json"},
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Criado sob demanda para funcionar também fora do lifespan da aplicação
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def _request(
+        self,
+        operation: str,
+        method: str,
+        url: str,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """Executa a chamada pelo circuit breaker, limitada ao orçamento da
+        requisição atual, registrando a latência por operação em /metrics"""
+        timeout = bound(timeout or self.timeout)
+        self.breaker.before_call()
+        status_code = None
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, timeout=timeout, **kwargs)
+            status_code = response.status_code
+        except httpx.TransportError:
+            # Conexão recusada, timeout etc.: o GenieACS não está respondendo
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        finally:
+            genieacs_request_duration.observe(time.perf_counter() - start, operation, outcome(status_code))
+        if status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    async def get_devices(
+        self,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        limit: Optional[int] = None,
+        skip: Optional[int] = None,
+    ) -> httpx.Response:
+        """GET /devices com query (e projection/paginação opcionais)"""
+        url = f"/devices/?query={encode_query(query)}"
+        if projection:
+            url += f"&projection={encode_query(projection)}"
+        if limit is not None:
+            url += f"&limit={limit}"
+        if skip:
+            url += f"&skip={skip}"
+        return await self._request("device_fetch", "GET", url, timeout=timeout)
+
+    async def iter_devices(
+        self,
+        query: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        page_size: int = 1000,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Percorre todos os dispositivos que casam com a query, paginando /devices"""
+        skip = 0
+        while True:
+            response = await self.get_devices(query, projection, limit=page_size, skip=skip)
+            if response.status_code != 200:
+                raise RuntimeError(f"Erro ao buscar dispositivos: {response.status_code} - {response.text}")
+            page = json_codec.loads(response.content)
+            for document in page:
+                yield document
+            if len(page) < page_size:
+                return
+            skip += page_size
+
+    async def get_tasks(
+        self,
+        query: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> httpx.Response:
+        """GET /tasks com query"""
+        return await self._request(
+            "task_poll",
+            "GET",
+            f"/tasks/?query={encode_query(query)}",
+            timeout=timeout,
+        )
+
+    async def create_task(
+        self,
+        device_id: str,
+        task: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> httpx.Response:
+        """POST /devices/{id}/tasks?connection_request"""
+        return await self._request(
+            "task_create",
+            "POST",
+            f"/devices/{urllib.parse.quote(device_id)}/tasks?connection_request",
+            json=task,
+            timeout=timeout or TASK_CREATE_TIMEOUT,
+        )
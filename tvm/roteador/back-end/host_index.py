@@ -0,0 +1,135 @@
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from tr069_models import DeviceSnapshot, HostEntry
+
+logger = logging.getLogger(__name__)
+
+
+class HostTable:
+    """Tabela de hosts de um roteador indexada por MAC e versionada.
+
+    Cada snapshot de ``Hosts.Host`` é aplicado de forma incremental: entradas
+    cujos campos não mudaram reaproveitam o registro anterior, e cada MAC
+    guarda a versão em que foi criado e alterado pela última vez. Remoções
+    ficam registradas (até ``max_tombstones``) para responder deltas desde
+    uma versão anterior. O estado de bloqueio (filtro MAC) faz parte do
+    registro, então bloquear/desbloquear também gera uma nova versão.
+    """
+
+    def __init__(self, max_tombstones: int = 1024):
+        self.version = 0
+        self.max_tombstones = max_tombstones
+        # MAC -> (versão de criação, versão da última alteração, registro)
+        self._hosts: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+        # Hosts ativos do último snapshot
+        self._raw: Tuple[HostEntry, ...] = ()
+        self._blocked: FrozenSet[str] = frozenset()
+        self._removed: "OrderedDict[str, int]" = OrderedDict()
+        # Versão mais antiga para a qual ainda é possível calcular um delta
+        self._horizon = 0
+
+    def __len__(self) -> int:
+        return len(self._hosts)
+
+    def hosts(self) -> List[Dict[str, Any]]:
+        return [host for _, _, host in self._hosts.values()]
+
+    def apply(self, entries: Optional[Iterable[HostEntry]] = None, blocked: Optional[Iterable[str]] = None) -> bool:
+        """Aplica um snapshot de Hosts.Host e/ou o conjunto de MACs bloqueados
+        (em maiúsculas); retorna True se algo mudou"""
+        if entries is None:
+            keys = self._raw
+        else:
+            # Considera o dispositivo como ativo se tiver IP e MAC
+            keys = tuple(entry for entry in entries if entry.mac and entry.ip_address)
+        blocked_set = frozenset(blocked) if blocked is not None else self._blocked
+
+        if keys == self._raw and blocked_set == self._blocked:
+            return False
+
+        next_version = self.version + 1
+        current: Dict[str, HostEntry] = {entry.mac: entry for entry in keys}
+        changed = False
+
+        for mac, (created, modified, host) in list(self._hosts.items()):
+            if mac not in current:
+                del self._hosts[mac]
+                self._tombstone(mac, next_version)
+                changed = True
+
+        for mac, entry in current.items():
+            name = entry.hostname or "Dispositivo Desconhecido"
+            ip_address = entry.ip_address
+            is_blocked = mac.upper() in blocked_set
+            existing = self._hosts.get(mac)
+            if existing is not None and existing[2]["name"] == name \
+                    and existing[2]["ipAddress"] == ip_address and existing[2]["isBlocked"] == is_blocked:
+                continue
+            host = {
+                "id": mac,
+                "name": name,
+                "isBlocked": is_blocked,
+                "ipAddress": ip_address
+            }
+            created = existing[0] if existing is not None else next_version
+            self._hosts[mac] = (created, next_version, host)
+            self._removed.pop(mac, None)
+            changed = True
+
+        self._raw = keys
+        self._blocked = blocked_set
+        if changed:
+            self.version = next_version
+        return changed
+
+    def _tombstone(self, mac: str, version: int) -> None:
+        self._removed[mac] = version
+        self._removed.move_to_end(mac)
+        while len(self._removed) > self.max_tombstones:
+            _, evicted = self._removed.popitem(last=False)
+            self._horizon = max(self._horizon, evicted)
+
+    def delta(self, since: int) -> Dict[str, Any]:
+        """Mudanças após a versão ``since`` (ou a tabela completa se ela for antiga demais)"""
+        if since < self._horizon or since > self.version:
+            return {"version": self.version, "full": True, "added": self.hosts(), "changed": [], "removed": []}
+        added, changed = [], []
+        for created, modified, host in self._hosts.values():
+            if created > since:
+                added.append(host)
+            elif modified > since:
+                changed.append(host)
+        removed = [mac for mac, version in self._removed.items() if version > since]
+        return {"version": self.version, "full": False, "added": added, "changed": changed, "removed": removed}
+
+
+class HostIndex:
+    """Uma HostTable por roteador"""
+
+    def __init__(self):
+        self._tables: Dict[str, HostTable] = {}
+
+    def get(self, device_id: str) -> Optional[HostTable]:
+        return self._tables.get(device_id)
+
+    def ids(self) -> List[str]:
+        return list(self._tables)
+
+    def _table(self, device_id: str) -> HostTable:
+        table = self._tables.get(device_id)
+        if table is None:
+            table = self._tables[device_id] = HostTable()
+        return table
+
+    def update(self, device_id: str, device: DeviceSnapshot, blocked: Optional[Iterable[str]] = None) -> HostTable:
+        """Aplica os hosts do documento (ou projeção Hosts.Host) do roteador"""
+        table = self._table(device_id)
+        table.apply(device.hosts, blocked)
+        return table
+
+    def set_blocked(self, device_id: str, blocked: Iterable[str]) -> bool:
+        """Atualiza apenas o estado de bloqueio, sem um novo snapshot de hosts"""
+        table = self._tables.get(device_id)
+        return table.apply(blocked=blocked) if table is not None else False
@@ -0,0 +1,227 @@
+import asyncio
+import contextvars
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+import json_codec
+from deadline import spawn
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+# Job em execução na task atual (usado por report_progress)
+current_job: contextvars.ContextVar[Optional["Job"]] = contextvars.ContextVar("current_job", default=None)
+
+
+def report_progress(stage: str) -> None:
+    """Registra o estágio atual no job em execução (no-op fora de um job)"""
+    job = current_job.get()
+    if job is not None:
+        job.update(stage=stage)
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    device_id: str
+    status: str = "pending"
+    stage: str = ""
+    result: Any = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[float] = None
+    version: int = 0
+    # Chaves de idempotência (Idempotency-Key) e impressão digital do conteúdo
+    idempotency_keys: List[str] = field(default_factory=list, repr=False)
+    fingerprint: Optional[str] = None
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def update(self, **changes: Any) -> None:
+        for name, value in changes.items():
+            setattr(self, name, value)
+        self.version += 1
+        self.updated_at = datetime.now(timezone.utc)
+        if self.done and self.finished_at is None:
+            self.finished_at = time.monotonic()
+        # Acorda todos os que aguardam e prepara um novo evento para a próxima mudança
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_done(self, timeout: Optional[float]) -> bool:
+        """Aguarda o job terminar (None espera indefinidamente)"""
+        loop = asyncio.get_running_loop()
+        end = None if timeout is None else loop.time() + timeout
+        while not self.done:
+            left = None if end is None else end - loop.time()
+            if left is not None and left <= 0:
+                return False
+            await self.wait_for_change(self.version, left)
+        return True
+
+    async def wait_for_change(self, version: int, timeout: Optional[float]) -> bool:
+        """Aguarda até a versão do job passar de ``version`` (long-poll)"""
+        if self.version > version or self.done:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "deviceId": self.device_id,
+            "status": self.status,
+            "stage": self.stage,
+            "result": self.result,
+            "error": self.error,
+            "statusCode": self.status_code,
+            "version": self.version,
+            "createdAt": self.created_at.isoformat(),
+            "updatedAt": self.updated_at.isoformat(),
+        }
+
+
+class JobStore:
+    """Armazena e executa jobs de operações longas no roteador.
+
+    Jobs concluídos ficam disponíveis por ``retention`` segundos; acima de
+    ``max_jobs`` os concluídos mais antigos são descartados primeiro.
+
+    ``submit`` deduplica de duas formas: a mesma chave de idempotência
+    devolve o job original enquanto ele estiver retido, e um job em
+    andamento com o mesmo ``fingerprint`` (mesma escrita no mesmo
+    dispositivo) recebe os pedidos duplicados. Um job que falha libera as
+    suas chaves: as falhas costumam ser transitórias (circuito aberto,
+    orçamento esgotado) e a nova tentativa com a mesma chave cria outro job.
+    """
+
+    def __init__(self, retention: float = 3600, max_jobs: int = 1000):
+        self.retention = retention
+        self.max_jobs = max_jobs
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._by_key: Dict[str, Job] = {}
+        self._inflight: Dict[str, Job] = {}
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def submit(
+        self,
+        kind: str,
+        device_id: str,
+        factory: Callable[[], Awaitable[Any]],
+        idempotency_key: Optional[str] = None,
+        fingerprint: Optional[str] = None,
+    ) -> Job:
+        self._prune()
+        key = f"{kind}:{device_id}:{idempotency_key}" if idempotency_key is not None else None
+        if key is not None:
+            existing = self._by_key.get(key)
+            if existing is not None:
+                if fingerprint is not None and existing.fingerprint != fingerprint:
+                    raise HTTPException(
+                        status_code=422,
+                        detail="Idempotency-Key já usada com outro conteúdo"
+                    )
+                logger.info(f"Job {existing.id} reaproveitado pela chave de idempotência")
+                return existing
+        if fingerprint is not None:
+            existing = self._inflight.get(fingerprint)
+            if existing is not None and not existing.done:
+                logger.info(f"Escrita idêntica em andamento, anexada ao job {existing.id}")
+                if key is not None:
+                    existing.idempotency_keys.append(key)
+                    self._by_key[key] = existing
+                return existing
+
+        job = Job(id=uuid.uuid4().hex, kind=kind, device_id=device_id, fingerprint=fingerprint)
+        self._jobs[job.id] = job
+        if key is not None:
+            job.idempotency_keys.append(key)
+            self._by_key[key] = job
+        if fingerprint is not None:
+            self._inflight[fingerprint] = job
+        # O job continua após a resposta 202: não herda o orçamento da requisição
+        self._tasks[job.id] = spawn(self._execute(job, factory))
+        logger.info(f"Job {job.id} ({kind}) criado para o roteador {device_id}")
+        return job
+
+    async def _execute(self, job: Job, factory: Callable[[], Awaitable[Any]]) -> None:
+        token = current_job.set(job)
+        job.update(status="running")
+        try:
+            result = await factory()
+            job.update(status="succeeded", result=result, status_code=200)
+        except HTTPException as e:
+            job.update(status="failed", error=str(e.detail), status_code=e.status_code)
+        except Exception as e:
+            logger.error(f"Erro no job {job.id}: {str(e)}")
+            job.update(status="failed", error=str(e), status_code=500)
+        finally:
+            current_job.reset(token)
+            self._tasks.pop(job.id, None)
+            if job.fingerprint is not None and self._inflight.get(job.fingerprint) is job:
+                del self._inflight[job.fingerprint]
+            if job.status == "failed":
+                self._release_keys(job)
+            logger.info(f"Job {job.id} finalizado: {job.status}")
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for job_id in [
+            job.id for job in self._jobs.values()
+            if job.finished_at is not None and now - job.finished_at > self.retention
+        ]:
+            self._forget(job_id)
+        if len(self._jobs) >= self.max_jobs:
+            finished = sorted(
+                (job for job in self._jobs.values() if job.finished_at is not None),
+                key=lambda job: job.finished_at,
+            )
+            for job in finished[:len(self._jobs) - self.max_jobs + 1]:
+                self._forget(job.id)
+
+    def _forget(self, job_id: str) -> None:
+        self._release_keys(self._jobs.pop(job_id))
+
+    def _release_keys(self, job: Job) -> None:
+        for key in job.idempotency_keys:
+            if self._by_key.get(key) is job:
+                del self._by_key[key]
+
+    async def close(self) -> None:
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+
+async def job_events(job: Job, heartbeat: float = 15) -> AsyncIterator[str]:
+    """Stream SSE com o estado do job a cada mudança, até ele terminar"""
+    version = -1
+    while True:
+        if job.version != version:
+            version = job.version
+            yield f"event: status\ndata: {json_codec.dumps_str(job.to_dict())}\n\n"
+            if job.done:
+                return
+        if not await job.wait_for_change(version, heartbeat):
+            # Comentário SSE mantém a conexão viva através de proxies
+            yield ": keep-alive\n\n"
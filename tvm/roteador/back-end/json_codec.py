@@ -0,0 +1,54 @@
+"""Backend JSON da API: orjson quando instalado, com fallback para o json da stdlib.
+
+O orjson é opcional (requirements-orjson.txt). Com ele o decode dos
+documentos do NBI não colapsa os parâmetros durante o parse (ver
+tr069_models.loads_compact): mais rápido, com pico de memória maior.
+``JSON_BACKEND=json`` força a stdlib mesmo com o orjson disponível (útil para
+comparar ou isolar problemas de serialização).
+"""
+import json
+import os
+from typing import Any, Union
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None and os.getenv("JSON_BACKEND", "orjson") != "json" else "json"
+
+if BACKEND == "orjson":
+    # Chaves não-str (ex.: int) são convertidas como na stdlib
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+    def dumps(value: Any) -> bytes:
+        """JSON compacto em UTF-8"""
+        return orjson.dumps(value, option=_OPTIONS)
+else:
+    def loads(data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    def dumps(value: Any) -> bytes:
+        """JSON compacto em UTF-8"""
+        return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(value: Any) -> str:
+    return dumps(value).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializada com o backend ativo.
+
+    Usada como ``default_response_class`` da aplicação. Rotas com payloads
+    grandes de tipos simples (dict/list/str/bool) podem retorná-la diretamente
+    para evitar também o ``jsonable_encoder`` do FastAPI.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
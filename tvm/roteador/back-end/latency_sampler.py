@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from deadline import spawn
+
+logger = logging.getLogger(__name__)
+
+Measure = Callable[[str], Awaitable[Dict[str, Any]]]
+OnSample = Callable[[str, "LatencySample"], None]
+
+
+@dataclass
+class LatencySample:
+    average: float
+    minimum: float
+    maximum: float
+    success: int
+    failure: int
+    timestamp: datetime
+    monotonic: float
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any]) -> "LatencySample":
+        return cls(
+            average=result["average"],
+            minimum=result["minimum"],
+            maximum=result["maximum"],
+            success=result["success"],
+            failure=result["failure"],
+            timestamp=datetime.now(timezone.utc),
+            monotonic=time.monotonic(),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "average": self.average,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "success": self.success,
+            "failure": self.failure,
+            "total": self.success + self.failure,
+            "timestamp": self.timestamp.isoformat(),
+        }
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Percentil pelo método nearest-rank sobre uma lista já ordenada"""
+    if not sorted_values:
+        return 0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LatencySampler:
+    """Executa o diagnóstico de ping de um dispositivo em intervalos fixos e
+    guarda os resultados em um buffer circular de tamanho fixo.
+
+    Um lock garante que nunca há dois diagnósticos simultâneos no mesmo
+    roteador (agendados ou sob demanda).
+    """
+
+    def __init__(
+        self,
+        device_id: str,
+        measure: Measure,
+        interval: float,
+        history_size: int,
+        on_sample: Optional[OnSample] = None,
+    ):
+        self.device_id = device_id
+        self.measure_fn = measure
+        self.on_sample = on_sample
+        self.interval = interval
+        self.samples: Deque[LatencySample] = deque(maxlen=history_size)
+        self.last_error: Optional[HTTPException] = None
+        self.last_access = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._sampled = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def latest(self) -> Optional[LatencySample]:
+        return self.samples[-1] if self.samples else None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = spawn(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def measure(self) -> LatencySample:
+        """Executa um diagnóstico agora (serializado com os agendados)"""
+        async with self._lock:
+            try:
+                result = await self.measure_fn(self.device_id)
+            except HTTPException as e:
+                self.last_error = e
+                self._sampled.set()
+                raise
+            sample = LatencySample.from_result(result)
+            self.samples.append(sample)
+            self.last_error = None
+            self._sampled.set()
+            if self.on_sample is not None:
+                self.on_sample(self.device_id, sample)
+            return sample
+
+    async def wait_first(self, timeout: float) -> Optional[LatencySample]:
+        """Aguarda a primeira amostra (ou erro) quando o buffer ainda está vazio"""
+        if self.latest is None and self.last_error is None:
+            try:
+                await asyncio.wait_for(self._sampled.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.latest
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.measure()
+            except asyncio.CancelledError:
+                raise
+            except HTTPException as e:
+                logger.warning(f"Amostra de latência falhou para {self.device_id}: {e.detail}")
+            except Exception as e:
+                logger.error(f"Erro no amostrador de latência de {self.device_id}: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def window(self, seconds: Optional[float] = None) -> List[LatencySample]:
+        if seconds is None:
+            return list(self.samples)
+        cutoff = time.monotonic() - seconds
+        return [sample for sample in self.samples if sample.monotonic >= cutoff]
+
+    def stats(self, seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Min/média/máx e percentis da latência média das amostras na janela"""
+        samples = self.window(seconds)
+        averages = sorted(sample.average for sample in samples if sample.success > 0)
+        success = sum(sample.success for sample in samples)
+        failure = sum(sample.failure for sample in samples)
+        return {
+            "samples": len(samples),
+            "minimum": averages[0] if averages else 0,
+            "average": sum(averages) / len(averages) if averages else 0,
+            "maximum": averages[-1] if averages else 0,
+            "p50": percentile(averages, 50),
+            "p90": percentile(averages, 90),
+            "p99": percentile(averages, 99),
+            "lossRate": failure / (success + failure) if success + failure else 0,
+        }
+
+
+class LatencySamplers:
+    """Um amostrador por dispositivo, criado sob demanda e parado após
+    ``idle_timeout`` segundos sem consultas para não pingar roteadores ociosos.
+    """
+
+    def __init__(
+        self,
+        measure: Measure,
+        interval: float,
+        history_size: int,
+        idle_timeout: float,
+        on_sample: Optional[OnSample] = None,
+    ):
+        self.measure = measure
+        self.on_sample = on_sample
+        self.interval = interval
+        self.history_size = history_size
+        self.idle_timeout = idle_timeout
+        self._samplers: Dict[str, LatencySampler] = {}
+        self._reaper: Optional[asyncio.Task] = None
+
+    def peek(self, device_id: str) -> Optional[LatencySampler]:
+        return self._samplers.get(device_id)
+
+    def get(self, device_id: str) -> LatencySampler:
+        sampler = self._samplers.get(device_id)
+        if sampler is None:
+            sampler = LatencySampler(device_id, self.measure, self.interval, self.history_size, self.on_sample)
+            self._samplers[device_id] = sampler
+            logger.info(f"Amostrador de latência iniciado para {device_id} (a cada {self.interval}s)")
+        sampler.last_access = time.monotonic()
+        sampler.start()
+        if self._reaper is None or self._reaper.done():
+            self._reaper = spawn(self._reap())
+        return sampler
+
+    async def _reap(self) -> None:
+        while self._samplers:
+            await asyncio.sleep(self.idle_timeout / 2)
+            now = time.monotonic()
+            for device_id, sampler in list(self._samplers.items()):
+                if now - sampler.last_access > self.idle_timeout:
+                    # O histórico é mantido; só o agendamento é pausado
+                    sampler.stop()
+
+    async def close(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for sampler in self._samplers.values():
+            sampler.stop()
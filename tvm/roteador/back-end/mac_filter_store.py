@@ -0,0 +1,100 @@
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+from tr069_models import WifiSettings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mac_filters (
+    router_id TEXT NOT NULL,
+    mac TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (router_id, mac)
+)
+"""
+
+
+def normalize_mac(mac: str) -> str:
+    return mac.strip().upper()
+
+
+def blocked_macs_from_wlan(wifi: WifiSettings) -> Optional[Set[str]]:
+    """Deriva os MACs bloqueados dos parâmetros de filtro do WLANConfiguration.1.
+
+    Retorna None se os parâmetros não estiverem no documento. Só a política
+    ``deny`` com o filtro habilitado bloqueia os MACs listados.
+    """
+    if wifi.mac_filter_list is None:
+        return None
+    if not wifi.mac_filter_enabled or wifi.mac_filter_policy != "deny":
+        return set()
+    return {normalize_mac(mac) for mac in wifi.mac_filter_list.split(",") if mac.strip()}
+
+
+class MacFilterStore:
+    """Estado persistente do filtro MAC por roteador (SQLite), indexado por
+    (router_id, mac), com um espelho em memória para consultas O(1).
+
+    As escritas são pequenas e usam WAL, então são feitas de forma síncrona.
+    Cada roteador tem uma versão (em memória) incrementada a cada ``replace``:
+    quem relê o estado do roteador passa a versão de antes da leitura em
+    ``if_version`` e a leitura é descartada se houve escrita no meio tempo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+        self._blocked: Dict[str, FrozenSet[str]] = {}
+        self._versions: Dict[str, int] = {}
+        for router_id, mac in self._conn.execute("SELECT router_id, mac FROM mac_filters"):
+            self._blocked[router_id] = self._blocked.get(router_id, frozenset()) | {mac}
+        logger.info(f"Estado do filtro MAC carregado de {path}: {len(self._blocked)} roteadores")
+
+    def routers(self) -> List[str]:
+        return list(self._blocked)
+
+    def blocked(self, router_id: str) -> FrozenSet[str]:
+        return self._blocked.get(router_id, frozenset())
+
+    def version(self, router_id: str) -> int:
+        return self._versions.get(router_id, 0)
+
+    def replace(self, router_id: str, macs: Iterable[str], source: str, if_version: Optional[int] = None) -> bool:
+        """Define o conjunto completo de MACs bloqueados; retorna True se mudou"""
+        if if_version is not None and self.version(router_id) != if_version:
+            logger.info(f"Filtro MAC de {router_id} lido antes de uma escrita ({source}), descartado")
+            return False
+        self._versions[router_id] = self.version(router_id) + 1
+        desired = frozenset(normalize_mac(mac) for mac in macs)
+        current = self.blocked(router_id)
+        if desired == current:
+            return False
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM mac_filters WHERE router_id = ? AND mac = ?",
+                [(router_id, mac) for mac in current - desired]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO mac_filters (router_id, mac, updated_at, source) VALUES (?, ?, ?, ?)",
+                [(router_id, mac, now, source) for mac in desired - current]
+            )
+        if desired:
+            self._blocked[router_id] = desired
+        else:
+            self._blocked.pop(router_id, None)
+        logger.info(f"Filtro MAC de {router_id} atualizado ({source}): {len(desired)} bloqueados")
+        return True
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
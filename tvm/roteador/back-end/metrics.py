@@ -0,0 +1,265 @@
+import bisect
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Pattern, Sequence, Set, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Limites padrão (segundos) para latências de requisições HTTP
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Conclusão de tasks TR-069 inclui o connection request e o inform do roteador
+TASK_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 15, 30, 60)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        self._values[labels] = value
+
+
+class CallbackGauge(_Metric):
+    """Gauge sem rótulos lido no momento da coleta (ex.: contadores de outro objeto)"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float], kind: str = "gauge"):
+        super().__init__(name, documentation)
+        self.read = read
+        self.kind = kind
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {_format_value(self.read())}"]
+
+
+class Histogram(_Metric):
+    """Histograma com buckets fixos; ``observe`` é O(log buckets)"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Rótulos -> (contagem por bucket, não cumulativa, com +Inf no fim; soma)
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series is not None else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica duplicada: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """Formato de exposição em texto do Prometheus (0.0.4)"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Registro global do processo, usado pelos módulos compartilhados
+registry = Registry()
+
+genieacs_request_duration = registry.histogram(
+    "genieacs_request_duration_seconds",
+    "Latência das chamadas ao NBI do GenieACS por operação",
+    ("operation", "outcome"),
+)
+genieacs_retries = registry.counter(
+    "genieacs_retries_total",
+    "Novas tentativas de chamadas ao GenieACS (laços de MAX_RETRIES)",
+    ("operation",),
+)
+task_completion_duration = registry.histogram(
+    "tr069_task_completion_seconds",
+    "Tempo de espera pela conclusão de tasks TR-069 (após a criação ser aceita pelo GenieACS) por nome",
+    ("task", "outcome"),
+    TASK_BUCKETS,
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight",
+    "Requisições em andamento por endpoint",
+    ("method", "endpoint"),
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Duração das requisições HTTP por endpoint",
+    ("method", "endpoint", "status"),
+)
+
+
+def outcome(status_code: Optional[int]) -> str:
+    """Classe do status HTTP (2xx, 4xx, ...) ou ``error`` para falhas de rede"""
+    return f"{status_code // 100}xx" if status_code else "error"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede requisições em andamento e duração por rota.
+
+    O rótulo ``endpoint`` é o template da rota (``/devices/{device_id}/...``),
+    não o caminho bruto, para manter a cardinalidade limitada.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # (regex do caminho, métodos, template) das rotas, montado na primeira requisição
+        self._routes: Optional[List[Tuple[Pattern, Optional[Set[str]], str]]] = None
+
+    def _endpoint(self, scope: Scope) -> str:
+        if self._routes is None:
+            self._routes = [
+                (route.path_regex, getattr(route, "methods", None), route.path)
+                for route in scope["app"].router.routes
+                if hasattr(route, "path_regex")
+            ]
+        path, method = scope["path"], scope["method"]
+        partial = "unmatched"
+        for regex, methods, template in self._routes:
+            if regex.match(path):
+                if methods is None or method in methods:
+                    return template
+                if partial == "unmatched":
+                    # Caminho conhecido com outro método (ex.: preflight OPTIONS)
+                    partial = template
+        return partial
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        endpoint = self._endpoint(scope)
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method, endpoint)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec(method, endpoint)
+            http_request_duration.observe(time.perf_counter() - start, method, endpoint, str(status_code))
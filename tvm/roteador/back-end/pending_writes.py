@@ -0,0 +1,111 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from tr069_tasks import ParameterBatch
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_writes (
+    router_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    value TEXT NOT NULL,
+    type TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    queued_at TEXT NOT NULL,
+    PRIMARY KEY (router_id, path)
+)
+"""
+
+
+class PendingWriteStore:
+    """Fila durável (SQLite) de escritas para roteadores offline.
+
+    Guarda o estado desejado por (router_id, parâmetro): uma nova escrita no
+    mesmo parâmetro substitui a anterior. ``checkout`` entrega o lote para
+    envio e ``commit`` remove apenas as entradas que estavam nele, preservando
+    as enfileiradas durante o envio.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+        # router_id -> caminho -> (valor, tipo, seq, queued_at)
+        self._pending: Dict[str, Dict[str, tuple]] = {}
+        self._seq = 0
+        self._checked_out: Dict[str, int] = {}
+        for router_id, path, value, type_, seq, queued_at in self._conn.execute(
+            "SELECT router_id, path, value, type, seq, queued_at FROM pending_writes ORDER BY seq"
+        ):
+            queued = datetime.fromisoformat(queued_at)
+            self._pending.setdefault(router_id, {})[path] = (json.loads(value), type_, seq, queued)
+            self._seq = max(self._seq, seq)
+        logger.info(f"Fila de escritas pendentes carregada de {path}: {len(self._pending)} roteadores")
+
+    def routers(self) -> List[str]:
+        return list(self._pending)
+
+    def __contains__(self, router_id: str) -> bool:
+        return router_id in self._pending
+
+    def pending(self, router_id: str) -> ParameterBatch:
+        """Escritas pendentes do roteador, na ordem em que foram enfileiradas"""
+        entries = sorted(self._pending.get(router_id, {}).items(), key=lambda item: item[1][2])
+        return ParameterBatch((path, value, type_) for path, (value, type_, _, _) in entries)
+
+    def queued_since(self, router_id: str) -> Optional[datetime]:
+        """Instante da escrita pendente mais antiga do roteador"""
+        entries = self._pending.get(router_id)
+        return min(entry[3] for entry in entries.values()) if entries else None
+
+    def queue(self, router_id: str, batch: ParameterBatch) -> None:
+        now = datetime.now(timezone.utc)
+        entries = self._pending.setdefault(router_id, {})
+        rows = []
+        for path, value, type_ in batch.parameter_values():
+            self._seq += 1
+            # Mantém o instante original: a escrita espera desde então
+            queued = entries[path][3] if path in entries else now
+            entries[path] = (value, type_, self._seq, queued)
+            rows.append((router_id, path, json.dumps(value), type_, self._seq, queued.isoformat()))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pending_writes (router_id, path, value, type, seq, queued_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        logger.info(f"{len(rows)} parâmetro(s) enfileirado(s) para {router_id} ({len(entries)} pendentes)")
+
+    def checkout(self, router_id: str) -> ParameterBatch:
+        """Lote pendente para envio; marca até onde ``commit`` pode remover"""
+        entries = self._pending.get(router_id)
+        if entries:
+            self._checked_out[router_id] = max(entry[2] for entry in entries.values())
+        return self.pending(router_id)
+
+    def commit(self, router_id: str) -> int:
+        """Remove as entradas entregues pelo último ``checkout`` já aplicadas"""
+        seq = self._checked_out.pop(router_id, None)
+        entries = self._pending.get(router_id)
+        if seq is None or not entries:
+            return 0
+        applied = [path for path, entry in entries.items() if entry[2] <= seq]
+        for path in applied:
+            del entries[path]
+        if not entries:
+            del self._pending[router_id]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pending_writes WHERE router_id = ? AND seq <= ?", (router_id, seq))
+        logger.info(f"{len(applied)} escrita(s) pendente(s) aplicada(s) em {router_id}")
+        return len(applied)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+import json_codec
+from deadline import spawn
+from host_index import HostTable
+
+logger = logging.getLogger(__name__)
+
+# Estado lido do GenieACS a cada refresh: {"online": bool, "hosts": HostTable ou None}
+StateReader = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+class Subscription:
+    """Fila de eventos de um inscrito; descarta os mais antigos se ele não acompanhar"""
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def push(self, event: str, data: Any) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait((event, data))
+
+
+class DeviceWatcher:
+    """Atualiza o estado de um dispositivo enquanto houver inscritos e
+    distribui as diferenças para todos eles a partir de um único refresh."""
+
+    def __init__(self, device_id: str, reader: StateReader, interval: float):
+        self.device_id = device_id
+        self.reader = reader
+        self.interval = interval
+        self.subscribers: Set[Subscription] = set()
+        self.online: Optional[bool] = None
+        self.hosts: Optional[HostTable] = None
+        self.hosts_version: Optional[int] = None
+        self.latency: Optional[Dict[str, Any]] = None
+        self._kick = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "online": self.online,
+            "hosts": self.hosts.hosts() if self.hosts is not None else None,
+            "hostsVersion": self.hosts_version,
+            "latency": self.latency,
+        }
+
+    def publish(self, event: str, data: Any) -> None:
+        for subscription in self.subscribers:
+            subscription.push(event, data)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = spawn(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def kick(self) -> None:
+        """Antecipa o próximo refresh (ex.: após uma escrita no roteador)"""
+        self._kick.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao atualizar estado de {self.device_id}: {str(e)}")
+            self._kick.clear()
+            try:
+                await asyncio.wait_for(self._kick.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def refresh(self) -> None:
+        state = await self.reader(self.device_id)
+        if state["online"] != self.online:
+            self.online = state["online"]
+            self.publish("status", {"online": self.online})
+        table: Optional[HostTable] = state.get("hosts")
+        if table is None or table.version == self.hosts_version:
+            return
+        # Delta incremental da HostTable desde a última versão publicada
+        delta = table.delta(self.hosts_version if self.hosts_version is not None else 0)
+        self.hosts = table
+        self.hosts_version = table.version
+        self.publish("hosts", delta)
+
+
+class PushHub:
+    """Canal de push (SSE) por dispositivo: um refresh upstream por intervalo,
+    independente do número de abas inscritas."""
+
+    def __init__(self, reader: StateReader, interval: float, queue_size: int = 100):
+        self.reader = reader
+        self.interval = interval
+        self.queue_size = queue_size
+        self._watchers: Dict[str, DeviceWatcher] = {}
+
+    def subscribe(self, device_id: str) -> Subscription:
+        watcher = self._watchers.get(device_id)
+        if watcher is None:
+            watcher = DeviceWatcher(device_id, self.reader, self.interval)
+            self._watchers[device_id] = watcher
+        subscription = Subscription(self.queue_size)
+        # Novo inscrito recebe o estado atual antes das diferenças
+        subscription.push("snapshot", watcher.snapshot())
+        watcher.subscribers.add(subscription)
+        watcher.start()
+        logger.info(f"Novo inscrito em {device_id} ({len(watcher.subscribers)} no total)")
+        return subscription
+
+    def unsubscribe(self, device_id: str, subscription: Subscription) -> None:
+        watcher = self._watchers.get(device_id)
+        if watcher is None:
+            return
+        watcher.subscribers.discard(subscription)
+        if not watcher.subscribers:
+            watcher.stop()
+            del self._watchers[device_id]
+
+    def publish(self, device_id: str, event: str, data: Any) -> None:
+        watcher = self._watchers.get(device_id)
+        if watcher is None:
+            return
+        if event == "latency":
+            watcher.latency = data
+        watcher.publish(event, data)
+
+    def kick(self, device_id: str) -> None:
+        watcher = self._watchers.get(device_id)
+        if watcher is not None:
+            watcher.kick()
+
+    def close(self) -> None:
+        for watcher in self._watchers.values():
+            watcher.stop()
+        self._watchers.clear()
+
+    async def stream(self, device_id: str, heartbeat: float = 15) -> AsyncIterator[str]:
+        """Gera os eventos SSE de um inscrito até a desconexão"""
+        subscription = self.subscribe(device_id)
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json_codec.dumps_str(data)}\n\n"
+        finally:
+            self.unsubscribe(device_id, subscription)
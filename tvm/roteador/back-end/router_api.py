@@ -1,21 +1,187 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import requests
-import json
+import hashlib
+import httpx
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 from fastapi.middleware.cors import CORSMiddleware
 from pymongo import MongoClient
+import asyncio
+import os
 import time
-from datetime import datetime, timedelta
-import urllib.parse
+from datetime import datetime
+from contextlib import asynccontextmanager, suppress
 
-# Configuração de logging
-logging.basicConfig(level=logging.INFO)
+from circuit_breaker import CLOSED, CircuitBreaker, backoff_delay
+from deadline import DeadlineExceeded, DeadlineMiddleware, bound, remaining, spawn
+from genieacs_client import GenieACSClient, build_projection
+from device_cache import DeviceCache
+from device_registry import REGISTRY_PROJECTION, DeviceRegistry, is_recent_inform, parse_last_inform
+from fleet import fan_out, ndjson_stream
+from tr069_tasks import ParameterBatch
+from tr069_models import (
+    HOSTS_PATH,
+    LAST_INFORM_PATH,
+    MAC_FILTER_ENABLED_PATH,
+    MAC_FILTER_LIST_PATH,
+    MAC_FILTER_POLICY_PATH,
+    PING_PATH,
+    WLAN_PATH,
+    DeviceSnapshot,
+    loads_compact,
+    parse_device,
+)
+from write_coalescer import WriteCoalescer
+from task_tracker import TaskTracker
+from jobs import Job, JobStore, job_events, report_progress
+from latency_sampler import LatencySamplers
+from push import PushHub
+from host_index import HostIndex
+from mac_filter_store import MacFilterStore, blocked_macs_from_wlan
+from pending_writes import PendingWriteStore
+import json_codec
+from json_codec import FastJSONResponse
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    CallbackGauge,
+    MetricsMiddleware,
+    genieacs_retries,
+    registry as metrics_registry,
+    task_completion_duration,
+)
+from structured_log import LazyJSON, fields, setup_logging
+
+# Configuração de logging (LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATES)
+# Resumos vão em INFO; payloads completos só em DEBUG e serializados sob demanda
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# Configurações
+GENIEACS_URL = os.getenv("GENIEACS_URL", "http://192.168.100.251:7557")
+ROUTER_ID = "202BC1-BM632w-000000"  # dispositivo padrão das rotas sem device_id
+
+
+MAX_RETRIES = 2
+RETRY_BASE_DELAY = 0.5  # segundos; backoff exponencial com jitter entre tentativas
+RETRY_MAX_DELAY = 5  # segundos
+REQUEST_BUDGET = float(os.getenv("REQUEST_BUDGET", "30"))  # orçamento fim a fim por requisição (0 desativa)
+GENIEACS_FAILURE_THRESHOLD = int(os.getenv("GENIEACS_FAILURE_THRESHOLD", "5"))  # falhas seguidas que abrem o circuito
+GENIEACS_RESET_TIMEOUT = float(os.getenv("GENIEACS_RESET_TIMEOUT", "30"))  # segundos até sondar o GenieACS de novo
+TASK_TIMEOUT = float(os.getenv("TASK_TIMEOUT", "15"))  # segundos
+PING_TIMEOUT = 1 # segundos específico para ping
+PING_CHECK_INTERVAL = 1  # segundos entre verificações de ping
+DEVICE_CACHE_TTL = float(os.getenv("DEVICE_CACHE_TTL", "5"))  # segundos
+REGISTRY_SYNC_INTERVAL = float(os.getenv("REGISTRY_SYNC_INTERVAL", "60"))  # segundos
+FLEET_CONCURRENCY = int(os.getenv("FLEET_CONCURRENCY", "20"))  # chamadas simultâneas ao GenieACS
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "3600"))  # segundos que um job concluído fica disponível
+JOB_WAIT_MAX = 30  # segundos máximos de long-poll em GET /jobs/{id}
+LATENCY_SAMPLE_INTERVAL = float(os.getenv("LATENCY_SAMPLE_INTERVAL", "30"))  # segundos entre diagnósticos de ping
+LATENCY_HISTORY_SIZE = int(os.getenv("LATENCY_HISTORY_SIZE", "120"))  # amostras no buffer circular
+LATENCY_IDLE_TIMEOUT = float(os.getenv("LATENCY_IDLE_TIMEOUT", "300"))  # pausa o amostrador sem consultas
+LATENCY_FIRST_SAMPLE_TIMEOUT = 20  # segundos aguardando a primeira amostra
+PUSH_REFRESH_INTERVAL = float(os.getenv("PUSH_REFRESH_INTERVAL", "10"))  # segundos entre refreshes do canal de push
+MAC_FILTER_DB = os.getenv("MAC_FILTER_DB", "router_state.db")  # SQLite com o estado do filtro MAC
+MAC_FILTER_RECONCILE_INTERVAL = float(os.getenv("MAC_FILTER_RECONCILE_INTERVAL", "300"))  # segundos entre reconciliações
+WRITE_COALESCE_WINDOW = float(os.getenv("WRITE_COALESCE_WINDOW", "0.3"))  # segundos agrupando escritas do mesmo roteador
+PENDING_WRITES_DB = os.getenv("PENDING_WRITES_DB", MAC_FILTER_DB)  # SQLite da fila de escritas para roteadores offline
+PENDING_WRITE_CHECK_INTERVAL = float(os.getenv("PENDING_WRITE_CHECK_INTERVAL", "15"))  # segundos entre checagens de inform
+PENDING_WRITE_QUERY_SIZE = 100  # IDs por consulta de _lastInform
+
+# Cliente HTTP compartilhado (pool keep-alive) para o GenieACS, atrás de um circuit breaker
+genieacs = GenieACSClient(GENIEACS_URL, breaker=CircuitBreaker(GENIEACS_FAILURE_THRESHOLD, GENIEACS_RESET_TIMEOUT))
+
+# Cache dos documentos de dispositivos (TTL + single-flight)
+device_cache = DeviceCache(DEVICE_CACHE_TTL)
+
+# Índice dos dispositivos conhecidos, sincronizado a partir do GenieACS
+device_registry = DeviceRegistry(genieacs, REGISTRY_SYNC_INTERVAL)
+
+# Poller único das tasks pendentes no GenieACS
+task_tracker = TaskTracker(genieacs)
+
+# Jobs assíncronos (configure-wifi, manage-device e latency com ?async=true)
+job_store = JobStore(JOB_RETENTION)
+
+# Um amostrador de latência em segundo plano por roteador consultado
+latency_samplers = LatencySamplers(
+    lambda device_id: run_latency_test(device_id),
+    LATENCY_SAMPLE_INTERVAL,
+    LATENCY_HISTORY_SIZE,
+    LATENCY_IDLE_TIMEOUT,
+    on_sample=lambda device_id, sample: push_hub.publish(device_id, "latency", sample.to_dict())
+)
+
+# Tabelas de hosts por roteador, indexadas por MAC e versionadas
+host_index = HostIndex()
+
+# Estado persistente do filtro MAC (router, MAC) usado no isBlocked dos hosts
+mac_filter_store = MacFilterStore(MAC_FILTER_DB)
+
+# Escritas para roteadores offline, aplicadas quando o _lastInform avançar
+pending_writes = PendingWriteStore(PENDING_WRITES_DB)
+pending_flushes: Set[str] = set()
+# _lastInform usado na última tentativa de envio de cada roteador: só um
+# inform mais novo dispara outra tentativa
+pending_attempts: Dict[str, datetime] = {}
+
+# Escritas do mesmo roteador dentro da janela viram uma única task (última escrita
+# vence), partindo das escritas pendentes de quando ele estava offline
+write_coalescer = WriteCoalescer(
+    lambda device_id, batch: submit_parameter_batch(device_id, batch),
+    lambda task_id, device_id: wait_for_task_completion(task_id, device_id),
+    WRITE_COALESCE_WINDOW,
+    on_applied=lambda device_id, batch: apply_written_state(device_id, batch),
+    base=lambda device_id: pending_writes.checkout(device_id)
+)
+
+# Métricas lidas do cache na coleta de /metrics
+metrics_registry.register(CallbackGauge(
+    "device_cache_hits_total", "Leituras atendidas pelo cache de dispositivos",
+    lambda: device_cache.hits, kind="counter"
+))
+metrics_registry.register(CallbackGauge(
+    "device_cache_misses_total", "Leituras que precisaram buscar no GenieACS",
+    lambda: device_cache.misses, kind="counter"
+))
+metrics_registry.register(CallbackGauge(
+    "device_cache_hit_ratio", "Fração de leituras atendidas pelo cache",
+    lambda: device_cache.hits / (device_cache.hits + device_cache.misses) if device_cache.hits + device_cache.misses else 0
+))
+metrics_registry.register(CallbackGauge(
+    "genieacs_circuit_open", "1 enquanto o circuito do GenieACS estiver aberto ou em sondagem",
+    lambda: 0 if genieacs.breaker.state == CLOSED else 1
+))
+
+# Canal de push (SSE): um refresh upstream por dispositivo para todos os inscritos
+push_hub = PushHub(lambda device_id: read_push_state(device_id), PUSH_REFRESH_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    registry_task = asyncio.create_task(device_registry.run())
+    reconcile_task = asyncio.create_task(run_mac_filter_reconcile())
+    pending_task = asyncio.create_task(run_pending_write_flusher())
+    yield
+    for task in (registry_task, reconcile_task, pending_task):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await job_store.close()
+    await latency_samplers.close()
+    push_hub.close()
+    await task_tracker.close()
+    await genieacs.aclose()
+    mac_filter_store.close()
+    pending_writes.close()
+
 # Inicializa o FastAPI sem root_path (vamos usar o middleware para isso)
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# Orçamento fim a fim de cada requisição (chamadas ao GenieACS, esperas e retries)
+app.add_middleware(DeadlineMiddleware, seconds=REQUEST_BUDGET)
+
+# Requisições em andamento e duração por endpoint (/metrics)
+app.add_middleware(MetricsMiddleware)
 
 # Configuração do CORS
 app.add_middleware(
@@ -34,17 +200,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configurações
-GENIEACS_URL = "http://192.168.100.251:7557"
-ROUTER_ID = "202BC1-BM632w-000000"
-
-
-MAX_RETRIES = 2
-RETRY_DELAY = 5  # segundos
-TASK_TIMEOUT = 5  # segundos
-PING_TIMEOUT = 1 # segundos específico para ping
-PING_CHECK_INTERVAL = 1  # segundos entre verificações de ping
-
 # Models
 class WifiConfig(BaseModel):
     ssid: str
@@ -56,133 +211,170 @@ class ConnectedDevice(BaseModel):
     isBlocked: bool
 
 class DeviceManageRequest(BaseModel):
-    deviceId: str
+    deviceId: str = ""
     action: str
+    # Permite bloquear/desbloquear vários MACs na mesma task
+    deviceIds: Optional[List[str]] = None
+
+    def mac_addresses(self) -> List[str]:
+        macs = [self.deviceId] if self.deviceId else []
+        macs.extend(self.deviceIds or [])
+        return list(dict.fromkeys(mac for mac in macs if mac))
+
+class FleetRequest(BaseModel):
+    # Lista explícita de IDs ou uma query do GenieACS; sem nenhum dos dois, usa todo o registro
+    deviceIds: Optional[List[str]] = None
+    query: Optional[Dict[str, Any]] = None
 
 # Funções de Utilidade
 def get_mongo_client():
     return MongoClient(MONGO_URI)
 
-def get_device_from_mongo() -> Optional[Dict[str, Any]]:
+async def get_device_from_mongo(device_id: str, projection: Optional[List[str]] = None) -> Optional[DeviceSnapshot]:
+    """Busca o dispositivo, limitado às subárvores em ``projection``"""
+    variant = tuple(projection) if projection else None
+    return await device_cache.get(device_id, lambda: fetch_device(device_id, projection), variant)
+
+async def fetch_device(device_id: str, projection: Optional[List[str]] = None) -> Optional[DeviceSnapshot]:
     try:
         # Usa a API do GenieACS para buscar o dispositivo
-        query = {"_id": ROUTER_ID}
-        encoded_query = urllib.parse.quote(json.dumps(query))
-        response = requests.get(f"{GENIEACS_URL}/devices/?query={encoded_query}")
+        query = {"_id": device_id}
+        response = await genieacs.get_devices(
+            query,
+            build_projection(projection) if projection else None
+        )
         
+        if response.status_code >= 500:
+            # Falha do GenieACS não é "dispositivo inexistente"
+            logger.error(f"Erro ao buscar dispositivo: {response.status_code} - {response.text}")
+            raise HTTPException(status_code=503, detail="GenieACS indisponível")
         if response.status_code != 200:
             logger.error(f"Erro ao buscar dispositivo: {response.text}")
             return None
             
-        devices = response.json()
-        return devices[0] if devices else None
+        devices = loads_compact(response.content)
+        if not devices:
+            return None
+        # Aproveita a resposta para manter o registro atualizado
+        device_registry.upsert(devices[0])
+        # Só os registros compactos ficam no cache; a árvore é descartada aqui
+        return parse_device(devices[0])
+    except HTTPException:
+        # Circuito aberto ou orçamento esgotado: não confundir com "não encontrado"
+        raise
+    except httpx.TransportError as e:
+        logger.error(f"GenieACS inacessível: {str(e)}")
+        raise HTTPException(status_code=503, detail="GenieACS indisponível")
     except Exception as e:
         logger.error(f"Erro ao acessar GenieACS: {str(e)}")
         return None
 
-def is_device_online() -> bool:
+async def create_device_task(device_id: str, task: Dict[str, Any], timeout: Optional[float] = None) -> httpx.Response:
+    """Cria uma task no dispositivo, invalidando o cache em escritas"""
+    response = await genieacs.create_task(device_id, task, timeout=timeout)
+    if task.get("name") == "setParameterValues":
+        device_cache.invalidate(device_id)
+    return response
+
+async def submit_parameter_batch(device_id: str, batch: ParameterBatch, timeout: float = 10) -> str:
+    """Envia as escritas coalescidas como uma task setParameterValues e retorna o ID"""
+    response = await create_device_task(device_id, batch.to_task(), timeout=timeout)
+    if response.status_code not in [200, 202]:
+        logger.error(f"Erro ao criar task setParameterValues: {response.status_code} - {response.text}")
+        raise HTTPException(
+            status_code=500,
+            detail="Falha ao enviar parâmetros ao dispositivo"
+        )
+    task_id = response.json().get("_id")
+    if not task_id:
+        raise HTTPException(
+            status_code=500,
+            detail="ID da task não encontrado na resposta"
+        )
+    logger.info(f"Task setParameterValues criada com ID: {task_id} ({len(batch)} parâmetros)")
+    return task_id
+
+async def is_device_online(device_id: str) -> bool:
+    # Caminho rápido: o registro já sabe que o dispositivo está online
+    record = device_registry.get(device_id)
+    if record is not None and record.online:
+        return True
+    # Registro ausente ou desatualizado: confirma com uma busca barata
     try:
-        device = get_device_from_mongo()
-        if not device:
-            return False
-        
-        last_inform_time = device.get("_lastInform")
-        if not last_inform_time:
-            return False
-        
-        # Converte a string de data para datetime
-        try:
-            if isinstance(last_inform_time, str):
-                # Usa o formato ISO 8601
-                last_inform = datetime.fromisoformat(last_inform_time.replace('Z', '+00:00'))
-            else:
-                last_inform = last_inform_time
-                
-            # Verifica se o último inform foi nos últimos 5 minutos
-            return datetime.now(last_inform.tzinfo) - last_inform < timedelta(minutes=5)
-        except (ValueError, TypeError) as e:
-            logger.error(f"Erro ao processar data do último inform: {str(e)}")
-            return False
-            
+        device = await get_device_from_mongo(device_id, [LAST_INFORM_PATH])
+        return device_is_online(device)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao verificar status do dispositivo: {str(e)}")
         return False
 
-def wait_for_task_completion(task_id: str) -> bool:
-    """Aguarda a conclusão de uma task com melhor tratamento"""
-    logger.info(f"Aguardando conclusão da task {task_id}")
-    start_time = time.time()
-    attempts = 0
-    not_found_attempts = 0
-    max_not_found_attempts = 5  # Número máximo de tentativas quando a task não é encontrada
+def device_is_online(device: Optional[DeviceSnapshot]) -> bool:
+    """Avalia o estado online a partir de um documento que contenha _lastInform"""
+    if not device:
+        return False
+    # Verifica se o último inform foi nos últimos 5 minutos
+    return is_recent_inform(device.last_inform)
+
+def wifi_parameter_batch(config: WifiConfig) -> ParameterBatch:
+    """Monta as escritas TR-069 para aplicar a configuração Wi-Fi"""
+    batch = ParameterBatch()
+    batch.set(f"{WLAN_PATH}.SSID", config.ssid)
+    batch.set(f"{WLAN_PATH}.PreSharedKey.1.PreSharedKey", config.password)
     
-    while time.time() - start_time < TASK_TIMEOUT:
-        try:
-            # Aguarda um pouco antes de verificar o status
-            time.sleep(2)  # Aumentado para 2 segundos
-            
-            # Busca a task no GenieACS usando query
-            query = {"_id": task_id}
-            encoded_query = urllib.parse.quote(json.dumps(query))
-            
-            response = requests.get(
-                f"{GENIEACS_URL}/tasks/?query={encoded_query}",
-                headers={"Accept": "application/json"},
-                timeout=5  # Aumentado para 5 segundos
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Erro ao verificar task: {response.status_code} - {response.text}")
-                attempts += 1
-                if attempts >= 3:  # Máximo de 3 tentativas de erro de comunicação
-                    return False
-                continue
-            
-            tasks = response.json()
-            if not tasks:
-                logger.warning(f"Task {task_id} não encontrada")
-                not_found_attempts += 1
-                if not_found_attempts >= max_not_found_attempts:
-                    # Se a task não foi encontrada após várias tentativas, consideramos como sucesso
-                    # já que o GenieACS às vezes limpa as tasks completadas muito rapidamente
-                    logger.info(f"Task {task_id} não encontrada após {max_not_found_attempts} tentativas, assumindo sucesso")
-                    return True
-                continue
-            
-            task = tasks[0]  # Pega a primeira task encontrada
-            logger.debug(f"Status da task: {json.dumps(task, indent=2)}")
-            
-            if task.get("status") == "completed":
-                logger.info(f"Task {task_id} completada com sucesso")
-                return True
-            
-            if task.get("status") == "failed":
-                error_detail = task.get("fault", {}).get("detail", "Sem detalhes")
-                logger.error(f"Task {task_id} falhou: {error_detail}")
-                return False
-            
-            # Ainda em execução, continua o loop
-            
-        except requests.exceptions.Timeout:
-            logger.warning(f"Timeout ao verificar status da task {task_id}")
-            attempts += 1
-            if attempts >= 3:
-                return False
-            continue
-            
-        except Exception as e:
-            logger.error(f"Erro ao verificar status da task {task_id}: {str(e)}")
-            attempts += 1
-            if attempts >= 3:
-                return False
-            time.sleep(1)
-            
-    logger.error(f"Timeout aguardando conclusão da task {task_id}")
-    return False
+    # Adiciona configurações de segurança apenas se houver senha
+    if config.password:
+        batch.set(f"{WLAN_PATH}.BeaconType", "WPAbeacon")
+        batch.set(f"{WLAN_PATH}.WPAAuthenticationMode", "PSKAuthentication")
+        batch.set(f"{WLAN_PATH}.WPAEncryptionModes", "AESEncryption")
+        batch.set(f"{WLAN_PATH}.BasicAuthenticationMode", "None")
+    else:
+        # Se não houver senha, configura como rede aberta
+        batch.set(f"{WLAN_PATH}.BeaconType", "Basic")
+        batch.set(f"{WLAN_PATH}.BasicAuthenticationMode", "None")
+    
+    # Sempre habilita o Wi-Fi
+    batch.set(f"{WLAN_PATH}.Enable", "1", "xsd:boolean")
+    return batch
+
+def extract_wifi_config(device: DeviceSnapshot) -> Dict[str, str]:
+    """Extrai SSID e senha do documento (ou projeção WLANConfiguration.1)"""
+    return device.wifi.to_dict()
+
+async def resolve_device(device_id: str) -> str:
+    """Garante que o dispositivo existe no GenieACS (404 caso contrário)"""
+    if device_id in device_registry:
+        return device_id
+    if await get_device_from_mongo(device_id, [LAST_INFORM_PATH]) is None:
+        logger.error(f"Roteador {device_id} não encontrado")
+        raise HTTPException(status_code=404, detail="Roteador não encontrado")
+    return device_id
 
-def request_parameter_values(parameter_names: List[str]) -> Optional[str]:
+async def wait_for_task_completion(task_id: str, device_id: str, task_name: str = "setParameterValues") -> bool:
+    """Aguarda a conclusão de uma task através do poller compartilhado"""
+    logger.debug(f"Aguardando conclusão da task {task_id}")
+    start = time.perf_counter()
+    completed = await task_tracker.wait(task_id, bound(TASK_TIMEOUT))
+    task_completion_duration.observe(time.perf_counter() - start, task_name, "completed" if completed else "failed")
+    if completed:
+        # O documento do dispositivo só reflete a task após a conclusão
+        device_cache.invalidate(device_id)
+        push_hub.kick(device_id)
+    return completed
+
+async def retry_delay(operation: str, attempt: int) -> None:
+    """Pausa entre tentativas dos laços de MAX_RETRIES (backoff exponencial com
+    jitter), contando-as em /metrics; 504 se a pausa estourar o orçamento"""
+    genieacs_retries.inc(operation)
+    delay = backoff_delay(attempt, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+    left = remaining()
+    if left is not None and delay >= left:
+        raise DeadlineExceeded()
+    await asyncio.sleep(delay)
+
+async def request_parameter_values(device_id: str, parameter_names: List[str]) -> Optional[str]:
     """Solicita valores de parâmetros ao dispositivo"""
-    if not is_device_online():
+    if not await is_device_online(device_id):
         raise HTTPException(status_code=503, detail="Dispositivo offline")
     
     for attempt in range(MAX_RETRIES):
@@ -193,15 +385,12 @@ def request_parameter_values(parameter_names: List[str]) -> Optional[str]:
                 "parameterNames": parameter_names
             }
             
-            response = requests.post(
-                f"{GENIEACS_URL}/devices/{ROUTER_ID}/tasks?connection_request",
-                json=task_data
-            )
+            response = await create_device_task(device_id, task_data)
             
             if response.status_code not in [200, 202]:
                 logger.error(f"Erro ao criar task (tentativa {attempt + 1}): {response.text}")
                 if attempt < MAX_RETRIES - 1:
-                    time.sleep(RETRY_DELAY)
+                    await retry_delay("getParameterValues", attempt)
                     continue
                 raise HTTPException(status_code=500, detail="Falha ao solicitar parâmetros do dispositivo")
             
@@ -212,49 +401,63 @@ def request_parameter_values(parameter_names: List[str]) -> Optional[str]:
                 logger.error("Task ID não encontrado na resposta")
                 continue
                 
-            if wait_for_task_completion(task_id):
+            if await wait_for_task_completion(task_id, device_id, "getParameterValues"):
                 return task_id
                 
             logger.error(f"Task não completou (tentativa {attempt + 1})")
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
+                await retry_delay("getParameterValues", attempt)
                 
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Erro ao solicitar parâmetros (tentativa {attempt + 1}): {str(e)}")
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY)
+                await retry_delay("getParameterValues", attempt)
                 continue
             raise HTTPException(status_code=500, detail=str(e))
     
     raise HTTPException(status_code=500, detail="Falha ao obter parâmetros após várias tentativas")
 
 # Rotas da API
+# Fora do prefixo /tvm-roteador/api: o Traefik só roteia o prefixo, então as
+# métricas (latências, cache, retries) ficam acessíveis apenas na rede interna
+@app.get("/metrics")
+async def get_metrics():
+    """Métricas no formato de exposição do Prometheus"""
+    return PlainTextResponse(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/tvm-roteador/api/devices")
+async def list_devices(online: Optional[bool] = None):
+    """Lista os dispositivos do registro, opcionalmente filtrando pelo estado online"""
+    devices = [
+        record.to_dict() for record in device_registry
+        if online is None or record.online == online
+    ]
+    logger.info(f"Listando {len(devices)} dispositivos do registro", extra=fields(count=len(devices)))
+    return devices
+
 @app.get("/tvm-roteador/api/wifi-config")
-async def get_wifi_config():
+@app.get("/tvm-roteador/api/devices/{device_id}/wifi-config")
+async def get_wifi_config(device_id: str = ROUTER_ID):
     logger.info("Recebida requisição para obter configuração Wi-Fi")
     try:
-        logger.info(f"Buscando configuração do Wi-Fi do roteador {ROUTER_ID}")
+        logger.info(f"Buscando configuração do Wi-Fi do roteador {device_id}")
         
-        device = get_device_from_mongo()
+        filter_version = mac_filter_store.version(device_id)
+        device = await get_device_from_mongo(device_id, [WLAN_PATH])
         if not device:
             logger.error("Roteador não encontrado")
             raise HTTPException(status_code=404, detail="Roteador não encontrado")
         
-        # Acessa os parâmetros do Wi-Fi na estrutura correta do JSON
-        wifi_config = device.get("InternetGatewayDevice", {}).get("LANDevice", {}).get("1", {}).get("WLANConfiguration", {}).get("1", {})
-        logger.info(f"Configuração Wi-Fi encontrada: {json.dumps(wifi_config, indent=2)}")
-        
-        ssid = wifi_config.get("SSID", {}).get("_value", "")
-        password = wifi_config.get("PreSharedKey", {}).get("1", {}).get("PreSharedKey", {}).get("_value", "")
+        reconcile_mac_filter(device_id, device, filter_version)
+        response_data = extract_wifi_config(device)
+        ssid = response_data["ssid"]
+        password = response_data["password"]
         
         logger.info(f"SSID encontrado: {ssid}")
         logger.info(f"Senha encontrada: {'*' * len(password) if password else 'Não encontrada'}")
-        
-        response_data = {
-            "ssid": ssid,
-            "password": password
-        }
-        logger.info(f"Dados retornados: {json.dumps(response_data, indent=2)}")
+        logger.debug("Dados retornados: %s", LazyJSON(response_data))
         
         return response_data
     except HTTPException:
@@ -264,15 +467,27 @@ async def get_wifi_config():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/tvm-roteador/api/configure-wifi")
-async def configure_wifi(config: WifiConfig):
+@app.post("/tvm-roteador/api/devices/{device_id}/configure-wifi")
+async def configure_wifi(
+    config: WifiConfig,
+    device_id: str = ROUTER_ID,
+    run_async: bool = Query(False, alias="async"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     logger.info("Recebida requisição para configurar Wi-Fi")
+    return await submit_write(
+        "configure-wifi", device_id, config, lambda: run_configure_wifi(config, device_id),
+        idempotency_key, run_async
+    )
+
+async def run_configure_wifi(config: WifiConfig, device_id: str) -> Dict[str, Any]:
     try:
         logger.info(f"Atualizando configuração do Wi-Fi para SSID: {config.ssid}")
-        logger.info(f"Dados recebidos: {json.dumps(config.model_dump(), indent=2)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Dados recebidos: %s", LazyJSON(config.model_dump()))
         
-        if not is_device_online():
-            logger.error("Dispositivo offline")
-            raise HTTPException(status_code=503, detail="Dispositivo offline")
+        await resolve_device(device_id)
+        online = await is_device_online(device_id)
         
         # Validações básicas
         if not config.ssid or len(config.ssid) < 1:
@@ -285,74 +500,46 @@ async def configure_wifi(config: WifiConfig):
             raise HTTPException(status_code=400, detail="Senha não pode ter mais que 63 caracteres")
             
         # Configura os parâmetros no formato correto do TR-069 (array triplo)
-        parameter_values = [
-            ["InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.SSID", config.ssid, "xsd:string"],
-            ["InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.PreSharedKey.1.PreSharedKey", config.password, "xsd:string"]
-        ]
-        
-        # Adiciona configurações de segurança apenas se houver senha
-        if config.password:
-            parameter_values.extend([
-                ["InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.BeaconType", "WPAbeacon", "xsd:string"],
-                ["InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.WPAAuthenticationMode", "PSKAuthentication", "xsd:string"],
-                ["InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.WPAEncryptionModes", "AESEncryption", "xsd:string"],
-                ["InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.BasicAuthenticationMode", "None", "xsd:string"]
-            ])
-        else:
-            # Se não houver senha, configura como rede aberta
-            parameter_values.extend([
-                ["InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.BeaconType", "Basic", "xsd:string"],
-                ["InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.BasicAuthenticationMode", "None", "xsd:string"]
-            ])
-        
-        # Sempre habilita o Wi-Fi
-        parameter_values.append(
-            ["InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.Enable", "1", "xsd:boolean"]
-        )
+        batch = wifi_parameter_batch(config)
         
-        # Cria a task
-        task_data = {
-            "name": "setParameterValues",
-            "parameterValues": parameter_values
-        }
+        if not online:
+            queued = queue_offline_write(device_id, lambda pending: pending.merge(batch))
+            return {
+                "message": "Roteador offline: configuração será aplicada no próximo inform",
+                "ssid": config.ssid,
+                "status": "queued",
+                "pendingParameters": queued
+            }
         
-        logger.info(f"Enviando configuração: {json.dumps(task_data, indent=2)}")
+        logger.info(f"Enviando configuração: {len(batch)} parâmetros")
+        logger.debug("Task de configuração: %s", LazyJSON(batch.to_task()))
         
         # Envia a requisição para o GenieACS com retry
         for attempt in range(MAX_RETRIES):
             try:
-                response = requests.post(
-                    f"{GENIEACS_URL}/devices/{ROUTER_ID}/tasks?connection_request",
-                    json=task_data,
-                    headers={"Content-Type": "application/json"},
-                    timeout=10
-                )
-                
-                if response.status_code not in [200, 202]:
-                    logger.error(f"Erro na tentativa {attempt + 1}: {response.status_code} - {response.text}")
+                # Envio e confirmação passam pelo coalescedor: escritas próximas
+                # no mesmo roteador compartilham a task
+                report_progress(f"Enviando configuração (tentativa {attempt + 1})")
+                try:
+                    result = await write_coalescer.submit(device_id, lambda pending: pending.merge(batch))
+                except HTTPException as e:
+                    if e.status_code != 500:
+                        raise
+                    logger.error(f"Erro na tentativa {attempt + 1}: {e.detail}")
                     if attempt < MAX_RETRIES - 1:
-                        time.sleep(RETRY_DELAY)
+                        await retry_delay("configure-wifi", attempt)
                         continue
                     raise HTTPException(
                         status_code=500,
-                        detail=f"Falha ao atualizar configuração do Wi-Fi: {response.text}"
+                        detail=f"Falha ao atualizar configuração do Wi-Fi: {e.detail}"
                     )
                 
-                task = response.json()
-                task_id = task.get("_id")
-                if not task_id:
-                    raise HTTPException(
-                        status_code=500,
-                        detail="ID da task não encontrado na resposta"
-                    )
-                
-                logger.info(f"Task de configuração Wi-Fi criada com ID: {task_id}")
+                logger.info(f"Task de configuração Wi-Fi {result.task_id} processada ({result.writes} escrita(s) no lote)")
                 
-                # Aguarda a conclusão da task
-                if not wait_for_task_completion(task_id):
+                if not result.completed:
                     if attempt < MAX_RETRIES - 1:
                         logger.warning(f"Tentativa {attempt + 1} falhou, tentando novamente...")
-                        time.sleep(RETRY_DELAY)
+                        await retry_delay("configure-wifi", attempt)
                         continue
                     return {
                         "message": "Configuração do Wi-Fi atualizada, mas não foi possível confirmar a atualização",
@@ -367,10 +554,10 @@ async def configure_wifi(config: WifiConfig):
                     "status": "success"
                 }
                 
-            except requests.exceptions.RequestException as e:
+            except httpx.HTTPError as e:
                 logger.error(f"Erro de conexão na tentativa {attempt + 1}: {str(e)}")
                 if attempt < MAX_RETRIES - 1:
-                    time.sleep(RETRY_DELAY)
+                    await retry_delay("configure-wifi", attempt)
                     continue
                 raise HTTPException(
                     status_code=500,
@@ -389,60 +576,41 @@ async def configure_wifi(config: WifiConfig):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/tvm-roteador/api/connected-devices")
-async def get_connected_devices():
+@app.get("/tvm-roteador/api/devices/{device_id}/connected-devices")
+async def get_connected_devices(device_id: str = ROUTER_ID, since: Optional[int] = None):
+    """Lista os hosts ativos; com ``since`` retorna apenas as mudanças após essa versão"""
     logger.info("Recebida requisição para listar dispositivos conectados")
     try:
-        logger.info(f"Buscando dispositivos conectados ao roteador {ROUTER_ID}")
+        logger.info(f"Buscando dispositivos conectados ao roteador {device_id}")
         
-        device = get_device_from_mongo()
+        # Uma única busca traz os hosts e o _lastInform usado na checagem online
+        device = await get_device_from_mongo(device_id, [LAST_INFORM_PATH, HOSTS_PATH])
         if not device:
             logger.error("Roteador não encontrado")
             raise HTTPException(status_code=404, detail="Roteador não encontrado")
         
         # Verifica se o dispositivo está online
-        if not is_device_online():
+        if not device_is_online(device):
             logger.warning("Roteador está offline")
             raise HTTPException(status_code=503, detail="Roteador está offline")
         
-        # Acessa os hosts na estrutura correta do JSON
-        hosts = device.get("InternetGatewayDevice", {}).get("LANDevice", {}).get("1", {}).get("Hosts", {}).get("Host", {})
-        logger.info(f"Hosts encontrados: {json.dumps(hosts, indent=2)}")
+        table = host_index.update(device_id, device, mac_filter_store.blocked(device_id))
+        # Os hosts já são tipos JSON simples: responde direto, sem o jsonable_encoder
+        headers = {"X-Hosts-Version": str(table.version)}
+        if since is not None:
+            delta = table.delta(since)
+            logger.info(f"Delta de hosts desde a versão {since}: {len(delta['added'])} novos, {len(delta['changed'])} alterados, {len(delta['removed'])} removidos")
+            return FastJSONResponse(delta, headers=headers)
         
-        connected_devices = []
+        connected_devices = table.hosts()
         
-        # Verifica se hosts é um dicionário
-        if not isinstance(hosts, dict):
-            logger.error(f"Formato inválido de hosts: {type(hosts)}")
-            return []
-            
-        for host_id, host_data in hosts.items():
-            if not isinstance(host_data, dict):
-                continue
-                
-            # Extrai os valores necessários
-            mac_address = host_data.get("MACAddress", {}).get("_value", "")
-            hostname = host_data.get("HostName", {}).get("_value", "")
-            ip_address = host_data.get("IPAddress", {}).get("_value", "")
-            
-            # Verifica se temos pelo menos o MAC address
-            if not mac_address:
-                continue
-                
-            # Considera o dispositivo como ativo se tiver IP e MAC
-            if ip_address and mac_address:
-                device_info = {
-                    "id": mac_address,
-                    "name": hostname or "Dispositivo Desconhecido",
-                    "isBlocked": False,  # Por enquanto, todos começam como não bloqueados
-                    "ipAddress": ip_address  # Adicionando IP address para mais informações
-                }
-                logger.info(f"Adicionando dispositivo: {json.dumps(device_info, indent=2)}")
-                connected_devices.append(device_info)
-        
-        logger.info(f"Total de dispositivos ativos encontrados: {len(connected_devices)}")
-        logger.info(f"Lista completa de dispositivos: {json.dumps(connected_devices, indent=2)}")
+        logger.info(
+            f"Total de dispositivos ativos encontrados: {len(connected_devices)}",
+            extra=fields(device_id=device_id, count=len(connected_devices), hosts_version=table.version)
+        )
+        logger.debug("Lista completa de dispositivos: %s", LazyJSON(connected_devices))
         
-        return connected_devices
+        return FastJSONResponse(connected_devices, headers=headers)
         
     except HTTPException:
         raise
@@ -454,13 +622,25 @@ async def get_connected_devices():
         )
 
 @app.post("/tvm-roteador/api/manage-device")
-async def manage_device(request: DeviceManageRequest):
+@app.post("/tvm-roteador/api/devices/{device_id}/manage-device")
+async def manage_device(
+    request: DeviceManageRequest,
+    device_id: str = ROUTER_ID,
+    run_async: bool = Query(False, alias="async"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     logger.info("Recebida requisição para gerenciar dispositivo")
+    return await submit_write(
+        "manage-device", device_id, request, lambda: run_manage_device(request, device_id),
+        idempotency_key, run_async
+    )
+
+async def run_manage_device(request: DeviceManageRequest, device_id: str) -> Dict[str, Any]:
     try:
         logger.info(f"Gerenciando dispositivo {request.deviceId}: {request.action}")
         
-        if not is_device_online():
-            raise HTTPException(status_code=503, detail="Dispositivo offline")
+        await resolve_device(device_id)
+        online = await is_device_online(device_id)
             
         # Valida a ação
         if request.action not in ["block", "unblock"]:
@@ -469,132 +649,51 @@ async def manage_device(request: DeviceManageRequest):
                 detail="Ação inválida. Use 'block' ou 'unblock'"
             )
             
-        # Primeiro, configura a política de filtro
-        policy_task = {
-            "name": "setParameterValues",
-            "parameterValues": [
-                ["InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.X_HUAWEI_WlanMacFilterpolicy", 
-                 "deny" if request.action == "block" else "allow", 
-                 "xsd:string"]
-            ]
-        }
-        
-        logger.info(f"Configurando política de filtro MAC para {request.action}...")
-        response = requests.post(
-            f"{GENIEACS_URL}/devices/{ROUTER_ID}/tasks?connection_request",
-            json=policy_task,
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
-        
-        if response.status_code not in [200, 202]:
-            logger.error(f"Erro ao configurar política de filtro MAC: {response.status_code} - {response.text}")
-            raise HTTPException(
-                status_code=500,
-                detail="Falha ao configurar política de filtro MAC"
-            )
-            
-        # Aguarda a conclusão da primeira task
-        task = response.json()
-        task_id = task.get("_id")
-        if not task_id:
-            raise HTTPException(
-                status_code=500,
-                detail="ID da task não encontrado na resposta"
-            )
-            
-        logger.info(f"Aguardando conclusão da task de configuração da política (ID: {task_id})...")
-        if not wait_for_task_completion(task_id):
-            raise HTTPException(
-                status_code=500,
-                detail="Falha ao configurar política de filtro MAC"
-            )
-            
-        # Agora, configura o MAC address
-        mac_task = {
-            "name": "setParameterValues",
-            "parameterValues": [
-                ["InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.X_HUAWEI_WlanMacFilterMac", 
-                 request.deviceId,
-                 "xsd:string"]
-            ]
-        }
+        macs = request.mac_addresses()
+        if not macs:
+            raise HTTPException(status_code=400, detail="Nenhum MAC informado")
         
-        logger.info(f"Configurando MAC address para filtro: {request.deviceId}")
-        response = requests.post(
-            f"{GENIEACS_URL}/devices/{ROUTER_ID}/tasks?connection_request",
-            json=mac_task,
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
+        requested = {mac.upper() for mac in macs}
         
-        if response.status_code not in [200, 202]:
-            logger.error(f"Erro ao configurar MAC address: {response.status_code} - {response.text}")
-            raise HTTPException(
-                status_code=500,
-                detail="Falha ao configurar MAC address para filtro"
-            )
-            
-        # Aguarda a conclusão da segunda task
-        task = response.json()
-        task_id = task.get("_id")
-        if not task_id:
-            raise HTTPException(
-                status_code=500,
-                detail="ID da task não encontrado na resposta"
-            )
-            
-        logger.info(f"Aguardando conclusão da task de configuração do MAC (ID: {task_id})...")
-        if not wait_for_task_completion(task_id):
-            raise HTTPException(
-                status_code=500,
-                detail="Falha ao configurar MAC address para filtro"
-            )
-            
-        # Por fim, habilita o filtro MAC
-        enable_filter_task = {
-            "name": "setParameterValues",
-            "parameterValues": [
-                ["InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.MACAddressControlEnabled", "1", "xsd:boolean"]
-            ]
-        }
+        def build(batch: ParameterBatch) -> None:
+            # O filtro é uma lista de bloqueio (deny): block/unblock alteram o
+            # conjunto atual (o do lote, se outra escrita já o alterou) em vez
+            # de substituí-lo pelos MACs da requisição
+            if MAC_FILTER_LIST_PATH in batch:
+                current = {mac for mac in batch.get(MAC_FILTER_LIST_PATH).split(",") if mac}
+            else:
+                current = set(mac_filter_store.blocked(device_id))
+            blocked = current | requested if request.action == "block" else current - requested
+            # Política, lista de MACs e habilitação do filtro na mesma task
+            batch.set(MAC_FILTER_POLICY_PATH, "deny")
+            batch.set(MAC_FILTER_LIST_PATH, ",".join(sorted(blocked)))
+            batch.set(MAC_FILTER_ENABLED_PATH, "1" if blocked else "0", "xsd:boolean")
         
-        logger.info("Habilitando filtro MAC...")
-        response = requests.post(
-            f"{GENIEACS_URL}/devices/{ROUTER_ID}/tasks?connection_request",
-            json=enable_filter_task,
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
+        if not online:
+            queue_offline_write(device_id, build)
+            return {
+                "message": "Roteador offline: filtro MAC será aplicado no próximo inform",
+                "status": "queued",
+                "deviceId": request.deviceId,
+                "deviceIds": macs,
+                "action": request.action
+            }
         
-        if response.status_code not in [200, 202]:
-            logger.error(f"Erro ao habilitar filtro MAC: {response.status_code} - {response.text}")
-            raise HTTPException(
-                status_code=500,
-                detail="Falha ao habilitar filtro MAC"
-            )
-            
-        # Aguarda a conclusão da terceira task
-        task = response.json()
-        task_id = task.get("_id")
-        if not task_id:
-            raise HTTPException(
-                status_code=500,
-                detail="ID da task não encontrado na resposta"
-            )
-            
-        logger.info(f"Aguardando conclusão da task de habilitação do filtro (ID: {task_id})...")
-        if not wait_for_task_completion(task_id):
+        logger.info(f"Configurando filtro MAC ({request.action}) para {len(macs)} dispositivo(s)...")
+        report_progress("Enviando filtro MAC")
+        result = await write_coalescer.submit(device_id, build)
+        if not result.completed:
             raise HTTPException(
                 status_code=500,
-                detail="Falha ao habilitar filtro MAC"
+                detail="Falha ao configurar filtro MAC"
             )
             
-        logger.info(f"Dispositivo {request.deviceId} {request.action}eado com sucesso")
+        logger.info(f"Dispositivo(s) {', '.join(macs)} {request.action}eado(s) com sucesso")
         return {
             "message": f"Dispositivo {request.action}eado com sucesso",
             "status": "success",
             "deviceId": request.deviceId,
+            "deviceIds": macs,
             "action": request.action
         }
         
@@ -605,17 +704,58 @@ async def manage_device(request: DeviceManageRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/tvm-roteador/api/latency")
-async def get_latency():
+@app.get("/tvm-roteador/api/devices/{device_id}/latency")
+async def get_latency(
+    device_id: str = ROUTER_ID,
+    run_async: bool = Query(False, alias="async"),
+    fresh: bool = False,
+    history: bool = False,
+    window: Optional[float] = None
+):
+    """Responde com a última amostra do amostrador em segundo plano.
+
+    ``fresh`` força um diagnóstico agora; ``history``/``window`` incluem o
+    histórico e estatísticas (min/média/máx e percentis) da janela em segundos.
+    """
     logger.info("Recebida requisição para medir latência")
+    await resolve_device(device_id)
+    sampler = latency_samplers.get(device_id)
+    if run_async:
+        return accept_job("latency", device_id, lambda: measure_latency_now(sampler))
+    
+    if fresh:
+        sample = await sampler.measure()
+    else:
+        sample = await sampler.wait_first(bound(LATENCY_FIRST_SAMPLE_TIMEOUT))
+    if sample is None:
+        if sampler.last_error is not None:
+            raise HTTPException(status_code=sampler.last_error.status_code, detail=sampler.last_error.detail)
+        raise HTTPException(status_code=504, detail="Timeout aguardando resultados do ping")
+    
+    response_data = sample.to_dict()
+    # Indica que a última tentativa falhou e a amostra é anterior a ela
+    response_data["stale"] = sampler.last_error is not None
+    if history or window is not None:
+        response_data["stats"] = sampler.stats(window)
+    if history:
+        response_data["history"] = [item.to_dict() for item in sampler.window(window)]
+    return response_data
+
+async def measure_latency_now(sampler) -> Dict[str, Any]:
+    return (await sampler.measure()).to_dict()
+
+async def run_latency_test(device_id: str) -> Dict[str, Any]:
     try:
-        logger.info(f"Iniciando teste de latência para o roteador {ROUTER_ID}")
+        logger.info(f"Iniciando teste de latência para o roteador {device_id}")
         
+        await resolve_device(device_id)
         # Verifica se o dispositivo está online
-        if not is_device_online():
+        if not await is_device_online(device_id):
             logger.warning("Roteador está offline")
             raise HTTPException(status_code=503, detail="Roteador está offline")
 
         # Primeiro, limpa qualquer diagnóstico anterior
+        report_progress("Limpando diagnóstico anterior")
         clear_task = {
             "name": "setParameterValues",
             "parameterValues": [
@@ -624,15 +764,10 @@ async def get_latency():
         }
         
         try:
-            response = requests.post(
-                f"{GENIEACS_URL}/devices/{ROUTER_ID}/tasks?connection_request",
-                json=clear_task,
-                headers={"Content-Type": "application/json"},
-                timeout=5
-            )
+            response = await create_device_task(device_id, clear_task, timeout=5)
             if response.status_code in [200, 202]:
                 logger.info("Estado de diagnóstico anterior limpo")
-                time.sleep(1)
+                await asyncio.sleep(1)
         except Exception as e:
             logger.warning(f"Erro ao limpar diagnóstico anterior: {str(e)}")
 
@@ -648,15 +783,12 @@ async def get_latency():
             ]
         }
 
-        logger.info(f"Enviando configuração de ping: {json.dumps(task_data, indent=2)}")
+        logger.info(f"Enviando configuração de ping para {device_id}")
+        logger.debug("Task de ping: %s", LazyJSON(task_data))
 
         # Envia a requisição para iniciar o diagnóstico
-        response = requests.post(
-            f"{GENIEACS_URL}/devices/{ROUTER_ID}/tasks?connection_request",
-            json=task_data,
-            headers={"Content-Type": "application/json"},
-            timeout=5
-        )
+        report_progress("Iniciando teste de ping")
+        response = await create_device_task(device_id, task_data, timeout=5)
 
         if response.status_code not in [200, 202]:
             logger.error(f"Erro ao iniciar teste de ping: {response.status_code} - {response.text}")
@@ -666,24 +798,17 @@ async def get_latency():
             )
 
         # Aguarda um pouco antes de começar a verificar os resultados
-        time.sleep(2)
+        await asyncio.sleep(2)
 
         # Monitora os resultados do ping
+        report_progress("Aguardando resultados do ping")
         start_time = time.time()
         while time.time() - start_time < PING_TIMEOUT:
             try:
-                query = {"_id": ROUTER_ID}
-                projection = {
-                    "InternetGatewayDevice.IPPingDiagnostics": 1
-                }
+                query = {"_id": device_id}
+                projection = build_projection([PING_PATH])
                 
-                encoded_query = urllib.parse.quote(json.dumps(query))
-                encoded_projection = urllib.parse.quote(json.dumps(projection))
-                
-                response = requests.get(
-                    f"{GENIEACS_URL}/devices?query={encoded_query}&projection={encoded_projection}",
-                    timeout=5
-                )
+                response = await genieacs.get_devices(query, projection, timeout=5)
                 
                 if response.status_code != 200:
                     raise HTTPException(
@@ -691,26 +816,23 @@ async def get_latency():
                         detail="Erro ao buscar resultados do ping"
                     )
 
-                device = response.json()[0]
-                ping_results = device.get("InternetGatewayDevice", {}).get("IPPingDiagnostics", {})
+                ping = parse_device(loads_compact(response.content)[0]).ping
                 
                 # Verifica o estado do diagnóstico
-                diagnostics_state = ping_results.get("DiagnosticsState", {}).get("_value", "")
-                
-                if diagnostics_state == "Complete":
-                    # Extrai os resultados
-                    success_count = int(ping_results.get("SuccessCount", {}).get("_value", 0) or 0)
-                    failure_count = int(ping_results.get("FailureCount", {}).get("_value", 0) or 0)
+                if ping.state == "Complete":
+                    success_count, failure_count = ping.success, ping.failure
                     
                     # Calcula as estatísticas apenas se houver pings bem-sucedidos
                     if success_count > 0:
-                        avg_time = float(ping_results.get("AverageResponseTime", {}).get("_value", 0) or 0)
-                        min_time = float(ping_results.get("MinimumResponseTime", {}).get("_value", 0) or 0)
-                        max_time = float(ping_results.get("MaximumResponseTime", {}).get("_value", 0) or 0)
+                        avg_time, min_time, max_time = ping.average, ping.minimum, ping.maximum
                     else:
                         avg_time = min_time = max_time = 0
 
-                    logger.info(f"Teste de ping concluído com sucesso. Resultados: {json.dumps(ping_results, indent=2)}")
+                    logger.info(
+                        f"Teste de ping concluído com sucesso: {success_count} ok, {failure_count} falhas, média {avg_time}ms",
+                        extra=fields(device_id=device_id, success=success_count, failure=failure_count, average=avg_time)
+                    )
+                    logger.debug("Resultados do ping: %s", ping)
 
                     return {
                         "average": avg_time,
@@ -720,20 +842,20 @@ async def get_latency():
                         "failure": failure_count,
                         "total": success_count + failure_count
                     }
-                elif diagnostics_state == "Error":
+                elif ping.state == "Error":
                     raise HTTPException(
                         status_code=500,
                         detail="Erro ao executar teste de ping no dispositivo"
                     )
                 
                 # Se ainda não completou, aguarda um pouco antes da próxima verificação
-                time.sleep(PING_CHECK_INTERVAL)
+                await asyncio.sleep(PING_CHECK_INTERVAL)
 
             except HTTPException:
                 raise
             except Exception as e:
                 logger.error(f"Erro ao verificar resultados do ping: {str(e)}")
-                time.sleep(PING_CHECK_INTERVAL)
+                await asyncio.sleep(PING_CHECK_INTERVAL)
 
         # Se chegou aqui, é timeout
         raise HTTPException(
@@ -747,6 +869,255 @@ async def get_latency():
         logger.error(f"Erro ao executar teste de latência: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Escritas coalescidas e idempotência
+def apply_written_state(device_id: str, batch: ParameterBatch) -> None:
+    """Registra o estado confirmado de um lote aplicado no roteador"""
+    # O lote partiu da fila pendente (base do coalescedor): ela foi aplicada
+    pending_writes.commit(device_id)
+    if device_id not in pending_writes:
+        pending_attempts.pop(device_id, None)
+    if MAC_FILTER_LIST_PATH not in batch:
+        return
+    enabled = batch.get(MAC_FILTER_ENABLED_PATH) == "1" and batch.get(MAC_FILTER_POLICY_PATH) == "deny"
+    blocked = [mac for mac in batch.get(MAC_FILTER_LIST_PATH).split(",") if mac] if enabled else []
+    mac_filter_store.replace(device_id, blocked, source="task")
+    if host_index.set_blocked(device_id, mac_filter_store.blocked(device_id)):
+        push_hub.kick(device_id)
+
+def write_fingerprint(kind: str, device_id: str, payload: BaseModel) -> str:
+    """Identifica escritas idênticas (mesma operação, roteador e conteúdo)"""
+    digest = hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+    return f"{kind}:{device_id}:{digest}"
+
+async def submit_write(
+    kind: str,
+    device_id: str,
+    payload: BaseModel,
+    factory,
+    idempotency_key: Optional[str],
+    run_async: bool
+):
+    """Executa uma escrita como job, reaproveitando o job de uma chave de
+    idempotência repetida ou de uma escrita idêntica em andamento"""
+    job = job_store.submit(kind, device_id, factory, idempotency_key, write_fingerprint(kind, device_id, payload))
+    if run_async:
+        return job_accepted(job)
+    if not await job.wait_done(bound(None)):
+        # Ainda em andamento ao fim do orçamento: o cliente acompanha pelo job
+        return job_accepted(job)
+    if job.status == "failed":
+        raise HTTPException(status_code=job.status_code or 500, detail=job.error)
+    return job.result
+
+# Fila de escritas para roteadores offline
+def queue_offline_write(device_id: str, build) -> int:
+    """Aplica o builder sobre as escritas pendentes e enfileira o que mudou"""
+    before = pending_writes.pending(device_id)
+    after = pending_writes.pending(device_id)
+    build(after)
+    changed = ParameterBatch(
+        (path, value, type_) for path, value, type_ in after.parameter_values()
+        if path not in before or before.get(path) != value
+    )
+    if changed:
+        pending_writes.queue(device_id, changed)
+    report_progress("Enfileirado até o próximo inform do roteador")
+    return len(after)
+
+async def flush_pending_device(device_id: str) -> None:
+    try:
+        result = await write_coalescer.submit(device_id, lambda batch: None)
+        if result.completed:
+            logger.info(f"Escritas pendentes aplicadas em {device_id} (task {result.task_id or '-'})")
+        else:
+            logger.warning(f"Escritas pendentes de {device_id} não confirmadas; nova tentativa no próximo inform")
+    except Exception as e:
+        logger.error(f"Erro ao aplicar escritas pendentes de {device_id}: {str(e)}")
+    finally:
+        pending_flushes.discard(device_id)
+
+async def flush_pending_writes() -> None:
+    """Dispara o envio das filas cujos roteadores informaram após o enfileiramento"""
+    device_ids = [device_id for device_id in pending_writes.routers() if device_id not in pending_flushes]
+    for start in range(0, len(device_ids), PENDING_WRITE_QUERY_SIZE):
+        chunk = device_ids[start:start + PENDING_WRITE_QUERY_SIZE]
+        response = await genieacs.get_devices(
+            {"_id": {"$in": chunk}},
+            build_projection(REGISTRY_PROJECTION)
+        )
+        if response.status_code != 200:
+            logger.error(f"Erro ao consultar inform de roteadores com escritas pendentes: {response.status_code}")
+            return
+        for document in json_codec.loads(response.content):
+            device_registry.upsert(document)
+            device_id = document.get("_id")
+            last_inform = parse_last_inform(document.get("_lastInform"))
+            queued_since = pending_writes.queued_since(device_id)
+            if last_inform is None or queued_since is None or last_inform <= queued_since:
+                continue
+            # Após uma tentativa que falhou, espera o próximo inform
+            attempted = pending_attempts.get(device_id)
+            if attempted is not None and last_inform <= attempted:
+                continue
+            if device_id in pending_flushes or not is_recent_inform(last_inform):
+                continue
+            pending_flushes.add(device_id)
+            pending_attempts[device_id] = last_inform
+            spawn(flush_pending_device(device_id))
+
+async def run_pending_write_flusher() -> None:
+    while True:
+        try:
+            await flush_pending_writes()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao verificar escritas pendentes: {str(e)}")
+        await asyncio.sleep(PENDING_WRITE_CHECK_INTERVAL)
+
+# Reconciliação do filtro MAC
+def reconcile_mac_filter(device_id: str, device: Optional[DeviceSnapshot], version: int) -> None:
+    """Atualiza o estado salvo a partir dos parâmetros de filtro do roteador.
+
+    ``version`` é a versão do estado salvo antes da busca do documento: se
+    uma escrita foi aplicada enquanto ele era buscado, o documento é mais
+    antigo que o estado salvo e é ignorado.
+    """
+    if not device:
+        return
+    blocked = blocked_macs_from_wlan(device.wifi)
+    if blocked is None:
+        return
+    if mac_filter_store.replace(device_id, blocked, source="reconcile", if_version=version):
+        host_index.set_blocked(device_id, mac_filter_store.blocked(device_id))
+
+async def mac_filter_reconcile_worker(device_id: str) -> Dict[str, Any]:
+    version = mac_filter_store.version(device_id)
+    reconcile_mac_filter(device_id, await get_device_from_mongo(device_id, [WLAN_PATH]), version)
+    return {}
+
+async def reconcile_mac_filters() -> None:
+    """Relê o filtro dos roteadores com estado salvo ou hosts em memória"""
+    device_ids = sorted(set(mac_filter_store.routers()) | set(host_index.ids()))
+    async for line in fan_out(device_ids, mac_filter_reconcile_worker, FLEET_CONCURRENCY):
+        if line["status"] == "error":
+            logger.warning(f"Falha ao reconciliar filtro MAC de {line['id']}: {line['detail']}")
+
+async def run_mac_filter_reconcile() -> None:
+    while True:
+        try:
+            await reconcile_mac_filters()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Erro na reconciliação do filtro MAC: {str(e)}")
+        await asyncio.sleep(MAC_FILTER_RECONCILE_INTERVAL)
+
+# Canal de push (SSE)
+async def read_push_state(device_id: str) -> Dict[str, Any]:
+    """Estado publicado no canal de push: online e a HostTable (None se desconhecida)"""
+    # Mantém o amostrador de latência ativo enquanto houver inscritos
+    latency_samplers.get(device_id)
+    device = await get_device_from_mongo(device_id, [LAST_INFORM_PATH, HOSTS_PATH])
+    online = device_is_online(device)
+    return {
+        "online": online,
+        "hosts": host_index.update(device_id, device, mac_filter_store.blocked(device_id)) if online else None
+    }
+
+@app.get("/tvm-roteador/api/events")
+@app.get("/tvm-roteador/api/devices/{device_id}/events")
+async def device_events(device_id: str = ROUTER_ID):
+    """Stream SSE: snapshot inicial e depois eventos status, hosts e latency"""
+    await resolve_device(device_id)
+    return StreamingResponse(
+        push_hub.stream(device_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Jobs assíncronos
+def accept_job(kind: str, device_id: str, factory) -> JSONResponse:
+    """Inicia a operação em segundo plano e responde 202 com o ID do job"""
+    return job_accepted(job_store.submit(kind, device_id, factory))
+
+def job_accepted(job: Job) -> JSONResponse:
+    status_url = f"/tvm-roteador/api/jobs/{job.id}"
+    return JSONResponse(
+        status_code=202,
+        content={"jobId": job.id, "status": job.status, "statusUrl": status_url, "eventsUrl": f"{status_url}/events"},
+        headers={"Location": status_url}
+    )
+
+def get_job_or_404(job_id: str):
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+@app.get("/tvm-roteador/api/jobs/{job_id}")
+async def get_job(job_id: str, version: Optional[int] = None, wait: float = 0):
+    """Estado do job; com ``version`` e ``wait`` faz long-poll até a próxima mudança"""
+    job = get_job_or_404(job_id)
+    if version is not None and wait > 0:
+        await job.wait_for_change(version, bound(min(wait, JOB_WAIT_MAX)))
+    return job.to_dict()
+
+@app.get("/tvm-roteador/api/jobs/{job_id}/events")
+async def get_job_events(job_id: str):
+    """Stream SSE com cada mudança de estado do job"""
+    job = get_job_or_404(job_id)
+    return StreamingResponse(
+        job_events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Rotas de frota (várias CPEs por chamada, resposta em NDJSON)
+async def resolve_fleet(request: FleetRequest) -> List[str]:
+    if request.deviceIds:
+        return list(dict.fromkeys(request.deviceIds))
+    if request.query:
+        projection = build_projection(["_id"])
+        return [document["_id"] async for document in genieacs.iter_devices(request.query, projection)]
+    return device_registry.ids()
+
+def fleet_response(device_ids: List[str], worker) -> StreamingResponse:
+    logger.info(f"Processando {len(device_ids)} dispositivos (concorrência {FLEET_CONCURRENCY})")
+    return StreamingResponse(
+        ndjson_stream(fan_out(device_ids, worker, FLEET_CONCURRENCY, REQUEST_BUDGET or None)),
+        media_type="application/x-ndjson"
+    )
+
+async def fleet_status_worker(device_id: str) -> Dict[str, Any]:
+    return {"online": await is_device_online(device_id)}
+
+async def fleet_wifi_worker(device_id: str) -> Dict[str, Any]:
+    device = await get_device_from_mongo(device_id, [WLAN_PATH])
+    if not device:
+        raise HTTPException(status_code=404, detail="Roteador não encontrado")
+    return extract_wifi_config(device)
+
+async def fleet_hosts_worker(device_id: str) -> Dict[str, Any]:
+    device = await get_device_from_mongo(device_id, [LAST_INFORM_PATH, HOSTS_PATH])
+    if not device:
+        raise HTTPException(status_code=404, detail="Roteador não encontrado")
+    if not device_is_online(device):
+        raise HTTPException(status_code=503, detail="Roteador está offline")
+    return {"hosts": host_index.update(device_id, device, mac_filter_store.blocked(device_id)).hosts()}
+
+@app.post("/tvm-roteador/api/fleet/status")
+async def fleet_status(request: FleetRequest):
+    return fleet_response(await resolve_fleet(request), fleet_status_worker)
+
+@app.post("/tvm-roteador/api/fleet/wifi-config")
+async def fleet_wifi_config(request: FleetRequest):
+    return fleet_response(await resolve_fleet(request), fleet_wifi_worker)
+
+@app.post("/tvm-roteador/api/fleet/connected-devices")
+async def fleet_connected_devices(request: FleetRequest):
+    return fleet_response(await resolve_fleet(request), fleet_hosts_worker)
+
 if __name__ == "__main__":
     import uvicorn
     logger.info("Iniciando servidor API...")
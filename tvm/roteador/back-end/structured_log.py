@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+# Atributos padrão de um LogRecord (o que sobrar veio de ``extra``)
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class LazyJSON:
+    """Serializa o valor apenas quando a mensagem é de fato formatada.
+
+    Use como argumento %-style (``logger.debug("Dados: %s", LazyJSON(data))``):
+    se o nível estiver desabilitado ou o registro for descartado pela
+    amostragem, ``json.dumps`` nunca é chamado.
+    """
+
+    __slots__ = ("value", "indent")
+
+    def __init__(self, value: Any, indent: Optional[int] = 2):
+        self.value = value
+        self.indent = indent
+
+    def __str__(self) -> str:
+        return json.dumps(self.value, indent=self.indent, default=str, ensure_ascii=False)
+
+
+def fields(**values: Any) -> Dict[str, Any]:
+    """Campos estruturados de um registro: ``logger.info(msg, extra=fields(...))``"""
+    return values
+
+
+class SamplingFilter(logging.Filter):
+    """Mantém só uma fração ``rate`` dos registros abaixo de WARNING.
+
+    Avisos e erros nunca são descartados. Como o filtro roda antes dos
+    handlers, argumentos preguiçosos de registros descartados não são
+    formatados.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formata em texto (``LEVEL:logger:mensagem chave=valor``) ou em uma
+    linha JSON por registro, incluindo os campos passados em ``extra``."""
+
+    def __init__(self, json_lines: bool = False):
+        super().__init__("%(levelname)s:%(name)s:%(message)s")
+        self.json_lines = json_lines
+
+    def format(self, record: logging.LogRecord) -> str:
+        extra = {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+        if self.json_lines:
+            entry = {
+                "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+                **extra,
+            }
+            if record.exc_info:
+                entry["exception"] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str, ensure_ascii=False)
+        line = super().format(record)
+        if extra:
+            line += " " + " ".join(f"{key}={value}" for key, value in extra.items())
+        return line
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """``"router_api=0.1,task_tracker=0.5"`` -> {logger: taxa}"""
+    rates: Dict[str, float] = {}
+    for item in spec.split(","):
+        name, sep, rate = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+def setup_logging() -> None:
+    """Configura o logging a partir do ambiente.
+
+    - ``LOG_LEVEL``: nível raiz (padrão INFO)
+    - ``LOG_FORMAT``: ``text`` (padrão) ou ``json``
+    - ``LOG_SAMPLE_RATES``: taxa de amostragem por logger, ex. ``router_api=0.1``
+    """
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(StructuredFormatter(json_lines=os.getenv("LOG_FORMAT", "text").lower() == "json"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, rate in parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", "")).items():
+        target = logging.getLogger(name)
+        for existing in [f for f in target.filters if isinstance(f, SamplingFilter)]:
+            target.removeFilter(existing)
+        if rate < 1:
+            target.addFilter(SamplingFilter(rate))
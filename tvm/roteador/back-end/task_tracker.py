@@ -0,0 +1,190 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+import json_codec
+from deadline import spawn
+from genieacs_client import GenieACSClient
+
+logger = logging.getLogger(__name__)
+
+# Backoff adaptativo do polling (segundos)
+INITIAL_POLL_DELAY = 0.05
+MAX_POLL_DELAY = 2.0
+POLL_BACKOFF_FACTOR = 1.5
+
+# Máximo de IDs por consulta $in (mantém a URL pequena)
+MAX_TASKS_PER_POLL = 100
+# Falhas de comunicação toleradas por task antes de desistir
+MAX_POLL_ERRORS = 3
+# O GenieACS remove tasks concluídas; ausência confirmada é tratada como sucesso.
+# Confirmada = ausente em várias consultas por um intervalo mínimo, pois o
+# GenieACS pode demorar para listar uma task recém-criada
+MAX_NOT_FOUND_POLLS = 3
+NOT_FOUND_GRACE = 2.0  # segundos
+
+
+@dataclass
+class _PendingTask:
+    task_id: str
+    deadline: float
+    delay: float
+    next_poll: float
+    future: asyncio.Future
+    waiters: int = 0
+    not_found: int = 0
+    not_found_since: Optional[float] = None
+    errors: int = 0
+
+
+class TaskTracker:
+    """Acompanha tasks do GenieACS com um único poller em segundo plano.
+
+    Todas as tasks pendentes são consultadas juntas (``{"_id": {"$in": [...]}}``)
+    com backoff adaptativo por task, começando em dezenas de milissegundos.
+    Quem espera aguarda um future compartilhado por task, cada um com o próprio
+    timeout, então N chamadas concorrentes custam um único loop de polling.
+    """
+
+    def __init__(self, client: GenieACSClient):
+        self.client = client
+        self._pending: Dict[str, _PendingTask] = {}
+        self._poller: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def wait(self, task_id: str, timeout: float) -> bool:
+        """Aguarda a conclusão da task; retorna False em falha ou timeout"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        pending = self._pending.get(task_id)
+        if pending is None:
+            pending = _PendingTask(
+                task_id=task_id,
+                deadline=now + timeout,
+                delay=INITIAL_POLL_DELAY,
+                next_poll=now + INITIAL_POLL_DELAY,
+                future=loop.create_future(),
+            )
+            self._pending[task_id] = pending
+        else:
+            # O polling continua até o prazo do waiter que espera por mais tempo
+            pending.deadline = max(pending.deadline, now + timeout)
+        pending.waiters += 1
+        self._ensure_poller()
+        self._wakeup.set()
+        try:
+            # shield: o timeout ou cancelamento de um waiter não afeta os demais
+            return await asyncio.wait_for(asyncio.shield(pending.future), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout aguardando conclusão da task {task_id}")
+            return False
+        finally:
+            pending.waiters -= 1
+            if not pending.waiters and self._pending.get(task_id) is pending:
+                del self._pending[task_id]
+
+    def _ensure_poller(self) -> None:
+        if self._poller is None or self._poller.done():
+            self._poller = spawn(self._run())
+
+    async def close(self) -> None:
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+
+    def _resolve(self, pending: _PendingTask, result: bool) -> None:
+        self._pending.pop(pending.task_id, None)
+        if not pending.future.done():
+            pending.future.set_result(result)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            now = loop.time()
+            for pending in list(self._pending.values()):
+                if now >= pending.deadline:
+                    # Os waiters já expiram pelo próprio timeout; isto só encerra o polling
+                    self._resolve(pending, False)
+
+            due = [p for p in self._pending.values() if p.next_poll <= now]
+            if not due:
+                if not self._pending:
+                    break
+                earliest = min(p.next_poll for p in self._pending.values())
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), earliest - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            for start in range(0, len(due), MAX_TASKS_PER_POLL):
+                await self._poll(due[start:start + MAX_TASKS_PER_POLL])
+
+            now = loop.time()
+            for pending in due:
+                if pending.task_id in self._pending:
+                    pending.delay = min(pending.delay * POLL_BACKOFF_FACTOR, MAX_POLL_DELAY)
+                    pending.next_poll = min(now + pending.delay, pending.deadline)
+
+    async def _poll(self, batch: List[_PendingTask]) -> None:
+        query = {"_id": {"$in": [pending.task_id for pending in batch]}}
+        try:
+            response = await self.client.get_tasks(query)
+            if response.status_code != 200:
+                raise httpx.HTTPStatusError(
+                    f"{response.status_code} - {response.text}",
+                    request=response.request,
+                    response=response,
+                )
+            tasks: Dict[str, Dict[str, Any]] = {task["_id"]: task for task in json_codec.loads(response.content)}
+        except httpx.TimeoutException:
+            logger.warning(f"Timeout ao verificar status de {len(batch)} task(s)")
+            self._count_errors(batch)
+            return
+        except Exception as e:
+            logger.error(f"Erro ao verificar status de {len(batch)} task(s): {str(e)}")
+            self._count_errors(batch)
+            return
+
+        now = asyncio.get_running_loop().time()
+        for pending in batch:
+            task = tasks.get(pending.task_id)
+            if task is None:
+                pending.not_found += 1
+                if pending.not_found_since is None:
+                    pending.not_found_since = now
+                if pending.not_found >= MAX_NOT_FOUND_POLLS and now - pending.not_found_since >= NOT_FOUND_GRACE:
+                    # O GenieACS às vezes limpa as tasks completadas muito rapidamente
+                    logger.info(
+                        f"Task {pending.task_id} não encontrada por {now - pending.not_found_since:.1f}s "
+                        f"({pending.not_found} verificações), assumindo sucesso"
+                    )
+                    self._resolve(pending, True)
+                continue
+            pending.not_found, pending.not_found_since = 0, None
+
+            if task.get("status") == "completed":
+                logger.info(f"Task {pending.task_id} completada com sucesso")
+                self._resolve(pending, True)
+            elif task.get("status") == "failed" or task.get("fault"):
+                error_detail = (task.get("fault") or {}).get("detail", "Sem detalhes")
+                logger.error(f"Task {pending.task_id} falhou: {error_detail}")
+                self._resolve(pending, False)
+
+    def _count_errors(self, batch: List[_PendingTask]) -> None:
+        for pending in batch:
+            pending.errors += 1
+            if pending.errors >= MAX_POLL_ERRORS:
+                self._resolve(pending, False)
@@ -0,0 +1,87 @@
+import asyncio
+
+from device_cache import DeviceCache
+
+
+def make_loader(calls, value, release=None):
+    async def loader():
+        calls.append(1)
+        if release is not None:
+            await release.wait()
+        return value
+
+    return loader
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache = DeviceCache(ttl=60)
+        calls = []
+        release = asyncio.Event()
+        loader = make_loader(calls, {"_id": "r1"}, release)
+        gets = asyncio.gather(*(cache.get("r1", loader) for _ in range(5)))
+        await asyncio.sleep(0)
+        release.set()
+        assert await gets == [{"_id": "r1"}] * 5
+        assert calls == [1]
+        # Agora em cache: sem nova carga
+        assert await cache.get("r1", loader) == {"_id": "r1"}
+        assert calls == [1] and cache.hits == 1 and cache.misses == 5
+
+    asyncio.run(scenario())
+
+
+def test_variants_are_cached_separately():
+    async def scenario():
+        cache = DeviceCache(ttl=60)
+        calls = []
+        assert await cache.get("r1", make_loader(calls, "wifi"), variant="wifi") == "wifi"
+        assert await cache.get("r1", make_loader(calls, "hosts"), variant="hosts") == "hosts"
+        assert cache.peek("r1", "wifi") == "wifi" and cache.peek("r1", "hosts") == "hosts"
+        assert calls == [1, 1]
+
+    asyncio.run(scenario())
+
+
+def test_invalidation_during_load_discards_stale_value():
+    async def scenario():
+        cache = DeviceCache(ttl=60)
+        calls = []
+        release = asyncio.Event()
+        stale = asyncio.ensure_future(cache.get("r1", make_loader(calls, "antigo", release)))
+        await asyncio.sleep(0)
+        cache.invalidate("r1")
+        # Busca iniciada depois da invalidação não reaproveita a carga antiga
+        fresh = await cache.get("r1", make_loader(calls, "novo"))
+        release.set()
+        assert await stale == "antigo" and fresh == "novo"
+        assert cache.peek("r1") == "novo"
+        assert calls == [1, 1]
+
+    asyncio.run(scenario())
+
+
+def test_none_results_are_not_cached():
+    async def scenario():
+        cache = DeviceCache(ttl=60)
+        calls = []
+        assert await cache.get("r1", make_loader(calls, None)) is None
+        assert await cache.get("r1", make_loader(calls, None)) is None
+        assert calls == [1, 1]
+
+    asyncio.run(scenario())
+
+
+def test_expired_entries_are_pruned():
+    async def scenario():
+        cache = DeviceCache(ttl=0.05)
+        calls = []
+        await cache.get("r1", make_loader(calls, "documento"))
+        await asyncio.sleep(0.06)
+        assert cache.peek("r1") is None
+        # A próxima consulta (de qualquer dispositivo) varre as entradas vencidas
+        await cache.get("r2", make_loader(calls, "outro"))
+        assert "r1" not in cache._entries
+        assert set(cache._entries) == {"r2"}
+
+    asyncio.run(scenario())
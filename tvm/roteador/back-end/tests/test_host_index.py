@@ -0,0 +1,61 @@
+from host_index import HostTable
+from tr069_models import HostEntry
+
+PHONE = HostEntry("AA:BB:CC:00:00:01", "celular", "192.168.1.10")
+LAPTOP = HostEntry("AA:BB:CC:00:00:02", "notebook", "192.168.1.11")
+TV = HostEntry("AA:BB:CC:00:00:03", "", "192.168.1.12")
+
+
+def test_unchanged_snapshot_keeps_version():
+    table = HostTable()
+    assert table.apply([PHONE, LAPTOP])
+    assert table.version == 1
+    assert not table.apply([PHONE, LAPTOP])
+    # Hosts sem IP não contam como ativos
+    assert not table.apply([PHONE, LAPTOP, HostEntry("AA:BB:CC:00:00:09", "x", "")])
+    assert table.version == 1
+
+
+def test_delta_reports_added_changed_and_removed():
+    table = HostTable()
+    table.apply([PHONE, LAPTOP])
+    table.apply([HostEntry(PHONE.mac, PHONE.hostname, "192.168.1.20"), TV])
+    delta = table.delta(1)
+    assert delta["version"] == 2 and not delta["full"]
+    assert [host["id"] for host in delta["added"]] == [TV.mac]
+    assert delta["added"][0]["name"] == "Dispositivo Desconhecido"
+    assert [host["ipAddress"] for host in delta["changed"]] == ["192.168.1.20"]
+    assert delta["removed"] == [LAPTOP.mac]
+    assert table.delta(2) == {"version": 2, "full": False, "added": [], "changed": [], "removed": []}
+
+
+def test_blocking_is_a_change():
+    table = HostTable()
+    table.apply([PHONE, LAPTOP])
+    assert table.apply(blocked={LAPTOP.mac})
+    delta = table.delta(1)
+    assert [(host["id"], host["isBlocked"]) for host in delta["changed"]] == [(LAPTOP.mac, True)]
+    assert not table.apply(blocked={LAPTOP.mac})
+
+
+def test_readded_host_is_not_reported_as_removed():
+    table = HostTable()
+    table.apply([PHONE, LAPTOP])
+    table.apply([PHONE])
+    table.apply([PHONE, LAPTOP])
+    delta = table.delta(1)
+    assert delta["removed"] == []
+    assert [host["id"] for host in delta["added"]] == [LAPTOP.mac]
+
+
+def test_evicted_tombstones_force_full_snapshot():
+    table = HostTable(max_tombstones=1)
+    table.apply([PHONE, LAPTOP, TV])
+    table.apply([PHONE, TV])
+    table.apply([PHONE])
+    # A remoção do notebook (versão 2) foi descartada: deltas desde antes dela são completos
+    full = table.delta(1)
+    assert full["full"] and [host["id"] for host in full["added"]] == [PHONE.mac]
+    assert table.delta(2)["removed"] == [TV.mac]
+    # Versão desconhecida (ex.: após reinício do serviço) também recebe a tabela completa
+    assert table.delta(99)["full"]
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from jobs import JobStore
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_same_key_returns_original_job():
+    async def scenario():
+        store = JobStore()
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            return {"ok": True}
+
+        first = store.submit("configure-wifi", "r1", factory, idempotency_key="k", fingerprint="f")
+        await first.wait_done(1)
+        second = store.submit("configure-wifi", "r1", factory, idempotency_key="k", fingerprint="f")
+        assert second is first
+        assert calls == [1]
+        await store.close()
+
+    run(scenario())
+
+
+def test_same_key_with_other_content_is_rejected():
+    async def scenario():
+        store = JobStore()
+
+        async def factory():
+            return None
+
+        job = store.submit("configure-wifi", "r1", factory, idempotency_key="k", fingerprint="a")
+        await job.wait_done(1)
+        with pytest.raises(HTTPException) as error:
+            store.submit("configure-wifi", "r1", factory, idempotency_key="k", fingerprint="b")
+        assert error.value.status_code == 422
+        await store.close()
+
+    run(scenario())
+
+
+def test_identical_inflight_write_is_shared():
+    async def scenario():
+        store = JobStore()
+        release = asyncio.Event()
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await release.wait()
+            return "feito"
+
+        first = store.submit("manage-device", "r1", factory, fingerprint="f")
+        second = store.submit("manage-device", "r1", factory, idempotency_key="k2", fingerprint="f")
+        assert second is first
+        release.set()
+        await first.wait_done(1)
+        # Concluído: a mesma escrita sem chave vira um novo job
+        third = store.submit("manage-device", "r1", factory, fingerprint="f")
+        assert third is not first
+        await third.wait_done(1)
+        assert calls == [1, 1]
+        await store.close()
+
+    run(scenario())
+
+
+def test_failed_job_releases_idempotency_key():
+    async def scenario():
+        store = JobStore()
+        attempts = []
+
+        async def factory():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise HTTPException(status_code=503, detail="GenieACS indisponível")
+            return "aplicado"
+
+        failed = store.submit("configure-wifi", "r1", factory, idempotency_key="k", fingerprint="f")
+        await failed.wait_done(1)
+        assert failed.status == "failed" and failed.status_code == 503
+
+        retry = store.submit("configure-wifi", "r1", factory, idempotency_key="k", fingerprint="f")
+        assert retry is not failed
+        await retry.wait_done(1)
+        assert retry.status == "succeeded" and retry.result == "aplicado"
+        # O job que falhou continua consultável pelo ID
+        assert store.get(failed.id) is failed
+        # E a chave passa a apontar para o job que deu certo
+        assert store.submit("configure-wifi", "r1", factory, idempotency_key="k", fingerprint="f") is retry
+        await store.close()
+
+    run(scenario())
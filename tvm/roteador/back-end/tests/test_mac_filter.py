@@ -0,0 +1,64 @@
+import asyncio
+import os
+import tempfile
+
+# A API lê o caminho dos SQLite na importação
+os.environ.setdefault("MAC_FILTER_DB", os.path.join(tempfile.mkdtemp(), "router_state.db"))
+
+import router_api  # noqa: E402
+from mac_filter_store import MacFilterStore  # noqa: E402
+from tr069_models import (  # noqa: E402
+    MAC_FILTER_ENABLED_PATH,
+    MAC_FILTER_LIST_PATH,
+    MAC_FILTER_POLICY_PATH,
+    DeviceSnapshot,
+    WifiSettings,
+)
+from tr069_tasks import ParameterBatch  # noqa: E402
+
+DEVICE_ID = "202BC1-BM632w-filtro"
+OLD_MAC = "AA:BB:CC:DD:EE:01"
+NEW_MAC = "AA:BB:CC:DD:EE:02"
+
+
+def test_read_started_before_write_is_discarded(tmp_path):
+    store = MacFilterStore(str(tmp_path / "filters.db"))
+    version = store.version("r1")
+    store.replace("r1", [NEW_MAC], source="task")
+    assert not store.replace("r1", [OLD_MAC], source="reconcile", if_version=version)
+    assert store.blocked("r1") == frozenset({NEW_MAC})
+    assert store.replace("r1", [OLD_MAC], source="reconcile", if_version=store.version("r1"))
+    assert store.blocked("r1") == frozenset({OLD_MAC})
+
+
+def test_reconcile_fetch_does_not_overwrite_newer_write(monkeypatch):
+    fetched = asyncio.Event()
+    release = asyncio.Event()
+    # Documento buscado antes da escrita: ainda bloqueia só o MAC antigo
+    stale = DeviceSnapshot(DEVICE_ID, wifi=WifiSettings(
+        mac_filter_enabled=True, mac_filter_policy="deny", mac_filter_list=OLD_MAC,
+    ))
+
+    async def get_device(device_id, projection=None):
+        fetched.set()
+        await release.wait()
+        return stale
+
+    monkeypatch.setattr(router_api, "get_device_from_mongo", get_device)
+
+    async def scenario():
+        worker = asyncio.ensure_future(router_api.mac_filter_reconcile_worker(DEVICE_ID))
+        await fetched.wait()
+        router_api.apply_written_state(DEVICE_ID, ParameterBatch([
+            (MAC_FILTER_ENABLED_PATH, "1", "xsd:boolean"),
+            (MAC_FILTER_POLICY_PATH, "deny", "xsd:string"),
+            (MAC_FILTER_LIST_PATH, NEW_MAC, "xsd:string"),
+        ]))
+        release.set()
+        await worker
+
+    try:
+        asyncio.run(scenario())
+        assert router_api.mac_filter_store.blocked(DEVICE_ID) == frozenset({NEW_MAC})
+    finally:
+        router_api.mac_filter_store.replace(DEVICE_ID, [], source="test")
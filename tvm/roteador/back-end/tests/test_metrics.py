@@ -0,0 +1,49 @@
+import os
+import tempfile
+
+os.environ.setdefault("MAC_FILTER_DB", os.path.join(tempfile.mkdtemp(), "router_state.db"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import router_api  # noqa: E402
+from metrics import Registry, http_request_duration, http_requests_in_flight  # noqa: E402
+
+
+def test_metrics_only_on_unprefixed_path():
+    client = TestClient(router_api.app)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "tr069_task_completion_seconds" in response.text
+    # O prefixo da API é público (Traefik): as métricas não podem estar nele
+    assert client.get("/tvm-roteador/api/metrics").status_code == 404
+
+
+def test_middleware_labels_requests_by_route_template():
+    client = TestClient(router_api.app)
+    before = http_request_duration.count("GET", "/metrics", "200")
+    client.get("/metrics")
+    assert http_request_duration.count("GET", "/metrics", "200") == before + 1
+    assert http_requests_in_flight.value("GET", "/metrics") == 0
+    # Caminhos fora das rotas não criam séries novas por URL
+    client.get("/nao-existe/123")
+    assert http_request_duration.count("GET", "unmatched", "404") >= 1
+    assert http_request_duration.count("GET", "/nao-existe/123", "404") == 0
+
+
+def test_histogram_and_counter_exposition():
+    registry = Registry()
+    latency = registry.histogram("latencia_seconds", "Latência", ("op",), buckets=(0.1, 1))
+    retries = registry.counter("tentativas_total", "Tentativas", ("op",))
+    latency.observe(0.05, "get")
+    latency.observe(0.5, "get")
+    latency.observe(3, "get")
+    retries.inc("get")
+    retries.inc("get", amount=2)
+    assert latency.count("get") == 3 and latency.count("set") == 0
+    assert retries.value("get") == 3 and retries.value("set") == 0
+    lines = registry.render().splitlines()
+    assert 'latencia_seconds_bucket{op="get",le="0.1"} 1' in lines
+    assert 'latencia_seconds_bucket{op="get",le="1"} 2' in lines
+    assert 'latencia_seconds_bucket{op="get",le="+Inf"} 3' in lines
+    assert 'latencia_seconds_sum{op="get"} 3.55' in lines
+    assert 'tentativas_total{op="get"} 3' in lines
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+# A API lê o caminho dos SQLite na importação
+os.environ.setdefault("MAC_FILTER_DB", os.path.join(tempfile.mkdtemp(), "router_state.db"))
+
+import router_api  # noqa: E402
+from tr069_tasks import ParameterBatch  # noqa: E402
+from write_coalescer import WriteResult  # noqa: E402
+
+DEVICE_ID = "202BC1-BM632w-teste"
+SSID_PATH = "InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.SSID"
+
+
+def _iso(value: datetime) -> str:
+    return value.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def test_failed_flush_waits_for_next_inform(monkeypatch):
+    router_api.pending_writes.queue(DEVICE_ID, ParameterBatch([(SSID_PATH, "nova-rede", "xsd:string")]))
+    inform = datetime.now(timezone.utc) + timedelta(seconds=1)
+    submits = []
+
+    async def get_devices(query, projection=None, **kwargs):
+        document = {"_id": DEVICE_ID, "_lastInform": _iso(inform)}
+        return httpx.Response(200, json=[document])
+
+    async def submit(device_id, build):
+        submits.append(device_id)
+        return WriteResult("", False, ParameterBatch(), 1)
+
+    monkeypatch.setattr(router_api.genieacs, "get_devices", get_devices)
+    monkeypatch.setattr(router_api.write_coalescer, "submit", submit)
+
+    async def tick():
+        await router_api.flush_pending_writes()
+        # Deixa a task disparada por spawn terminar
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    async def scenario():
+        nonlocal inform
+        await tick()
+        assert submits == [DEVICE_ID]
+        # Mesmo inform: a tentativa que falhou não é repetida
+        await tick()
+        assert submits == [DEVICE_ID]
+        # Inform mais novo: nova tentativa
+        inform += timedelta(seconds=15)
+        await tick()
+        assert submits == [DEVICE_ID, DEVICE_ID]
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        router_api.pending_writes.checkout(DEVICE_ID)
+        router_api.pending_writes.commit(DEVICE_ID)
+        router_api.pending_attempts.pop(DEVICE_ID, None)
@@ -0,0 +1,91 @@
+import asyncio
+
+import httpx
+
+import task_tracker
+from task_tracker import TaskTracker
+
+
+class FakeClient:
+    """Responde GET /tasks com o status atual de cada task conhecida"""
+
+    def __init__(self, statuses=None, status_code=200):
+        self.statuses = dict(statuses or {})
+        self.status_code = status_code
+        self.queries = []
+
+    async def get_tasks(self, query):
+        ids = query["_id"]["$in"]
+        self.queries.append(ids)
+        tasks = [{"_id": task_id, "status": self.statuses[task_id]} for task_id in ids if task_id in self.statuses]
+        return httpx.Response(self.status_code, json=tasks, request=httpx.Request("GET", "http://genieacs/tasks"))
+
+
+def test_concurrent_waits_share_one_batched_poll(monkeypatch):
+    monkeypatch.setattr(task_tracker, "MAX_POLL_DELAY", 0.05)
+
+    async def scenario():
+        client = FakeClient({"t1": "pending", "t2": "pending", "t3": "pending"})
+        tracker = TaskTracker(client)
+        waits = asyncio.gather(*(tracker.wait(task_id, 5) for task_id in ("t1", "t2", "t3")))
+        while not client.queries:
+            await asyncio.sleep(0.01)
+        client.statuses.update(t1="completed", t2="failed", t3="completed")
+        assert await waits == [True, False, True]
+        assert sorted(client.queries[0]) == ["t1", "t2", "t3"]
+        assert all(len(ids) > 1 for ids in client.queries)
+        assert tracker.pending_count == 0
+        await tracker.close()
+
+    asyncio.run(scenario())
+
+
+def test_missing_task_needs_grace_period_before_success(monkeypatch):
+    monkeypatch.setattr(task_tracker, "MAX_POLL_DELAY", 0.02)
+    monkeypatch.setattr(task_tracker, "NOT_FOUND_GRACE", 0.3)
+
+    async def scenario():
+        client = FakeClient()
+        tracker = TaskTracker(client)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        assert await tracker.wait("sumiu", 5)
+        # Várias consultas sem a task não bastam: ela precisa sumir pelo intervalo mínimo
+        assert loop.time() - start >= 0.3
+        assert len(client.queries) > task_tracker.MAX_NOT_FOUND_POLLS
+        await tracker.close()
+
+    asyncio.run(scenario())
+
+
+def test_each_waiter_has_its_own_timeout(monkeypatch):
+    monkeypatch.setattr(task_tracker, "MAX_POLL_DELAY", 0.02)
+
+    async def scenario():
+        client = FakeClient({"t1": "pending"})
+        tracker = TaskTracker(client)
+        short = asyncio.ensure_future(tracker.wait("t1", 0.1))
+        long = asyncio.ensure_future(tracker.wait("t1", 2))
+        assert await short is False
+        # O timeout do primeiro não encerra o polling do segundo
+        assert not long.done() and tracker.pending_count == 1
+        client.statuses["t1"] = "completed"
+        assert await long is True
+        assert tracker.pending_count == 0
+        await tracker.close()
+
+    asyncio.run(scenario())
+
+
+def test_repeated_poll_errors_fail_the_task(monkeypatch):
+    monkeypatch.setattr(task_tracker, "MAX_POLL_DELAY", 0.02)
+
+    async def scenario():
+        client = FakeClient({"t1": "pending"}, status_code=503)
+        tracker = TaskTracker(client)
+        assert await tracker.wait("t1", 5) is False
+        assert len(client.queries) == task_tracker.MAX_POLL_ERRORS
+        assert tracker.pending_count == 0
+        await tracker.close()
+
+    asyncio.run(scenario())
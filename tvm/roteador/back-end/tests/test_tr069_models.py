@@ -0,0 +1,39 @@
+import json
+
+import json_codec
+from tr069_models import loads_compact, parse_device
+
+DOCUMENT = {
+    "_id": "r1",
+    "_lastInform": "2026-01-01T00:00:00.000Z",
+    "InternetGatewayDevice": {
+        "LANDevice": {
+            "1": {
+                "WLANConfiguration": {
+                    "1": {
+                        "SSID": {"_value": "rede", "_type": "xsd:string", "_writable": True},
+                        "PreSharedKey": {
+                            "1": {"PreSharedKey": {"_value": "segredo", "_type": "xsd:string", "_writable": True}}
+                        },
+                    }
+                }
+            }
+        }
+    },
+}
+
+
+def test_stdlib_backend_collapses_parameters_while_decoding(monkeypatch):
+    monkeypatch.setattr(json_codec, "BACKEND", "json")
+    tree = loads_compact(json.dumps([DOCUMENT]))
+    wlan = tree[0]["InternetGatewayDevice"]["LANDevice"]["1"]["WLANConfiguration"]["1"]
+    assert wlan["SSID"] == "rede"
+
+
+def test_parsers_accept_collapsed_and_original_trees(monkeypatch):
+    body = json.dumps([DOCUMENT])
+    monkeypatch.setattr(json_codec, "BACKEND", "json")
+    compact = parse_device(loads_compact(body)[0])
+    original = parse_device(json.loads(body)[0])
+    assert compact.wifi == original.wifi
+    assert compact.wifi.ssid == "rede" and compact.wifi.password == "segredo"
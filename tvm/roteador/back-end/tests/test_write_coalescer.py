@@ -0,0 +1,78 @@
+import asyncio
+
+from tr069_tasks import ParameterBatch
+from write_coalescer import WriteCoalescer
+
+SSID = "InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.SSID"
+KEY = "InternetGatewayDevice.LANDevice.1.WLANConfiguration.1.KeyPassphrase"
+
+
+def make_coalescer(sent, applied=None, base=None, completed=True):
+    async def send(device_id, batch):
+        sent.append((device_id, batch.parameter_values()))
+        return f"task-{len(sent)}"
+
+    async def wait(task_id, device_id):
+        return completed
+
+    return WriteCoalescer(
+        send, wait, 0.01,
+        on_applied=(lambda device_id, batch: applied.append(batch.parameter_values())) if applied is not None else None,
+        base=base,
+    )
+
+
+def test_writes_in_window_become_one_task_and_last_write_wins():
+    async def scenario():
+        sent = []
+        coalescer = make_coalescer(sent)
+        results = await asyncio.gather(
+            coalescer.submit("r1", lambda batch: batch.set(SSID, "primeira")),
+            coalescer.submit("r1", lambda batch: batch.set(KEY, "senha-123")),
+            coalescer.submit("r1", lambda batch: batch.set(SSID, "ultima")),
+        )
+        assert sent == [("r1", [[SSID, "ultima", "xsd:string"], [KEY, "senha-123", "xsd:string"]])]
+        assert {result.task_id for result in results} == {"task-1"}
+        assert all(result.completed and result.writes == 3 for result in results)
+
+    asyncio.run(scenario())
+
+
+def test_devices_are_batched_separately_and_base_is_applied_first():
+    async def scenario():
+        sent, applied = [], []
+        pending = {"r2": ParameterBatch([(SSID, "offline", "xsd:string")])}
+        coalescer = make_coalescer(
+            sent, applied, base=lambda device_id: pending.pop(device_id, ParameterBatch())
+        )
+        await asyncio.gather(
+            coalescer.submit("r1", lambda batch: batch.set(SSID, "rede-1")),
+            coalescer.submit("r2", lambda batch: batch.set(KEY, "senha-2")),
+        )
+        assert sorted(sent) == [
+            ("r1", [[SSID, "rede-1", "xsd:string"]]),
+            ("r2", [[SSID, "offline", "xsd:string"], [KEY, "senha-2", "xsd:string"]]),
+        ]
+        assert len(applied) == 2
+
+    asyncio.run(scenario())
+
+
+def test_empty_batch_is_not_sent():
+    async def scenario():
+        sent = []
+        coalescer = make_coalescer(sent)
+        result = await coalescer.submit("r1", lambda batch: None)
+        assert sent == [] and result.completed and result.task_id == ""
+
+    asyncio.run(scenario())
+
+
+def test_incomplete_task_skips_on_applied():
+    async def scenario():
+        sent, applied = [], []
+        coalescer = make_coalescer(sent, applied, completed=False)
+        result = await coalescer.submit("r1", lambda batch: batch.set(SSID, "x"))
+        assert not result.completed and applied == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,179 @@
+"""Registros compactos extraídos dos documentos TR-069 do GenieACS.
+
+Os handlers só precisam de poucos parâmetros do documento do dispositivo
+(Wi-Fi, hosts, diagnóstico de ping). Em vez de manter a árvore aninhada
+``{"_value": ...}`` viva (no cache e nos handlers), a resposta do NBI é
+decodificada com ``loads_compact`` e convertida em registros com
+``__slots__``; a árvore é descartada logo após o parse.
+"""
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import json_codec
+from device_registry import parse_last_inform
+
+Node = Dict[str, Any]
+
+# Subárvores do documento TR-069 lidas por cada endpoint (usadas como projeção)
+LAST_INFORM_PATH = "_lastInform"
+WLAN_PATH = "InternetGatewayDevice.LANDevice.1.WLANConfiguration.1"
+HOSTS_PATH = "InternetGatewayDevice.LANDevice.1.Hosts.Host"
+MAC_FILTER_LIST_PATH = f"{WLAN_PATH}.X_HUAWEI_WlanMacFilterMac"
+MAC_FILTER_POLICY_PATH = f"{WLAN_PATH}.X_HUAWEI_WlanMacFilterpolicy"
+MAC_FILTER_ENABLED_PATH = f"{WLAN_PATH}.MACAddressControlEnabled"
+PING_PATH = "InternetGatewayDevice.IPPingDiagnostics"
+
+
+def collapse_parameter(obj: Node) -> Any:
+    """object_hook do json: troca cada parâmetro ``{"_value": v, "_type": ...}``
+    por ``v`` assim que ele é decodificado, então os metadados (_type,
+    _timestamp, _writable) nunca chegam à árvore final"""
+    return obj["_value"] if "_value" in obj else obj
+
+
+def loads_compact(body: Union[bytes, str]) -> Any:
+    """Decodifica uma resposta do NBI já com os parâmetros colapsados.
+
+    O orjson não aceita object_hook: com ele a árvore vem no formato original
+    (os parsers abaixo aceitam os dois) e só vive até a conversão em registros,
+    trocando um pico de memória maior por um decode bem mais rápido.
+    """
+    if json_codec.BACKEND == "orjson":
+        return json_codec.loads(body)
+    return json.loads(body, object_hook=collapse_parameter)
+
+
+def _child(node: Any, *names: str) -> Node:
+    for name in names:
+        node = node.get(name) if isinstance(node, dict) else None
+    return node if isinstance(node, dict) else {}
+
+
+def _value(node: Node, name: str, default: Any = None) -> Any:
+    """Valor de um parâmetro, colapsado ou no formato ``{"_value": ...}``"""
+    param = node.get(name)
+    if isinstance(param, dict):
+        return param.get("_value", default)
+    return default if param is None else param
+
+
+def _str(node: Node, name: str) -> str:
+    value = _value(node, name, "")
+    return value if isinstance(value, str) else str(value)
+
+
+def _int(node: Node, name: str) -> int:
+    try:
+        return int(_value(node, name, 0) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _float(node: Node, name: str) -> float:
+    try:
+        return float(_value(node, name, 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class WifiSettings:
+    ssid: str = ""
+    password: str = ""
+    # Filtro MAC (Huawei); mac_filter_list é None se o parâmetro não veio no documento
+    mac_filter_enabled: bool = False
+    mac_filter_policy: str = ""
+    mac_filter_list: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"ssid": self.ssid, "password": self.password}
+
+
+@dataclass(frozen=True, slots=True)
+class HostEntry:
+    mac: str
+    hostname: str
+    ip_address: str
+
+
+@dataclass(frozen=True, slots=True)
+class PingResult:
+    state: str = ""
+    success: int = 0
+    failure: int = 0
+    average: float = 0.0
+    minimum: float = 0.0
+    maximum: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "average": self.average,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "success": self.success,
+            "failure": self.failure,
+            "total": self.success + self.failure
+        }
+
+
+@dataclass(slots=True)
+class DeviceSnapshot:
+    """O que a API usa de um documento (ou projeção) de dispositivo"""
+
+    device_id: str
+    last_inform: Optional[datetime] = None
+    wifi: WifiSettings = WifiSettings()
+    hosts: Tuple[HostEntry, ...] = ()
+    ping: PingResult = PingResult()
+
+
+def parse_wifi(root: Node) -> WifiSettings:
+    """InternetGatewayDevice.LANDevice.1.WLANConfiguration.1"""
+    wlan = _child(root, "LANDevice", "1", "WLANConfiguration", "1")
+    if not wlan:
+        return WifiSettings()
+    mac_list = _value(wlan, "X_HUAWEI_WlanMacFilterMac")
+    return WifiSettings(
+        ssid=_str(wlan, "SSID"),
+        password=_str(_child(wlan, "PreSharedKey", "1"), "PreSharedKey"),
+        mac_filter_enabled=str(_value(wlan, "MACAddressControlEnabled")).lower() in ("1", "true"),
+        mac_filter_policy=_str(wlan, "X_HUAWEI_WlanMacFilterpolicy"),
+        mac_filter_list=None if mac_list is None else str(mac_list),
+    )
+
+
+def parse_hosts(root: Node) -> Tuple[HostEntry, ...]:
+    """InternetGatewayDevice.LANDevice.1.Hosts.Host, na ordem do documento"""
+    hosts: List[HostEntry] = []
+    for entry in _child(root, "LANDevice", "1", "Hosts", "Host").values():
+        if isinstance(entry, dict):
+            hosts.append(HostEntry(_str(entry, "MACAddress"), _str(entry, "HostName"), _str(entry, "IPAddress")))
+    return tuple(hosts)
+
+
+def parse_ping(root: Node) -> PingResult:
+    """InternetGatewayDevice.IPPingDiagnostics"""
+    ping = _child(root, "IPPingDiagnostics")
+    if not ping:
+        return PingResult()
+    return PingResult(
+        state=_str(ping, "DiagnosticsState"),
+        success=_int(ping, "SuccessCount"),
+        failure=_int(ping, "FailureCount"),
+        average=_float(ping, "AverageResponseTime"),
+        minimum=_float(ping, "MinimumResponseTime"),
+        maximum=_float(ping, "MaximumResponseTime"),
+    )
+
+
+def parse_device(document: Node) -> DeviceSnapshot:
+    root = _child(document, "InternetGatewayDevice")
+    return DeviceSnapshot(
+        device_id=document["_id"],
+        last_inform=parse_last_inform(document.get("_lastInform")),
+        wifi=parse_wifi(root),
+        hosts=parse_hosts(root),
+        ping=parse_ping(root),
+    )
@@ -0,0 +1,50 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+ParameterValue = Tuple[str, Any, str]
+
+
+class ParameterBatch:
+    """Conjunto de escritas TR-069 de um dispositivo, enviadas como uma única
+    task setParameterValues (uma sessão CWMP, aplicada de forma atômica).
+
+    Escritas repetidas no mesmo parâmetro são coalescidas: a última vence,
+    mantendo a posição da primeira escrita.
+    """
+
+    def __init__(self, values: Optional[Iterable[ParameterValue]] = None):
+        self._values: Dict[str, Tuple[Any, str]] = {}
+        for path, value, type_ in values or []:
+            self.set(path, value, type_)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __bool__(self) -> bool:
+        return bool(self._values)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._values
+
+    def set(self, path: str, value: Any, type_: str = "xsd:string") -> "ParameterBatch":
+        self._values[path] = (value, type_)
+        return self
+
+    def get(self, path: str) -> Optional[Any]:
+        entry = self._values.get(path)
+        return entry[0] if entry else None
+
+    def merge(self, other: "ParameterBatch") -> "ParameterBatch":
+        """Aplica as escritas de ``other`` por cima das atuais"""
+        for path, (value, type_) in other._values.items():
+            self._values[path] = (value, type_)
+        return self
+
+    def parameter_values(self) -> List[List[Any]]:
+        # Formato do TR-069 no GenieACS: [caminho, valor, tipo]
+        return [[path, value, type_] for path, (value, type_) in self._values.items()]
+
+    def to_task(self) -> Dict[str, Any]:
+        return {
+            "name": "setParameterValues",
+            "parameterValues": self.parameter_values()
+        }
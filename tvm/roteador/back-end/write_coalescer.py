@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from deadline import DeadlineExceeded, bound, spawn
+from tr069_tasks import ParameterBatch
+
+logger = logging.getLogger(__name__)
+
+# Aplica as escritas de um chamador no lote (na ordem de chegada)
+BatchBuilder = Callable[[ParameterBatch], None]
+SendBatch = Callable[[str, ParameterBatch], Awaitable[str]]
+WaitTask = Callable[[str, str], Awaitable[bool]]
+OnApplied = Callable[[str, ParameterBatch], None]
+BaseBatch = Callable[[str], ParameterBatch]
+
+
+@dataclass
+class WriteResult:
+    task_id: str
+    completed: bool
+    batch: ParameterBatch
+    writes: int
+
+
+@dataclass
+class _PendingWrites:
+    builders: List[BatchBuilder] = field(default_factory=list)
+    future: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class WriteCoalescer:
+    """Agrupa as escritas de um dispositivo feitas dentro de ``window``
+    segundos em uma única task setParameterValues (uma sessão CWMP).
+
+    Os builders são aplicados em ordem sobre o mesmo ParameterBatch, então a
+    última escrita de cada parâmetro vence. As sessões de um dispositivo são
+    serializadas: o próximo lote só é montado depois que o anterior for
+    confirmado (e ``on_applied`` executado), então builders que leem o estado
+    salvo sempre veem o resultado do lote anterior.
+
+    ``base`` fornece o lote inicial de cada sessão (ex.: escritas pendentes
+    de quando o roteador estava offline); os builders são aplicados por cima.
+    """
+
+    def __init__(
+        self,
+        send: SendBatch,
+        wait: WaitTask,
+        window: float,
+        on_applied: Optional[OnApplied] = None,
+        base: Optional[BaseBatch] = None,
+    ):
+        self.send = send
+        self.wait = wait
+        self.window = window
+        self.on_applied = on_applied
+        self.base = base
+        self._pending: Dict[str, _PendingWrites] = {}
+        # Lock por dispositivo e quantos lotes o usam (para descartá-lo ao fim)
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+
+    async def submit(self, device_id: str, build: BatchBuilder) -> WriteResult:
+        pending = self._pending.get(device_id)
+        if pending is None:
+            pending = self._pending[device_id] = _PendingWrites()
+            spawn(self._flush(device_id, pending))
+        pending.builders.append(build)
+        # shield: um chamador que desiste não cancela o lote dos demais
+        try:
+            return await asyncio.wait_for(asyncio.shield(pending.future), bound(None))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded()
+
+    async def _flush(self, device_id: str, pending: _PendingWrites) -> None:
+        await asyncio.sleep(self.window)
+        lock = self._locks.setdefault(device_id, asyncio.Lock())
+        self._lock_users[device_id] = self._lock_users.get(device_id, 0) + 1
+        try:
+            async with lock:
+                # A partir daqui novas escritas abrem um novo lote
+                if self._pending.get(device_id) is pending:
+                    del self._pending[device_id]
+                batch = self.base(device_id) if self.base is not None else ParameterBatch()
+                for build in pending.builders:
+                    build(batch)
+                if len(pending.builders) > 1:
+                    logger.info(f"{len(pending.builders)} escritas coalescidas em uma task para {device_id} ({len(batch)} parâmetros)")
+                if batch:
+                    task_id = await self.send(device_id, batch)
+                    completed = await self.wait(task_id, device_id)
+                else:
+                    # Nada a escrever (ex.: fila pendente já aplicada)
+                    task_id, completed = "", True
+                if completed and self.on_applied is not None:
+                    self.on_applied(device_id, batch)
+                result = WriteResult(task_id, completed, batch, len(pending.builders))
+            if not pending.future.done():
+                pending.future.set_result(result)
+        except asyncio.CancelledError:
+            pending.future.cancel()
+            raise
+        except Exception as e:
+            if not pending.future.done():
+                pending.future.set_exception(e)
+                # Evita o aviso "exception was never retrieved" se todos desistiram
+                pending.future.exception()
+        finally:
+            self._lock_users[device_id] -= 1
+            if not self._lock_users[device_id]:
+                del self._lock_users[device_id]
+                del self._locks[device_id]